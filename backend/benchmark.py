@@ -0,0 +1,319 @@
+"""
+Benchmark harness for the simulation pipeline.
+
+Runs the server's simulation pipeline over a sweep of users, APs and
+timesteps and reads the wall time of every stage from instrumentation.stage.
+It prints scaling curves, and optionally writes the results as JSON or
+compares them against a stored baseline:
+
+    python benchmark.py --users 50,100,200 --aps 4,16 --steps 600
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.2
+
+With --baseline the exit status is 1 when any stage got slower than the
+baseline by more than the tolerance.
+
+With --mac it instead measures the event rate of the event-driven MAC
+simulator (see mac.py) over the same sweep of users, APs and timesteps:
+
+    python benchmark.py --mac --users 100,1000 --aps 4 --steps 60 --traffic poisson --rate 20
+"""
+import argparse
+import itertools
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+
+from core_simulation import (
+    compute_distances,
+    compute_sinr_batch,
+    handover_decision_batch,
+    run_multiuser_wifi_simulation,
+    spawn_streams,
+)
+from environment import build_environment
+from instrumentation import collect_timings
+from mobility import generate_realistic_user_positions
+
+STAGES = ["mobility", "distance", "sinr", "handover", "throughput", "serialization"]
+CHANNELS_HZ = [2.412e9, 2.437e9, 2.462e9]
+AP_SPACING_M = 20.0
+
+# Stages faster than this in the baseline are too noisy to compare
+MIN_COMPARABLE_S = 1e-3
+
+
+def benchmark_aps(n_aps):
+    """
+    A square-ish grid of n_aps APs on the three non-overlapping 2.4 GHz channels.
+    """
+    n_cols = math.ceil(math.sqrt(n_aps))
+    return [
+        {
+            "tx_power_dBm": 20.0,
+            "frequency_Hz": CHANNELS_HZ[k % len(CHANNELS_HZ)],
+            "bandwidth_Hz": 20e6,
+            "position": [AP_SPACING_M * (k % n_cols), AP_SPACING_M * (k // n_cols)],
+            "antenna_gain_dBi": 0.0,
+            "beamwidth_deg": 360.0,
+        }
+        for k in range(n_aps)
+    ]
+
+
+def benchmark_env(n_users, n_aps, n_steps, seed=0):
+    """
+    Environment of a serial, seeded run on the benchmark_aps layout with one
+    second timesteps.
+    """
+    aps = benchmark_aps(n_aps)
+    return build_environment({
+        "simulationTime": n_steps,
+        "timeStep": 1.0,
+        "numberOfNodes": n_users,
+        "numberOfAccessPoints": n_aps,
+        "apPositions": [ap["position"] for ap in aps],
+        "frequencies": [ap["frequency_Hz"] for ap in aps],
+        "transmissionPowers": [ap["tx_power_dBm"] for ap in aps],
+        "bandwidths": [ap["bandwidth_Hz"] for ap in aps],
+        "seed": seed,
+        "workers": 1,
+    })
+
+
+def time_pipeline(n_users, n_aps, n_steps, seed=0):
+    """
+    Runs one simulation through run_multiuser_wifi_simulation and returns
+    the wall time of each stage in seconds, as recorded by
+    instrumentation.stage. Stages the run skipped report 0.
+    """
+    with collect_timings() as records:
+        run_multiuser_wifi_simulation(benchmark_env(n_users, n_aps, n_steps, seed))
+    timings = dict.fromkeys(STAGES, 0.0)
+    for record in records:
+        if record["stage"] in timings:
+            timings[record["stage"]] += record["seconds"]
+    return timings
+
+
+def run_benchmarks(users, aps, steps, repeat=3, seed=0):
+    """
+    Times the pipeline for every combination of users, aps and steps,
+    keeping the fastest of repeat runs per stage.
+    """
+    # Warm-up run, so one-time costs (lookup tables, lazy imports) are not timed
+    time_pipeline(2, 2, 2, seed)
+    results = []
+    for n_users, n_aps, n_steps in itertools.product(users, aps, steps):
+        runs = [time_pipeline(n_users, n_aps, n_steps, seed) for _ in range(repeat)]
+        seconds = {stage: min(run[stage] for run in runs) for stage in STAGES}
+        seconds["total"] = sum(seconds.values())
+        results.append({
+            "n_users": n_users,
+            "n_aps": n_aps,
+            "n_steps": n_steps,
+            "samples": n_users * n_aps * n_steps,
+            "seconds": seconds,
+        })
+    return {
+        "meta": {
+            "created": time.time(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def time_mac(n_users, n_aps, n_steps, traffic, seed=0):
+    """
+    Runs the MAC simulator on the handovers and SINR of a benchmark
+    simulation and returns its event count, wall time and events per second.
+    """
+    from mac import simulate_csma_for_result
+
+    aps = benchmark_aps(n_aps)
+    streams = spawn_streams(seed, n_users)
+    user_positions = generate_realistic_user_positions(
+        n_users, n_steps, [ap["position"] for ap in aps], 1.5, 1.0, seed=streams["mobility"]
+    )
+    sinr_dB = 10*np.log10(compute_sinr_batch(
+        compute_distances(aps, user_positions), aps, user_positions=user_positions, rng=streams["fading"]
+    ) + 1e-12)
+    handover, _, _ = handover_decision_batch(sinr_dB)
+    start = time.perf_counter()
+    mac = simulate_csma_for_result(
+        {"users_sinr": sinr_dB, "users_handover": handover}, n_aps, 1.0, traffic, rng=streams["mac"]
+    )["mac"]
+    seconds = time.perf_counter() - start
+    return {"events": mac["events"], "seconds": seconds,
+            "events_per_second": mac["events"] / seconds if seconds > 0 else 0.0}
+
+
+def run_mac_benchmarks(users, aps, steps, traffic, seed=0):
+    results = []
+    for n_users, n_aps, n_steps in itertools.product(users, aps, steps):
+        results.append({"n_users": n_users, "n_aps": n_aps, "n_steps": n_steps,
+                        **time_mac(n_users, n_aps, n_steps, traffic, seed)})
+    return results
+
+
+def format_mac_table(results):
+    lines = [f"{'users':>6} {'aps':>5} {'steps':>6} {'events':>10} {'seconds':>9} {'events/s':>10}"]
+    for r in results:
+        lines.append(f"{r['n_users']:>6} {r['n_aps']:>5} {r['n_steps']:>6} {r['events']:>10} "
+                     f"{r['seconds']:>9.3f} {r['events_per_second']:>10.0f}")
+    return "\n".join(lines)
+
+
+def scaling_exponent(sizes, seconds):
+    """
+    Least-squares slope of log(seconds) against log(size): 1 means linear
+    scaling, 2 quadratic. None with fewer than two distinct sizes.
+    """
+    sizes, seconds = np.asarray(sizes, dtype=float), np.asarray(seconds, dtype=float)
+    if len(set(sizes)) < 2 or np.any(seconds <= 0):
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+
+def format_scaling_curves(report, width=40):
+    """
+    Renders, for every swept dimension, the total run time as a bar chart
+    plus the fitted scaling exponent of each stage.
+    """
+    results = report["results"]
+    lines = []
+    for dim in ("n_users", "n_aps", "n_steps"):
+        others = [d for d in ("n_users", "n_aps", "n_steps") if d != dim]
+        groups = {}
+        for r in results:
+            groups.setdefault(tuple(r[d] for d in others), []).append(r)
+        for fixed, group in groups.items():
+            if len(group) < 2:
+                continue
+            group.sort(key=lambda r: r[dim])
+            label = ", ".join(f"{d}={v}" for d, v in zip(others, fixed))
+            lines.append(f"Scaling with {dim} ({label})")
+            longest = max(r["seconds"]["total"] for r in group)
+            for r in group:
+                total = r["seconds"]["total"]
+                bar = "#" * max(1, round(width * total / longest))
+                lines.append(f"  {r[dim]:>8}  {total:9.4f} s  {bar}")
+            exponents = []
+            for stage in STAGES + ["total"]:
+                k = scaling_exponent([r[dim] for r in group], [r["seconds"][stage] for r in group])
+                if k is not None:
+                    exponents.append(f"{stage} {k:.2f}")
+            lines.append("  exponents: " + ", ".join(exponents))
+            lines.append("")
+    return "\n".join(lines)
+
+
+def format_table(report):
+    header = f"{'users':>6} {'aps':>5} {'steps':>6} " + " ".join(f"{s:>13}" for s in STAGES + ["total"])
+    lines = [header]
+    for r in report["results"]:
+        lines.append(
+            f"{r['n_users']:>6} {r['n_aps']:>5} {r['n_steps']:>6} "
+            + " ".join(f"{r['seconds'][s]:>13.4f}" for s in STAGES + ["total"])
+        )
+    return "\n".join(lines)
+
+
+def compare_to_baseline(report, baseline, tolerance=0.2):
+    """
+    Returns the stages of scenarios present in both reports that are more
+    than tolerance (relative) slower than the baseline.
+    """
+    def key(r):
+        return r["n_users"], r["n_aps"], r["n_steps"]
+
+    reference = {key(r): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        base = reference.get(key(r))
+        if base is None:
+            continue
+        for stage, seconds in r["seconds"].items():
+            before = base.get(stage)
+            if before is None or before < MIN_COMPARABLE_S:
+                continue
+            ratio = seconds / before
+            if ratio > 1 + tolerance:
+                regressions.append({
+                    "n_users": r["n_users"],
+                    "n_aps": r["n_aps"],
+                    "n_steps": r["n_steps"],
+                    "stage": stage,
+                    "baseline_s": before,
+                    "current_s": seconds,
+                    "ratio": ratio,
+                })
+    return regressions
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NetVisor simulation pipeline.")
+    parser.add_argument("--users", type=_int_list, default=[50, 100, 200])
+    parser.add_argument("--aps", type=_int_list, default=[4, 16])
+    parser.add_argument("--steps", type=_int_list, default=[600])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative slowdown allowed before a stage is flagged")
+    parser.add_argument("--mac", action="store_true",
+                        help="benchmark the event-driven MAC simulator instead")
+    parser.add_argument("--traffic", default="saturated", help="MAC traffic model")
+    parser.add_argument("--rate", type=float, default=100.0,
+                        help="MAC packets per second per station")
+    args = parser.parse_args(argv)
+
+    if args.mac:
+        from mac import make_traffic
+        results = run_mac_benchmarks(args.users, args.aps, args.steps,
+                                     make_traffic(args.traffic, args.rate), args.seed)
+        print(format_mac_table(results))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+    report = run_benchmarks(args.users, args.aps, args.steps, args.repeat, args.seed)
+    print(format_table(report))
+    print()
+    print(format_scaling_curves(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for reg in regressions:
+            print(f"SLOWER: users={reg['n_users']} aps={reg['n_aps']} steps={reg['n_steps']} "
+                  f"{reg['stage']}: {reg['baseline_s']:.4f} s -> {reg['current_s']:.4f} s "
+                  f"({reg['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No stage slower than baseline by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
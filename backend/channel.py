@@ -0,0 +1,127 @@
+"""
+Time-correlated fading and shadowing.
+
+By default every timestep draws independent fading and shadowing. A
+CorrelatedChannel instead evolves the standard normals behind them (the
+in-phase and quadrature fading components and the shadowing of every
+user-AP link) as a first-order Gauss-Markov process,
+
+    z[t] = rho[t] * z[t-1] + sqrt(1 - rho[t]**2) * w[t]
+
+where w[t] are the fresh draws of step t and rho[t] = exp(-dx[t] / d_corr)
+for a user who moved dx[t] meters since the previous step. This is
+Gudmundson's exponential correlation model, with separate decorrelation
+distances for shadowing (tens of meters) and fading (about half a
+wavelength). The marginals are unchanged, so the mean received power and
+fading distribution match the independent model.
+
+The state is the last normals of every link plus each user's last
+position, O(1) memory per link. It persists across calls, so the streaming
+path continues the processes across window boundaries without keeping any
+history.
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _ar1_numpy(zt, rho, prev):
+    """
+    Applies z[t] += rho[t] * z[t-1] in place along the leading (time) axis
+    of zt, whose innovations are already scaled, starting from the state
+    prev.
+    """
+    tmp = np.empty_like(prev)
+    for t in range(zt.shape[0]):
+        np.multiply(prev, rho[t], out=tmp)
+        zt[t] += tmp
+        prev = zt[t]
+
+
+def _ar1_loops(zt, rho, prev):
+    """
+    Element-wise form of _ar1_numpy, compiled with numba when available.
+    """
+    n_steps, n_comp, n_aps, n_users = zt.shape
+    for c in range(n_comp):
+        for a in range(n_aps):
+            for u in range(n_users):
+                last = prev[c, a, u]
+                for t in range(n_steps):
+                    last = rho[t, c, 0, u] * last + zt[t, c, a, u]
+                    zt[t, c, a, u] = last
+
+
+class CorrelatedChannel:
+    """
+    Gauss-Markov state of the fading and shadowing normals of every link.
+    A decorrelation distance of None keeps that component independent from
+    step to step.
+    """
+
+    def __init__(self, shadow_decorrelation_m=None, fading_decorrelation_m=None):
+        self.shadow_decorrelation_m = shadow_decorrelation_m
+        self.fading_decorrelation_m = fading_decorrelation_m
+        self.z = None         # (3, n_aps, n_users) normals of the last step
+        self.position = None  # (n_users, 2) positions at the last step
+        self.started = None   # (n_users,) whether the user has state yet
+
+    def _rho(self, moved, distance):
+        if distance is None:
+            return np.zeros_like(moved)
+        return np.exp(-moved / distance)
+
+    def correlate(self, z, user_positions, lo=0, hi=None):
+        """
+        Correlates, in place, the fresh normals z of users lo:hi, shape
+        (3, n_aps, hi - lo, n_steps) (in-phase, quadrature, shadowing), and
+        advances their state. user_positions holds every user, shape
+        (n_users, 2, n_steps).
+        """
+        n_users, _, n_steps = user_positions.shape
+        hi = n_users if hi is None else hi
+        n_aps = z.shape[1]
+        if self.z is None:
+            self.z = np.zeros((3, n_aps, n_users), dtype=z.dtype)
+            self.position = np.full((n_users, 2), np.nan)
+            self.started = np.zeros(n_users, dtype=bool)
+
+        # Distance each user moved into every step, shape (hi - lo, n_steps);
+        # users without state start from fresh draws (rho = 0 at their first
+        # step, so the zero initial state drops out)
+        positions = user_positions[lo:hi]
+        moved = np.empty((hi - lo, n_steps))
+        moved[:, 0] = np.hypot(*(positions[:, :, 0] - self.position[lo:hi]).T)
+        moved[:, 1:] = np.hypot(*np.diff(positions, axis=2).transpose(1, 0, 2))
+        moved[~self.started[lo:hi], 0] = np.inf
+
+        rho = np.empty((n_steps, 3, 1, hi - lo), dtype=z.dtype)
+        rho[:, :2] = self._rho(moved, self.fading_decorrelation_m).T[:, None, None, :]
+        rho[:, 2] = self._rho(moved, self.shadow_decorrelation_m).T[:, None, :]
+        innov = np.sqrt(1 - rho**2)
+
+        # Time-major copy with the innovations scaled, so every step
+        # updates one contiguous slab
+        zt = np.multiply(np.moveaxis(z, -1, 0), innov)
+        _ar1_kernel(zt, rho, self.z[:, :, lo:hi])
+        z[...] = np.moveaxis(zt, 0, -1)
+
+        self.z[:, :, lo:hi] = zt[-1]
+        self.position[lo:hi] = positions[:, :, -1]
+        self.started[lo:hi] = True
+        return z
+
+
+def correlated_channel(shadow_decorrelation_m=None, fading_decorrelation_m=None):
+    """
+    A fresh CorrelatedChannel, or None when neither component is correlated.
+    """
+    if shadow_decorrelation_m is None and fading_decorrelation_m is None:
+        return None
+    return CorrelatedChannel(shadow_decorrelation_m, fading_decorrelation_m)
+
+
+_ar1_kernel = numba.njit(cache=True)(_ar1_loops) if numba is not None else _ar1_numpy
@@ -1,6 +1,11 @@
+import functools
+
 import numpy as np
 from scipy.stats import norm
-from mobility import generate_realistic_user_positions
+import kernels
+from channel import correlated_channel
+from instrumentation import stage
+from mobility import generate_realistic_user_positions, init_user_mobility, advance_user_mobility
 
 
 def interference_factor(freq_diff_Hz, channel_bandwidth_Hz):
@@ -18,8 +23,38 @@ def interference_factor(freq_diff_Hz, channel_bandwidth_Hz):
         return 0.0
 
 
+# --- Floating-point precision ---
+def _float_dtype(arr):
+    """
+    Floating dtype the pipeline computes in for input arr: float32 inputs
+    stay float32, everything else is computed in float64.
+    """
+    return np.result_type(np.asarray(arr).dtype, np.float32)
+
+
+def _random_draws(rng, kind, shape, dtype=np.float64):
+    """
+    standard_normal or random draws of the given dtype. Generators draw
+    float32 natively; the legacy global state draws float64 and casts.
+    """
+    if isinstance(rng, np.random.Generator):
+        return getattr(rng, kind)(shape, dtype=dtype)
+    return getattr(rng, kind)(shape).astype(dtype, copy=False)
+
+
+def _standard_normal_into(rng, out):
+    """
+    Fills out with standard normal draws, in place for Generators.
+    """
+    if isinstance(rng, np.random.Generator):
+        rng.standard_normal(out=out, dtype=out.dtype)
+    else:
+        out[...] = rng.standard_normal(out.shape)
+    return out
+
+
 # --- Enhanced fading + path loss ---
-def rician_fading_with_shadowing(distances, K0_dB=5.0, K_decay=0.1, shadow_sigma_dB=3.0):
+def rician_fading_with_shadowing(distances, K0_dB=5.0, K_decay=0.1, shadow_sigma_dB=3.0, rng=None):
     """
     distances : array_like
         Distance from APs (meters)
@@ -29,57 +64,62 @@ def rician_fading_with_shadowing(distances, K0_dB=5.0, K_decay=0.1, shadow_sigma
         Exponential decay factor for K vs distance
     shadow_sigma_dB : float
         Standard deviation for log-normal shadowing (dB)
-    """
-    # Distance-dependent K-factor
-    K_dB = K0_dB * np.exp(-K_decay * distances)
-    K_linear = 10 ** (K_dB / 10)
+    rng : np.random.Generator, optional
+        Source of randomness; the global np.random state if None
 
-    # Rician parameters
-    s = np.sqrt(K_linear / (K_linear + 1))
-    sigma = np.sqrt(1 / (2 * (K_linear + 1)))
-
-    # Small-scale fading (Rician)
-    fading_real = s + sigma * np.random.randn(*distances.shape)
-    fading_imag = sigma * np.random.randn(*distances.shape)
-    fading_linear = fading_real**2 + fading_imag**2
-
-    # Log-normal shadowing (in linear scale)
-    shadow_dB = np.random.randn(*distances.shape) * shadow_sigma_dB
-    shadow_linear = 10 ** (shadow_dB / 10)
-
-    return fading_linear * shadow_linear
+    Draws the in-phase, quadrature and shadowing normals in that order and
+    returns the linear fading times shadowing power (see kernels).
+    """
+    rng = np.random if rng is None else rng
+    distances = np.asarray(distances)
+    dtype = _float_dtype(distances)
+    z = _random_draws(rng, "standard_normal", (3,) + distances.shape, dtype)
+    out = np.empty(distances.shape, dtype=dtype)
+    return kernels.rician_fading_into(distances, z, K0_dB, K_decay, shadow_sigma_dB,
+                                      out, np.empty_like(out), np.empty_like(out))
 
 
 # --- Received power ---
 def compute_received_power(distances, ap, path_loss_exp=3.0,
-                                    K0_dB=5.0, K_decay=0.1, shadow_sigma_dB=3.0):
+                                    K0_dB=5.0, K_decay=0.1, shadow_sigma_dB=3.0, rng=None):
     """
     Compute received power (linear scale) with:
     - Distance-dependent Rician fading
     - Log-normal shadowing
     - Path loss
+    Same draws as rician_fading_with_shadowing, computed in the linear
+    domain by kernels.received_power_into.
+    """
+    rng = np.random if rng is None else rng
+    distances = np.asarray(distances)
+    dtype = _float_dtype(distances)
+    z = _random_draws(rng, "standard_normal", (3,) + distances.shape, dtype)
+    log_amp = kernels.log_amplitude(ap["tx_power_dBm"], ap["frequency_Hz"], dtype)
+    out = np.empty(distances.shape, dtype=dtype)
+    return kernels.received_power_into(distances, z, log_amp, path_loss_exp, K0_dB, K_decay,
+                                       shadow_sigma_dB, out, np.empty_like(out), np.empty_like(out))
+
+
+def mean_received_power_dBm(distances, ap, path_loss_exp=3.0):
     """
+    Deterministic part of the received power (dBm): transmit power minus
+    log-distance path loss, without fading or antenna gain. Computed in the
+    precision of distances.
+    """
+    dtype = _float_dtype(distances)
     freq_Hz = ap["frequency_Hz"]
-    tx_power_dBm = ap["tx_power_dBm"]
+    tx_power_dBm = np.asarray(ap["tx_power_dBm"], dtype=dtype)
     c = 3e8
     lambda_c = c / freq_Hz
     d0 = 1.0  # reference distance
 
     # Free-space path loss at d0
-    pl_d0 = 20 * np.log10(4*np.pi*d0 / lambda_c)
+    pl_d0 = np.asarray(20 * np.log10(4*np.pi*d0 / lambda_c), dtype=dtype)
 
     # Path loss over distance
     path_loss_dB = pl_d0 + 10 * path_loss_exp * np.log10(distances/d0 + 1e-12)
 
-    # Combined fading + shadowing
-    fading_linear = rician_fading_with_shadowing(distances, K0_dB, K_decay, shadow_sigma_dB)
-    fading_dB = 10 * np.log10(fading_linear + 1e-12)
-
-    # Received power in dBm and convert to linear scale
-    rx_power_dBm = tx_power_dBm - path_loss_dB + fading_dB
-    rx_power_linear = 10 ** (rx_power_dBm / 10)
-
-    return rx_power_linear
+    return tx_power_dBm - path_loss_dB
 
 
 # --- BER functions ---
@@ -91,6 +131,60 @@ ber_map = {
 }
 
 
+# --- Default MCS table: (modulation, coding rate, PHY rate in Mbps) ---
+DEFAULT_MCS_TABLE = [
+    ("BPSK",  1/2,  6.5),
+    ("QPSK",  1/2, 13),
+    ("QPSK",  3/4, 19.5),
+    ("16QAM", 1/2, 26),
+    ("16QAM", 3/4, 39),
+    ("64QAM", 2/3, 52),
+    ("64QAM", 3/4, 58.5),
+    ("64QAM", 5/6, 65),
+]
+
+# Default MCS thresholds (dB)
+DEFAULT_MCS_THRESHOLDS = [5, 10, 15, 20, 25, 30, 35]
+
+
+# --- PER lookup tables ---
+PER_LUT_MIN_DB = -20.0
+PER_LUT_MAX_DB = 60.0
+PER_LUT_STEP_DB = 0.01
+
+
+@functools.lru_cache(maxsize=32)
+def _per_lookup_table(modulations, packet_bits, dtype="float64"):
+    """
+    PER of each MCS on a uniform SINR grid, shape (n_mcs, n_grid).
+    Cached per (modulations, packet size, dtype); the returned array is
+    read-only.
+    """
+    n_grid = int(round((PER_LUT_MAX_DB - PER_LUT_MIN_DB) / PER_LUT_STEP_DB)) + 1
+    snr = 10 ** ((PER_LUT_MIN_DB + PER_LUT_STEP_DB * np.arange(n_grid)) / 10)
+    ber_by_mod = {mod: ber_map[mod](snr) for mod in set(modulations)}
+    ber = np.stack([ber_by_mod[mod] for mod in modulations])
+    per = (1 - np.exp(-ber * packet_bits)).astype(dtype)
+    per.setflags(write=False)
+    return per
+
+
+def per_lookup(snr_dB, mcs_idx, modulations, packet_bits):
+    """
+    Linearly interpolated PER for each SINR sample (dB) at its MCS index.
+    SINRs outside the table range are clamped to its ends, where PER is
+    already saturated at 1 or 0.
+    """
+    table = _per_lookup_table(tuple(modulations), float(packet_bits), _float_dtype(snr_dB).name)
+    n_grid = table.shape[1]
+    pos = np.clip((snr_dB - PER_LUT_MIN_DB) / PER_LUT_STEP_DB, 0, n_grid - 1)
+    lo = np.minimum(pos.astype(np.intp), n_grid - 2)
+    weight = pos - lo.astype(pos.dtype)
+    flat_idx = mcs_idx * n_grid + lo
+    flat_table = table.ravel()
+    return flat_table[flat_idx] * (1 - weight) + flat_table[flat_idx + 1] * weight
+
+
 # --- Directional antenna gain ---
 def directional_gain(theta_rad, G_max_dBi=0, theta_3dB_deg=360):
     """
@@ -109,76 +203,237 @@ def angle_to_user(ap_pos, user_pos):
     return np.arctan2(dy, dx)
 
 
-# --- SINR computation ---
+# --- AP-pair interference factors ---
+def interference_factor_matrix(aps_meta):
+    """
+    Returns an (n_aps, n_aps) matrix whose entry [i, j] weights the power of
+    AP j as interference at a user served by AP i. Same rule as
+    interference_factor, with AP i's bandwidth; the diagonal is zero.
+    """
+    freqs = np.array([ap["frequency_Hz"] for ap in aps_meta], dtype=float)
+    bws = np.array([ap["bandwidth_Hz"] for ap in aps_meta], dtype=float)
+    freq_diff = np.abs(freqs[None, :] - freqs[:, None])
+    factors = np.clip(1 - freq_diff / bws[:, None], 0.0, 1.0)
+    np.fill_diagonal(factors, 0.0)
+    return factors
+
+
+# --- Per-AP parameters as broadcastable columns ---
+def _ap_column(aps_meta, key, default=None, ndim=3):
+    """
+    Collects one AP parameter into an array of shape (n_aps, 1, ..., 1) so it
+    broadcasts against tensors whose leading axis is the AP axis.
+    """
+    values = np.array([ap.get(key, default) for ap in aps_meta], dtype=float)
+    return values.reshape((-1,) + (1,) * (ndim - 1))
+
+
+# --- Directional gain for all APs, users and timesteps ---
+def directional_gain_matrix(aps_meta, user_positions):
+    """
+    user_positions: shape (n_users, 2, n_steps)
+    Returns linear antenna gain of shape (n_aps, n_users, n_steps).
+    """
+    ap_positions = np.array([ap["position"] for ap in aps_meta], dtype=float)
+    dx = user_positions[None, :, 0, :] - ap_positions[:, 0, None, None]
+    dy = user_positions[None, :, 1, :] - ap_positions[:, 1, None, None]
+    theta = np.arctan2(dy, dx)
+    return directional_gain(
+        theta,
+        G_max_dBi=_ap_column(aps_meta, "antenna_gain_dBi", 0),
+        theta_3dB_deg=_ap_column(aps_meta, "beamwidth_deg", 360)
+    )
+
+
+# --- Batched SINR computation ---
+def compute_sinr_batch(dist_matrix, aps_meta,
+                       path_loss_exp=3.0, K0_dB=5.0, K_decay=0.1, shadow_sigma_dB=3.0,
+                       user_positions=None, rng=None, radio_map=None, interference_radius=None,
+                       correlation=None):
+    """
+    dist_matrix: shape (n_aps, n_users, n_steps)
+    user_positions: shape (n_users, 2, n_steps)
+    rng: None (global np.random state), a Generator shared by all users, or
+        a sequence of per-user Generators so each user's fading does not
+        depend on which other users are simulated alongside it
+    radio_map: optional precomputed map from radio_map.get_radio_map; the
+        mean received power and antenna gain are then interpolated from it
+        (requires user_positions) and only fading is drawn per sample
+    interference_radius: optional radius in meters; only APs within it of a
+        user are evaluated (see interference.compute_sinr_pruned)
+    correlation: optional channel.CorrelatedChannel; fading and shadowing
+        then evolve from the state it carries instead of being drawn
+        independently every step (requires user_positions)
+    Returns linear SINR of shape (n_users, n_aps, n_steps), where [u, i, t]
+    is the SINR user u would see at step t if served by AP i. It is
+    computed in float32 when dist_matrix is float32, float64 otherwise.
+    """
+    n_aps, n_users, n_steps = dist_matrix.shape
+    dtype = _float_dtype(dist_matrix)
+
+    if correlation is not None and (radio_map is not None or interference_radius is not None):
+        raise ValueError("correlated fading cannot be combined with a radio map or interference pruning")
+    if interference_radius is not None:
+        if radio_map is not None:
+            raise ValueError("interference pruning cannot be combined with a radio map")
+        from interference import compute_sinr_pruned
+        return compute_sinr_pruned(
+            dist_matrix, aps_meta, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+            user_positions=user_positions, rng=rng, radius=interference_radius
+        ).astype(dtype, copy=False)
+
+    factors = interference_factor_matrix(aps_meta)
+    noise_power = kernels.noise_power(_ap_column(aps_meta, "bandwidth_Hz", ndim=1)) + 1e-12
+    gain = None
+    if radio_map is None and user_positions is not None and any(ap.get("antenna_gain_dBi", 0) for ap in aps_meta):
+        gain = directional_gain_matrix(aps_meta, user_positions).astype(dtype, copy=False)
+
+    if radio_map is not None:
+        from radio_map import sample_radio_map
+
+        fading_args = (K0_dB, K_decay, shadow_sigma_dB)
+        if isinstance(rng, (list, tuple)):
+            fading = np.empty(dist_matrix.shape, dtype=dtype)
+            for u in range(n_users):
+                fading[:, u:u+1, :] = rician_fading_with_shadowing(
+                    dist_matrix[:, u:u+1, :], *fading_args, rng[u]
+                )
+        else:
+            fading = rician_fading_with_shadowing(dist_matrix, *fading_args, rng)
+        mean_dBm = sample_radio_map(
+            radio_map, aps_meta, user_positions, dist_matrix, path_loss_exp
+        ).astype(dtype, copy=False)
+        # rx = 10**(mean_dBm / 10) * (fading + 1e-12), in place
+        rx = np.multiply(mean_dBm, kernels.LN10_10, out=mean_dBm)
+        np.exp(rx, out=rx)
+        fading += 1e-12
+        rx *= fading
+        interference = (factors.astype(dtype) @ rx.reshape(n_aps, -1)).reshape(n_aps, n_users, n_steps)
+        interference += noise_power.astype(dtype)[:, None, None]
+        return (rx / interference).transpose(1, 0, 2)
+
+    # Fused linear-domain kernel over blocks of users, one fading draw per
+    # link. Per-user streams draw (in-phase, quadrature, shadowing) for
+    # their own links, a shared generator draws each for all links at once.
+    log_amp = kernels.log_amplitude(_ap_column(aps_meta, "tx_power_dBm", ndim=1),
+                                    _ap_column(aps_meta, "frequency_Hz", ndim=1))
+    channel = (log_amp, factors, noise_power, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB)
+    sinr = np.empty((n_users, n_aps, n_steps), dtype=dtype)
+    block = kernels.users_per_block(n_aps, n_steps, dtype)
+    shared_z = None
+    if not isinstance(rng, (list, tuple)):
+        rng = np.random if rng is None else rng
+        shared_z = _random_draws(rng, "standard_normal", (3, n_aps, n_users, n_steps), dtype)
+    for lo in range(0, n_users, block):
+        hi = min(lo + block, n_users)
+        if shared_z is None:
+            z = kernels.workspace_buffer("z", (hi - lo, 3, n_aps, n_steps), dtype)
+            for u in range(lo, hi):
+                _standard_normal_into(rng[u], z[u - lo])
+            z = z.transpose(1, 2, 0, 3)
+        else:
+            z = shared_z[:, :, lo:hi]
+        if correlation is not None:
+            correlation.correlate(z, user_positions, lo, hi)
+        kernels.fused_sinr(
+            dist_matrix[:, lo:hi], z, *channel,
+            gain=None if gain is None else gain[:, lo:hi], out=sinr[lo:hi]
+        )
+    return sinr
+
+
+# --- SINR computation (single user) ---
 def compute_sinr(distances_all_aps, aps_meta,
                  path_loss_exp=3.0, K0_dB=5.0, K_decay=0.1, shadow_sigma_dB=3.0,
-                 user_positions=None):
+                 user_positions=None, rng=None):
     """
     distances_all_aps: shape (n_aps, n_steps)
     user_positions: shape (2, n_steps)
     """
-    n_aps, n_steps = distances_all_aps.shape
-    rx_all = np.zeros((n_aps, n_aps, n_steps))
-
-    # Compute received power including directional gain
-    for i, ap in enumerate(aps_meta):
-        for j, intf_ap in enumerate(aps_meta):
-            rx_lin = compute_received_power(
-                distances_all_aps[j,:],
-                intf_ap,
-                path_loss_exp=path_loss_exp,
-                K0_dB=K0_dB,
-                K_decay=K_decay,
-                shadow_sigma_dB=shadow_sigma_dB
-            )
-
-            # Apply directional gain per timestep if user positions provided
-            if user_positions is not None:
-                gain_lin = np.ones(n_steps)
-                for t in range(n_steps):
-                    theta = angle_to_user(intf_ap["position"], user_positions[:,t])
-                    gain_lin[t] = directional_gain(
-                        theta,
-                        G_max_dBi=intf_ap.get("antenna_gain_dBi",0),
-                        theta_3dB_deg=intf_ap.get("beamwidth_deg",360)
-                    )
-                rx_lin *= gain_lin
-
-            rx_all[i,j,:] = rx_lin
-
-    # Compute SINR considering frequency-dependent interference
-    sinr_linear = np.zeros((n_aps, n_steps))
-    for i, ap in enumerate(aps_meta):
-        serving_power = rx_all[i,i,:]
-        interference_power = np.zeros(n_steps)
-        for j, intf_ap in enumerate(aps_meta):
-            if j == i:
-                continue
-            freq_diff = abs(intf_ap["frequency_Hz"] - ap["frequency_Hz"])
-            intf_factor = interference_factor(freq_diff, ap["bandwidth_Hz"])
-            interference_power += rx_all[i,j,:] * intf_factor
-
-        # Noise power in linear scale (dBm -> linear)
-        noise_power_dBm = -174 + 10*np.log10(ap["bandwidth_Hz"]) + 7
-        noise_power = 10 ** (noise_power_dBm / 10)
-
-        sinr_linear[i,:] = serving_power / (interference_power + noise_power + 1e-12)
-
-    return sinr_linear
+    return compute_sinr_batch(
+        distances_all_aps[:, None, :],
+        aps_meta,
+        path_loss_exp=path_loss_exp,
+        K0_dB=K0_dB,
+        K_decay=K_decay,
+        shadow_sigma_dB=shadow_sigma_dB,
+        user_positions=None if user_positions is None else user_positions[None, :, :],
+        rng=rng
+    )[0]
 
 
 # --- Handover ---
-def handover_decision(sinr_dB_matrix, hysteresis_dB=3.0):
-    n_aps, n_steps = sinr_dB_matrix.shape
-    connected_ap = np.zeros(n_steps, dtype=int)
-    current_ap = np.argmax(sinr_dB_matrix[:,0])
-    for t in range(n_steps):
-        current_sinr = sinr_dB_matrix[current_ap,t]
-        candidates = np.where(sinr_dB_matrix[:,t] > current_sinr + hysteresis_dB)[0]
-        if candidates.size > 0:
-            current_ap = candidates[np.argmax(sinr_dB_matrix[candidates,t])]
-        connected_ap[t] = current_ap
-    return connected_ap + 1
+HANDOVER_BLOCK_STEPS = 256
+
+
+def handover_decision_batch(sinr_dB, hysteresis_dB=3.0, state=None, time_to_trigger_steps=0):
+    """
+    Advances the serving AP of all users together, one timestep at a time.
+
+    sinr_dB: shape (n_users, n_aps, n_steps)
+    state: handover state returned by a previous call for the preceding
+        block of timesteps, or None to start on each user's strongest AP
+    time_to_trigger_steps: a handover happens only once the same target AP
+        has beaten the serving AP by more than hysteresis_dB for this many
+        consecutive steps; 0 or 1 hands over immediately
+
+    Returns the 1-based serving AP per user, shape (n_users, n_steps), the
+    number of users on each AP, shape (n_aps, n_steps), and the state to
+    pass to the next block.
+    """
+    n_users, n_aps, n_steps = sinr_dB.shape
+    users = np.arange(n_users)
+    if state is None:
+        state = {
+            "serving": np.argmax(sinr_dB[:, :, 0], axis=1),
+            "pending": np.full(n_users, -1),
+            "count": np.zeros(n_users, dtype=int),
+        }
+    serving = np.array(state["serving"], dtype=int)
+    pending = np.array(state["pending"], dtype=int)
+    count = np.array(state["count"], dtype=int)
+
+    connected_ap = np.empty((n_users, n_steps), dtype=int)
+    n_users_on_ap = np.empty((n_aps, n_steps), dtype=int)
+
+    for start in range(0, n_steps, HANDOVER_BLOCK_STEPS):
+        # Time-major copy of the block so each step reads contiguous memory
+        block = np.ascontiguousarray(
+            sinr_dB[:, :, start:start + HANDOVER_BLOCK_STEPS].transpose(2, 0, 1)
+        )
+        for k, sinr_t in enumerate(block):
+            # The strongest AP is a candidate whenever any AP is
+            best = np.argmax(sinr_t, axis=1)
+            trigger = sinr_t[users, best] > sinr_t[users, serving] + hysteresis_dB
+            if time_to_trigger_steps <= 1:
+                serving = np.where(trigger, best, serving)
+            else:
+                count = np.where(trigger & (best == pending), count + 1, trigger.astype(int))
+                pending = np.where(trigger, best, -1)
+                switch = count >= time_to_trigger_steps
+                serving = np.where(switch, best, serving)
+                count[switch] = 0
+                pending[switch] = -1
+            t = start + k
+            connected_ap[:, t] = serving
+            n_users_on_ap[:, t] = np.bincount(serving, minlength=n_aps)
+
+    state = {"serving": serving, "pending": pending, "count": count}
+    return connected_ap + 1, n_users_on_ap, state
+
+
+def handover_decision(sinr_dB_matrix, hysteresis_dB=3.0, initial_ap=None):
+    """
+    Single-user handover over sinr_dB_matrix of shape (n_aps, n_steps).
+
+    initial_ap: 0-based serving AP carried over from a previous block of
+    timesteps; defaults to the strongest AP at the first step.
+    """
+    state = None
+    if initial_ap is not None:
+        state = {"serving": [initial_ap], "pending": [-1], "count": [0]}
+    connected_ap, _, _ = handover_decision_batch(sinr_dB_matrix[None], hysteresis_dB, state)
+    return connected_ap[0]
 
 
 # --- Full throughput computation with adaptive MCS per user ---
@@ -189,30 +444,51 @@ def compute_throughput_all(
     max_retries=3,
     mcs_table=None,
     mcs_thresholds=None,
+    rng=None,
+    sampling="retries",
 ):
     """
     Compute PHY and MAC throughput with adaptive MCS per-user and frequency-aware SINR.
+
+    sinr_linear_all and n_users_on_ap have shape (n_rows, n_steps), one row
+    per user (or AP). Rates and modulations are looked up by MCS index and
+    PER comes from a cached, interpolated table (see per_lookup). Retry
+    draws come from rng: the global np.random state if None, one Generator,
+    or a sequence of per-row Generators. Outputs are float32 for float32
+    input, float64 otherwise.
+
+    sampling="retries" draws every transmission attempt. "outcome" draws
+    only whether the packet is lost, with probability per**max_retries, and
+    returns None for retries and collisions. None draws nothing and returns
+    only PER, with None for the other outputs.
     """
+    snr_dB = 10 * np.log10(sinr_linear_all + 1e-12)
+    return compute_throughput_from_dB(snr_dB, n_users_on_ap, packet_size_bytes, max_retries,
+                                      mcs_table, mcs_thresholds, rng, sampling)
 
-    n_aps, n_steps = sinr_linear_all.shape
+
+def compute_throughput_from_dB(
+    snr_dB,
+    n_users_on_ap,
+    packet_size_bytes=1500,
+    max_retries=3,
+    mcs_table=None,
+    mcs_thresholds=None,
+    rng=None,
+    sampling="retries",
+):
+    """
+    compute_throughput_all for SINR already in dB, which is what MCS
+    selection and the PER table use.
+    """
+    n_aps, n_steps = snr_dB.shape
     packet_bits = packet_size_bytes * 8
+    dtype = _float_dtype(snr_dB)
 
-    # Default MCS table
     if mcs_table is None:
-        mcs_table = [
-            ("BPSK",  1/2,  6.5),
-            ("QPSK",  1/2, 13),
-            ("QPSK",  3/4, 19.5),
-            ("16QAM", 1/2, 26),
-            ("16QAM", 3/4, 39),
-            ("64QAM", 2/3, 52),
-            ("64QAM", 3/4, 58.5),
-            ("64QAM", 5/6, 65),
-        ]
-
-    # Default MCS thresholds (dB)
+        mcs_table = DEFAULT_MCS_TABLE
     if mcs_thresholds is None:
-        mcs_thresholds = [5, 10, 15, 20, 25, 30, 35]
+        mcs_thresholds = DEFAULT_MCS_THRESHOLDS
 
     # Ensure n_users_on_ap is broadcast correctly
     n_users_on_ap = np.atleast_2d(n_users_on_ap)
@@ -220,134 +496,402 @@ def compute_throughput_all(
         n_users_on_ap = np.repeat(n_users_on_ap, n_steps, axis=1)
 
     # Adaptive MCS selection per user
-    snr_dB = 10 * np.log10(sinr_linear_all + 1e-12)
     mcs_idx = np.digitize(snr_dB, bins=mcs_thresholds)
     mcs_idx = np.clip(mcs_idx, 0, len(mcs_table) - 1)
 
-    # PHY rates and modulation types
-    phy_rates = np.array([mcs_table[idx][2]*1e6 for idx in mcs_idx.flatten()]).reshape(n_aps, n_steps)
-    mod_types = np.array([mcs_table[idx][0] for idx in mcs_idx.flatten()]).reshape(n_aps, n_steps)
-
-    # BER calculation per modulation type
-    ber_vals = np.zeros_like(snr_dB)
-    for mod, ber_func in ber_map.items():
-        mask = (mod_types == mod)
-        if np.any(mask):
-            ber_vals[mask] = ber_func(sinr_linear_all[mask])
+    # PHY rates by MCS index, PER from the lookup table
+    phy_rates = (np.array([row[2] for row in mcs_table]) * 1e6).astype(dtype)[mcs_idx]
+    per = per_lookup(snr_dB, mcs_idx, [row[0] for row in mcs_table], packet_bits)
 
-    # Packet error rate (PER)
-    per = 1 - np.exp(-ber_vals * packet_bits)
+    if sampling is None:
+        return None, None, per, None, None
 
     # Retry simulation
-    rand_matrix = np.random.rand(n_aps, n_steps, max_retries)
-    success_mask = rand_matrix > per[:, :, None]
-    first_success = np.argmax(success_mask, axis=2)
-    never_succeed = ~np.any(success_mask, axis=2)
-    retries = first_success.astype(float)
-    retries[never_succeed] = max_retries
-    collisions = never_succeed.astype(float)
+    draw_shape = (n_steps, max_retries) if sampling == "retries" else (n_steps,)
+    if isinstance(rng, (list, tuple)):
+        rand_matrix = np.stack([_random_draws(g, "random", draw_shape, dtype) for g in rng])
+    else:
+        rng = np.random if rng is None else rng
+        rand_matrix = _random_draws(rng, "random", (n_aps,) + draw_shape, dtype)
+    if sampling == "retries":
+        success_mask = rand_matrix > per[:, :, None]
+        first_success = np.argmax(success_mask, axis=2)
+        never_succeed = ~np.any(success_mask, axis=2)
+        retries = first_success.astype(dtype)
+        retries[never_succeed] = max_retries
+        collisions = never_succeed.astype(dtype)
+    else:
+        # All max_retries attempts fail with probability per**max_retries
+        never_succeed = rand_matrix < per ** max_retries
+        retries = collisions = None
 
     # Throughput (PHY layer)
-    throughput_bps = np.where(never_succeed, 0, phy_rates)
+    throughput_bps = np.where(never_succeed, dtype.type(0), phy_rates)
 
     # MAC efficiency
-    mac_efficiency = 1 / np.maximum(1, n_users_on_ap)
+    mac_efficiency = (1 / np.maximum(1, n_users_on_ap)).astype(dtype)
     mac_throughput_bps = throughput_bps * mac_efficiency
 
     return throughput_bps, mac_throughput_bps, per, retries, collisions
 
 
-# --- Full simulation ---
-def simulate_multi_user_wifi_py(
-    aps,
-    user_positions,
-    path_loss_exp,
-    K0_dB,
-    K_decay,
-    shadow_sigma_dB,
-    hysteresis_dB,
-    packet_size_bytes,
-    max_retries
-):
+# --- Random streams ---
+def spawn_streams(seed, n_users, users=None):
     """
-    Simulate multi-user WiFi network with per-user, per-AP adaptive MCS.
+    Derives independent random streams from one seed with SeedSequence.spawn:
+    one for mobility, one for the event-driven MAC (see mac.py), plus one
+    fading and one retry stream per user. A user's draws depend only on the
+    seed and the user index, so splitting users across chunks or workers
+    reproduces the serial result exactly.
+    seed=None draws fresh OS entropy. users (a slice) restricts the per-user
+    streams to a shard of the users.
     """
-    n_users, _, n_steps = user_positions.shape
-    n_aps = len(aps)
-    ap_positions = np.array([ap["position"] for ap in aps])
-    
-    # Compute distances: shape (n_aps, n_users, n_steps)
+    users = slice(None) if users is None else users
+    mobility_ss, fading_ss, retry_ss, mac_ss = np.random.SeedSequence(seed).spawn(4)
+    return {
+        "mobility": np.random.default_rng(mobility_ss),
+        "fading": [np.random.default_rng(s) for s in fading_ss.spawn(n_users)[users]],
+        "retry": [np.random.default_rng(s) for s in retry_ss.spawn(n_users)[users]],
+        "mac": np.random.default_rng(mac_ss),
+    }
+
+
+# --- Pipeline stages ---
+def compute_distances(aps, user_positions, dtype=np.float64):
+    """
+    user_positions: shape (n_users, 2, n_steps)
+    Returns user-AP distances of shape (n_aps, n_users, n_steps) in dtype,
+    which sets the floating-point precision of all later stages.
+    """
+    ap_positions = np.array([ap["position"] for ap in aps], dtype=dtype)
+    user_positions = np.asarray(user_positions).astype(dtype, copy=False)
     diffs = user_positions[None,:,:,:] - ap_positions[:,None,:,None]
-    dist_matrix = np.sqrt(np.sum(diffs**2, axis=2))
+    return np.sqrt(np.sum(diffs**2, axis=2))
+
+
+def sinr_and_handover_stage(aps, dist_matrix, user_positions, path_loss_exp, K0_dB, K_decay,
+                            shadow_sigma_dB, hysteresis_dB, handover_state=None, fading_rngs=None,
+                            time_to_trigger_steps=0, radio_map_resolution=None,
+                            interference_radius=None, correlation=None):
+    """
+    Returns the SINR cube in dB, shape (n_users, n_aps, n_steps), the
+    1-based serving AP per user, shape (n_users, n_steps), the users per AP,
+    shape (n_aps, n_steps), and the handover state for the next block.
+    radio_map_resolution (meters) samples mean received power from a cached
+    radio map of the AP layout instead of computing it per sample.
+    interference_radius (meters) only evaluates APs near each user.
+    correlation (a channel.CorrelatedChannel) correlates fading and
+    shadowing over time, carrying its state to the next block.
+    """
+    sinr_matrix_all = sinr_stage(
+        aps, dist_matrix, user_positions, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+        fading_rngs, radio_map_resolution, interference_radius, correlation
+    )
+    handover_all, n_users_on_ap, handover_state = handover_stage(
+        sinr_matrix_all, hysteresis_dB, handover_state, time_to_trigger_steps
+    )
+    return sinr_matrix_all, handover_all, n_users_on_ap, handover_state
 
-    # Pre-allocate results
-    handover_all = np.zeros((n_users, n_steps), dtype=int)
-    sinr_matrix_all = np.zeros((n_users, n_aps, n_steps))
 
-    # Compute SINR and handover per user
-    for u in range(n_users):
-        distances_user = dist_matrix[:, u, :]
-        sinr_linear = compute_sinr(
-            distances_user,
+def sinr_stage(aps, dist_matrix, user_positions, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+               fading_rngs=None, radio_map_resolution=None, interference_radius=None,
+               correlation=None):
+    """
+    SINR of every user towards every AP in dB, shape (n_users, n_aps, n_steps),
+    computed for all users in one batched pass.
+    """
+    radio_map = None
+    if radio_map_resolution:
+        from radio_map import get_radio_map
+        radio_map = get_radio_map(aps, path_loss_exp, radio_map_resolution)
+
+    n_aps, n_users, n_steps = dist_matrix.shape
+    with stage("sinr", n_users=n_users, n_aps=n_aps, n_steps=n_steps):
+        sinr_linear = compute_sinr_batch(
+            dist_matrix,
             aps,
             path_loss_exp=path_loss_exp,
             K0_dB=K0_dB,
             K_decay=K_decay,
             shadow_sigma_dB=shadow_sigma_dB,
-            user_positions=user_positions[u, :, :]
+            user_positions=user_positions,
+            rng=fading_rngs,
+            radio_map=radio_map,
+            interference_radius=interference_radius,
+            correlation=correlation
         )
-        sinr_dB = 10*np.log10(sinr_linear + 1e-12)
-        handover_all[u, :] = handover_decision(sinr_dB, hysteresis_dB)
-        sinr_matrix_all[u, :, :] = sinr_dB
-
-    # Users per AP per timestep
-    n_users_on_ap = np.zeros((n_aps, n_steps), dtype=int)
-    for t in range(n_steps):
-        bins, counts = np.unique(handover_all[:, t], return_counts=True)
-        n_users_on_ap[bins-1, t] = counts
-
-    # Compute throughput and other metrics for all users with per-user adaptive MCS
-    throughput_all, mac_all, per_all = [], [], []
-    retries_all, collisions_all, sinr_all, distance_all = [], [], [], []
-
-    for u in range(n_users):
-        # Per-user serving AP
-        serving_ap_idx = handover_all[u, :] - 1  # 0-based index
-        sinr_linear_user = 10**(sinr_matrix_all[u,:,:] / 10)
-
-        # Prepare per-user SINR matrix to feed compute_throughput_all
-        sinr_per_user = sinr_linear_user[serving_ap_idx, np.arange(n_steps)]
-
-        # We need shape (1, n_steps) for compute_throughput_all
-        sinr_per_user = sinr_per_user.reshape(1, n_steps)
-
-        # Compute per-user throughput with adaptive MCS
-        thr, mac, per, retries, coll = compute_throughput_all(
-            sinr_per_user,
-            n_users_on_ap[serving_ap_idx, np.arange(n_steps)].reshape(1, n_steps),
-            packet_size_bytes=packet_size_bytes,
-            max_retries=max_retries
+        # In place: the linear SINR is not needed afterwards
+        sinr_linear += 1e-12
+        sinr_dB = np.log10(sinr_linear, out=sinr_linear)
+        sinr_dB *= 10
+        return sinr_dB
+
+
+def handover_stage(sinr_matrix_all, hysteresis_dB, handover_state=None, time_to_trigger_steps=0):
+    """
+    Handover decisions for all users; see handover_decision_batch.
+    """
+    n_users, n_aps, n_steps = sinr_matrix_all.shape
+    with stage("handover", n_users=n_users, n_aps=n_aps, n_steps=n_steps):
+        return handover_decision_batch(
+            sinr_matrix_all, hysteresis_dB, handover_state, time_to_trigger_steps
         )
 
-        throughput_all.append(thr.flatten().tolist())
-        mac_all.append(mac.flatten().tolist())
-        per_all.append(per.flatten().tolist())
-        retries_all.append(retries.flatten().tolist())
-        collisions_all.append(coll.flatten().tolist())
-        sinr_all.append(sinr_matrix_all[u,:,:].tolist())
-        distance_all.append(dist_matrix[:,u,:].tolist())
 
-    return {
-        "users_sinr": sinr_all,
-        "users_handover": handover_all.tolist(),
+def users_per_ap(handover_all, n_aps):
+    """
+    Returns the number of users served by each AP per timestep, shape (n_aps, n_steps).
+    """
+    n_steps = handover_all.shape[1]
+    flat = (handover_all - 1) * n_steps + np.arange(n_steps)
+    return np.bincount(flat.ravel(), minlength=n_aps * n_steps).reshape(n_aps, n_steps)
+
+
+def serving_load(handover_all, n_users_on_ap):
+    """
+    Returns, for every user and timestep, the number of users sharing that
+    user's serving AP, shape (n_users, n_steps).
+    """
+    n_steps = handover_all.shape[1]
+    return n_users_on_ap[handover_all - 1, np.arange(n_steps)]
+
+
+def throughput_stage(sinr_matrix_all, handover_all, load, packet_size_bytes,
+                     max_retries, retry_rngs=None, fields=None):
+    """
+    Computes throughput and other MAC/PHY metrics for users on their serving
+    AP. load is the per-user serving AP load from serving_load.
+    Returns a dict of (n_users, n_steps) arrays, restricted to fields when
+    given. Retry draws are skipped when only users_per is asked for; any
+    other metric draws every attempt, so a seeded run returns the same
+    values whichever metrics are selected.
+    """
+    wanted = METRIC_FIELDS if fields is None else [f for f in METRIC_FIELDS if f in fields]
+    sampling = "retries" if set(wanted) - {"users_per"} else None
+
+    # SINR on each user's serving AP, shape (n_users, n_steps)
+    serving_sinr_dB = np.take_along_axis(sinr_matrix_all, handover_all[:, None, :] - 1, axis=1)[:, 0, :]
+
+    # Throughput for all users in one batched call
+    throughput_all, mac_all, per_all, retries_all, collisions_all = compute_throughput_from_dB(
+        serving_sinr_dB,
+        load,
+        packet_size_bytes=packet_size_bytes,
+        max_retries=max_retries,
+        rng=retry_rngs,
+        sampling=sampling
+    )
+
+    metrics = {
         "users_throughput": throughput_all,
         "users_mac_throughput": mac_all,
         "users_per": per_all,
         "users_retries": retries_all,
         "users_collision": collisions_all,
-        "users_distance": distance_all,
-        "time": list(range(1, n_steps+1))
     }
+    return {name: metrics[name] for name in wanted}
+
+
+# --- Output fields ---
+METRIC_FIELDS = ["users_throughput", "users_mac_throughput", "users_per",
+                 "users_retries", "users_collision"]
+OUTPUT_FIELDS = ["users_sinr", "users_handover"] + METRIC_FIELDS + ["users_distance"]
+
+
+# --- Simulation of one block of timesteps ---
+def _simulate_window(
+    aps,
+    user_positions,
+    path_loss_exp,
+    K0_dB,
+    K_decay,
+    shadow_sigma_dB,
+    hysteresis_dB,
+    packet_size_bytes,
+    max_retries,
+    handover_state=None,
+    fading_rngs=None,
+    retry_rngs=None,
+    time_to_trigger_steps=0,
+    radio_map_resolution=None,
+    interference_radius=None,
+    dtype=np.float64,
+    fields=None,
+    correlation=None
+):
+    """
+    Simulates a contiguous block of timesteps for all users.
+
+    handover_state: state returned for the previous block, or None for the
+    first block.
+    fading_rngs, retry_rngs: per-user Generators (see spawn_streams), or None
+    to use the global np.random state.
+    dtype: float64, or float32 to compute and store all float fields in
+    single precision.
+    fields: the OUTPUT_FIELDS to return, or None for all of them. Stages
+    that feed none of them are skipped.
+    correlation: channel.CorrelatedChannel carried from block to block, or
+    None for independent fading and shadowing.
+    Returns the block results as arrays and the handover state to pass to
+    the next block.
+    """
+    fields = OUTPUT_FIELDS if fields is None else fields
+    n_users, _, n_steps = user_positions.shape
+    with stage("distance", n_users=n_users, n_aps=len(aps), n_steps=n_steps):
+        dist_matrix = compute_distances(aps, user_positions, dtype)
+    result = {"users_distance": dist_matrix.transpose(1, 0, 2)}
+
+    metric_fields = [f for f in METRIC_FIELDS if f in fields]
+    if metric_fields or "users_sinr" in fields or "users_handover" in fields:
+        sinr_matrix_all, handover_all, n_users_on_ap, handover_state = sinr_and_handover_stage(
+            aps, dist_matrix, user_positions, path_loss_exp, K0_dB, K_decay,
+            shadow_sigma_dB, hysteresis_dB, handover_state, fading_rngs, time_to_trigger_steps,
+            radio_map_resolution, interference_radius, correlation
+        )
+        result["users_sinr"] = sinr_matrix_all
+        result["users_handover"] = handover_all
+    if metric_fields:
+        with stage("throughput", n_users=n_users, n_steps=n_steps):
+            load = serving_load(handover_all, n_users_on_ap)
+            result.update(throughput_stage(
+                sinr_matrix_all, handover_all, load, packet_size_bytes, max_retries, retry_rngs,
+                fields=metric_fields
+            ))
+
+    return {name: result[name] for name in OUTPUT_FIELDS if name in fields}, handover_state
+
+
+# --- Full simulation ---
+def simulate_multi_user_wifi_py(
+    aps,
+    user_positions,
+    path_loss_exp,
+    K0_dB,
+    K_decay,
+    shadow_sigma_dB,
+    hysteresis_dB,
+    packet_size_bytes,
+    max_retries,
+    streams=None,
+    time_to_trigger_steps=0,
+    radio_map_resolution=None,
+    interference_radius=None,
+    dtype=np.float64,
+    fields=None,
+    shadow_decorrelation_m=None,
+    fading_decorrelation_m=None
+):
+    """
+    Simulate multi-user WiFi network with per-user, per-AP adaptive MCS.
+
+    streams: random streams from spawn_streams; fresh entropy if None.
+    fields: the OUTPUT_FIELDS to compute and return; all if None.
+    shadow_decorrelation_m, fading_decorrelation_m: decorrelation distances
+    of time-correlated shadowing and fading (see channel.py); independent
+    draws every step if None.
+    """
+    n_users, _, n_steps = user_positions.shape
+    if streams is None:
+        streams = spawn_streams(None, n_users)
+    result, _ = _simulate_window(
+        aps,
+        user_positions,
+        path_loss_exp,
+        K0_dB,
+        K_decay,
+        shadow_sigma_dB,
+        hysteresis_dB,
+        packet_size_bytes,
+        max_retries,
+        fading_rngs=streams["fading"],
+        retry_rngs=streams["retry"],
+        time_to_trigger_steps=time_to_trigger_steps,
+        radio_map_resolution=radio_map_resolution,
+        interference_radius=interference_radius,
+        dtype=dtype,
+        fields=fields,
+        correlation=correlated_channel(shadow_decorrelation_m, fading_decorrelation_m)
+    )
+    result["time"] = np.arange(1, n_steps+1)
+    return result
+
+
+# --- Streaming simulation ---
+DEFAULT_WINDOW_STEPS = 600
+
+
+def simulate_multi_user_wifi_stream(
+    aps,
+    n_users,
+    n_steps,
+    velocity,
+    time_step,
+    path_loss_exp,
+    K0_dB,
+    K_decay,
+    shadow_sigma_dB,
+    hysteresis_dB,
+    packet_size_bytes,
+    max_retries,
+    window_steps=DEFAULT_WINDOW_STEPS,
+    seed=None,
+    time_to_trigger_steps=0,
+    radio_map_resolution=None,
+    interference_radius=None,
+    dtype=np.float64,
+    fields=None,
+    shadow_decorrelation_m=None,
+    fading_decorrelation_m=None
+):
+    """
+    Simulate multi-user WiFi network in fixed-size time windows.
+
+    Yields one result dict per window with the same fields as
+    simulate_multi_user_wifi_py, covering only that window's timesteps, plus
+    "window" and "n_windows". Mobility, handover and correlated channel
+    state carry across window boundaries, so peak memory is bounded by
+    window_steps rather than n_steps.
+    """
+    window_steps = max(1, int(window_steps))
+    n_windows = -(-n_steps // window_steps)
+    ap_positions = [ap["position"] for ap in aps]
+    streams = spawn_streams(seed, n_users)
+    rng = streams["mobility"]
+    positions, targets = init_user_mobility(n_users, ap_positions, rng)
+    handover_state = None
+    correlation = correlated_channel(shadow_decorrelation_m, fading_decorrelation_m)
+
+    for w in range(n_windows):
+        start = w * window_steps
+        stop = min(start + window_steps, n_steps)
+        with stage("mobility", n_users=n_users, n_steps=stop - start):
+            user_positions = advance_user_mobility(
+                positions, targets, stop - start, ap_positions, velocity, time_step, rng
+            )
+        chunk, handover_state = _simulate_window(
+            aps,
+            user_positions,
+            path_loss_exp,
+            K0_dB,
+            K_decay,
+            shadow_sigma_dB,
+            hysteresis_dB,
+            packet_size_bytes,
+            max_retries,
+            handover_state,
+            fading_rngs=streams["fading"],
+            retry_rngs=streams["retry"],
+            time_to_trigger_steps=time_to_trigger_steps,
+            radio_map_resolution=radio_map_resolution,
+            interference_radius=interference_radius,
+            dtype=dtype,
+            fields=fields,
+            correlation=correlation
+        )
+        chunk["time"] = np.arange(start+1, stop+1)
+        chunk["window"] = w
+        chunk["n_windows"] = n_windows
+        yield chunk
 
 
 # --- APS meta builder ---
@@ -385,41 +929,202 @@ def _to_serializable(obj):
     return obj
 
 # --- Flask adapter ---
-def run_multiuser_wifi_simulation(env):
+def _interference_radius(env):
+    """
+    interferenceRadius, or the radius implied by interferenceThresholdDBm;
+    None runs the exact interference sums.
+    """
+    if env.get("interferenceRadius") is not None:
+        return float(env["interferenceRadius"])
+    if env.get("interferenceThresholdDBm") is not None:
+        from interference import interference_radius_for_threshold
+        return interference_radius_for_threshold(
+            _build_aps_meta(env),
+            float(env.get("pathLossExponent", 3.0)),
+            float(env["interferenceThresholdDBm"])
+        )
+    return None
+
+
+def _simulation_params(env):
+    """
+    Extracts the simulation parameters shared by the full and streaming adapters.
+    """
     simulation_time = float(env["simulationTime"])
     time_step = float(env["timeStep"])
-    n_steps = int(simulation_time / time_step)
-    n_users = int(env["numberOfNodes"])
-    ap_positions = env["apPositions"]
-    velocity = float(env.get("velocity", 1.5))
-    path_loss_exp = float(env.get("pathLossExponent", 3.0))
-    hysteresis_dB = float(env.get("hysteresis_dB", 3.0))
-    K0_dB = float(env.get("K0dB", 5.0))
-    K_decay = float(env.get("KDecay", 0.1))
-    shadow_sigma_dB = float(env.get("shadowSigmaDB", 3.0))
-    packet_size_bytes = float(env.get("dataSize", 1500))
-    max_retries = int(env.get("maxRetries", 3))         
+    return {
+        "n_steps": int(simulation_time / time_step),
+        "n_users": int(env["numberOfNodes"]),
+        "velocity": float(env.get("velocity", 1.5)),
+        "time_step": time_step,
+        "path_loss_exp": float(env.get("pathLossExponent", 3.0)),
+        "hysteresis_dB": float(env.get("hysteresis_dB", 3.0)),
+        "K0_dB": float(env.get("K0dB", 5.0)),
+        "K_decay": float(env.get("KDecay", 0.1)),
+        "shadow_sigma_dB": float(env.get("shadowSigmaDB", 3.0)),
+        "packet_size_bytes": float(env.get("dataSize", 1500)),
+        "max_retries": int(env.get("maxRetries", 3)),
+        "time_to_trigger_steps": int(np.ceil(float(env.get("timeToTrigger", 0.0)) / time_step - 1e-9)),
+        "radio_map_resolution": env.get("radioMapResolution"),
+        "interference_radius": _interference_radius(env),
+        "dtype": np.dtype(env.get("precision", "float64")),
+        "shadow_decorrelation_m": env.get("shadowDecorrelationDistance"),
+        "fading_decorrelation_m": env.get("fadingDecorrelationDistance"),
+        "fields": env.get("fields"),
+        "mac_model": env.get("macModel", "analytic"),
+        "traffic_model": env.get("trafficModel", "saturated"),
+        "traffic_rate": float(env.get("trafficRate", 100.0)),
+        "seed": env.get("seed"),
+        "workers": env.get("workers"),
+    }
 
-    aps_meta = _build_aps_meta(env)
-    
-    user_positions = generate_realistic_user_positions(
-        n_users=n_users,
-        n_steps=n_steps,
-        ap_positions=ap_positions,
-        velocity=velocity,
-        time_step=time_step
-    )
-    
-    result = simulate_multi_user_wifi_py(
+
+def _simulate_full(env, aps_meta, params, fields):
+    """
+    Runs mobility and the serial or parallel pipeline in one pass. Returns
+    the result and the user positions.
+    """
+    from parallel import resolve_workers, simulate_multi_user_wifi_parallel
+
+    # Resolve an unseeded run to concrete entropy so parallel workers can
+    # re-derive the same per-user streams
+    seed = params["seed"]
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    streams = spawn_streams(seed, params["n_users"])
+
+    with stage("mobility", n_users=params["n_users"], n_steps=params["n_steps"]):
+        user_positions = generate_realistic_user_positions(
+            n_users=params["n_users"],
+            n_steps=params["n_steps"],
+            ap_positions=env["apPositions"],
+            velocity=params["velocity"],
+            time_step=params["time_step"],
+            seed=streams["mobility"]
+        )
+
+    model = dict(
         aps=aps_meta,
         user_positions=user_positions,
-        path_loss_exp=path_loss_exp,
-        K0_dB=K0_dB,
-        K_decay=K_decay,
-        shadow_sigma_dB=shadow_sigma_dB,
-        hysteresis_dB=hysteresis_dB,
-        packet_size_bytes=packet_size_bytes,
-        max_retries=max_retries
+        path_loss_exp=params["path_loss_exp"],
+        K0_dB=params["K0_dB"],
+        K_decay=params["K_decay"],
+        shadow_sigma_dB=params["shadow_sigma_dB"],
+        hysteresis_dB=params["hysteresis_dB"],
+        packet_size_bytes=params["packet_size_bytes"],
+        max_retries=params["max_retries"],
+        time_to_trigger_steps=params["time_to_trigger_steps"],
+        radio_map_resolution=params["radio_map_resolution"],
+        interference_radius=params["interference_radius"],
+        dtype=params["dtype"],
+        fields=fields,
+        shadow_decorrelation_m=params["shadow_decorrelation_m"],
+        fading_decorrelation_m=params["fading_decorrelation_m"]
+    )
+    workers = resolve_workers(params["workers"], params["n_users"], len(aps_meta), params["n_steps"])
+    if workers > 1:
+        result = simulate_multi_user_wifi_parallel(seed=seed, workers=workers, **model)
+    else:
+        result = simulate_multi_user_wifi_py(streams=streams, **model)
+    return result, user_positions
+
+
+def run_multiuser_wifi_simulation(env, serialize=True, stage_store=None):
+    """
+    Runs the full simulation for an environment built by build_environment.
+    With serialize=False the result keeps its NumPy arrays.
+
+    With a stage_store (see stage_cache.StageStore), seeded runs not
+    explicitly sharded over workers reuse the cached stages of earlier runs
+    and recompute only the stages whose inputs changed.
+
+    With macModel "csma", users_mac_throughput comes from the event-driven
+    MAC simulator (see mac.py) instead of the analytic airtime share, and
+    the result gains its "mac" summary.
+    """
+    params = _simulation_params(env)
+    aps_meta = _build_aps_meta(env)
+    fields = params["fields"]
+    # The pruning error report compares against the exact interference of
+    # every AP, so it is only computed on request
+    pruning = params["interference_radius"] is not None and bool(env.get("pruningReport"))
+    csma = params["mac_model"] == "csma" and (fields is None or "users_mac_throughput" in fields)
+    if pruning and fields is not None:
+        # The pruning report needs distances and serving APs
+        fields = sorted(set(fields) | {"users_distance", "users_handover"})
+    if csma and fields is not None:
+        # The MAC simulator is driven by the SINR and serving APs
+        fields = sorted(set(fields) | {"users_sinr", "users_handover"})
+
+    if stage_store is not None and params["seed"] is not None and params["workers"] in (None, 1):
+        from stage_cache import simulate_staged
+        result, user_positions = simulate_staged(env, aps_meta, params, stage_store, fields)
+    else:
+        result, user_positions = _simulate_full(env, aps_meta, params, fields)
+
+    if pruning:
+        from interference import interference_pruning_error
+        with stage("pruning_error"):
+            result["interference_pruning"] = interference_pruning_error(
+                aps_meta,
+                user_positions,
+                result["users_distance"].transpose(1, 0, 2),
+                result["users_handover"],
+                params["path_loss_exp"],
+                params["interference_radius"]
+            )
+
+    if csma:
+        from mac import make_traffic, simulate_csma_for_result
+        seed = params["seed"]
+        traffic = make_traffic(params["traffic_model"], params["traffic_rate"],
+                               int(params["packet_size_bytes"]))
+        with stage("mac", n_users=params["n_users"], n_steps=params["n_steps"]):
+            result.update(simulate_csma_for_result(
+                result, len(aps_meta), params["time_step"], traffic,
+                retry_limit=params["max_retries"],
+                rng=spawn_streams(seed, 0)["mac"] if seed is not None else None
+            ))
+
+    if params["fields"] is not None and (pruning or csma):
+        result = {name: value for name, value in result.items()
+                  if name in params["fields"] or name in ("time", "interference_pruning", "mac")}
+
+    if not serialize:
+        return result
+    with stage("serialization"):
+        return _to_serializable(result)
+
+
+def run_multiuser_wifi_simulation_stream(env, window_steps=None, serialize=True):
+    """
+    Streaming counterpart of run_multiuser_wifi_simulation: yields one
+    JSON-serializable result chunk per time window (raw arrays with
+    serialize=False).
+    """
+    if window_steps is None:
+        window_steps = int(env.get("windowSteps", DEFAULT_WINDOW_STEPS))
+    params = _simulation_params(env)
+    params.pop("workers")  # windows are small enough to run serially
+    for name in ("mac_model", "traffic_model", "traffic_rate"):
+        params.pop(name)  # windows use the analytic MAC
+    chunks = simulate_multi_user_wifi_stream(
+        aps=_build_aps_meta(env),
+        window_steps=window_steps,
+        **params
     )
-    
-    return _to_serializable(result)
+    for chunk in chunks:
+        yield _to_serializable(chunk) if serialize else chunk
+
+
+def merge_chunks(chunks):
+    """
+    Joins raw streamed chunks into one result with the same layout as
+    simulate_multi_user_wifi_py, concatenating every field along time.
+    """
+    chunks = list(chunks)
+    return {
+        name: np.concatenate([c[name] for c in chunks], axis=-1)
+        for name, value in chunks[0].items()
+        if isinstance(value, np.ndarray)
+    }
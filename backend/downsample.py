@@ -0,0 +1,232 @@
+"""
+Server-side reduction of simulation time series for dashboard responses.
+
+A full result holds one sample per timestep for every user (and user-AP
+pair), far more than a chart can draw. reduce_result shrinks every time
+series to about `points` samples, so payload size follows the chart width
+instead of the simulation length:
+
+- "mean": bucket averages over `points` equal time buckets.
+- "minmax": bucket averages plus a min/max envelope of every bucket.
+- "lttb": Largest-Triangle-Three-Buckets, which keeps the actual samples
+  that best preserve each series' shape. Every series picks its own
+  timesteps, which are returned alongside.
+
+Optionally it adds per-AP aggregates and percentile bands across users, on
+the same time buckets. All reductions are vectorized over series; only
+LTTB loops, once per output point.
+"""
+import numpy as np
+
+from core_simulation import _float_dtype, users_per_ap
+from instrumentation import stage
+
+METHODS = ("mean", "minmax", "lttb")
+PERCENTILES = (5, 50, 95)
+DEFAULT_POINTS = 1000
+
+# Per-step result fields: (n_users, n_steps) and (n_users, n_aps, n_steps)
+USER_FIELDS = ["users_throughput", "users_mac_throughput", "users_per",
+               "users_retries", "users_collision"]
+USER_AP_FIELDS = ["users_sinr", "users_distance"]
+# Categorical fields are sampled at the last step of each bucket, not averaged
+CATEGORICAL_FIELDS = ["users_handover"]
+
+
+# --- Time buckets ---
+def bucket_edges(n_steps, n_buckets):
+    """
+    Start indices of n_buckets contiguous, non-empty buckets covering
+    n_steps steps, plus n_steps as the final edge.
+    """
+    n_buckets = max(1, min(int(n_buckets), n_steps))
+    return np.linspace(0, n_steps, n_buckets + 1).astype(np.intp)
+
+
+def bucket_mean(values, edges):
+    """
+    Mean of values over each bucket along the last axis, in the precision
+    of values. edges[-1] must be the length of that axis.
+    """
+    return np.add.reduceat(values, edges[:-1], axis=-1) / np.diff(edges).astype(_float_dtype(values))
+
+
+def bucket_time(time, edges):
+    """
+    Mean step time of each bucket.
+    """
+    return (time[edges[:-1]] + time[edges[1:] - 1]) / 2
+
+
+def bucket_min_max(values, edges):
+    return (np.minimum.reduceat(values, edges[:-1], axis=-1),
+            np.maximum.reduceat(values, edges[:-1], axis=-1))
+
+
+# --- LTTB ---
+def lttb_indices(values, n_points):
+    """
+    values: shape (n_series, n_steps)
+    Returns the timestep indices LTTB keeps for every series, shape
+    (n_series, n_points). The first and last steps are always kept.
+    """
+    n_series, n_steps = values.shape
+    if n_points >= n_steps:
+        return np.broadcast_to(np.arange(n_steps), (n_series, n_steps))
+
+    # n_points - 2 buckets over the inner steps, plus the fixed end points
+    edges = np.linspace(1, n_steps - 1, n_points - 1).astype(np.intp)
+    x = np.arange(n_steps, dtype=float)
+    avg_x = np.append(bucket_mean(x[:-1], edges), n_steps - 1)
+    avg_y = np.concatenate([bucket_mean(values[:, :-1], edges), values[:, -1:]], axis=1)
+
+    rows = np.arange(n_series)
+    indices = np.empty((n_series, n_points), dtype=np.intp)
+    indices[:, 0] = 0
+    indices[:, -1] = n_steps - 1
+    prev_x = np.zeros(n_series)
+    prev_y = values[:, 0]
+    for b in range(n_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        seg = values[:, lo:hi]
+        # Twice the triangle area between the previous pick, each candidate
+        # and the next bucket's average
+        area = np.abs(
+            (prev_x - avg_x[b + 1])[:, None] * (seg - prev_y[:, None])
+            - (prev_x[:, None] - x[lo:hi]) * (avg_y[:, b + 1] - prev_y)[:, None]
+        )
+        pick = np.argmax(area, axis=1)
+        indices[:, b + 1] = lo + pick
+        prev_x = x[lo + pick]
+        prev_y = seg[rows, pick]
+    return indices
+
+
+# --- Aggregates ---
+def ap_aggregates(result, edges):
+    """
+    Per-AP series on the given time buckets, each of shape (n_aps, n_buckets):
+    mean number of users served, total MAC throughput of the users served,
+    and mean SINR towards the AP across all users. The throughput series is
+    left out when the result has no MAC throughput.
+    """
+    handover = result["users_handover"]
+    n_users, n_aps, n_steps = result["users_sinr"].shape
+    aggregates = {
+        "time": bucket_time(result["time"], edges),
+        "users_served": bucket_mean(users_per_ap(handover, n_aps), edges),
+        "sinr_dB_mean": bucket_mean(result["users_sinr"].mean(axis=0), edges),
+    }
+    if "users_mac_throughput" in result:
+        flat = ((handover - 1) * n_steps + np.arange(n_steps)).ravel()
+        served_throughput = np.bincount(
+            flat, weights=result["users_mac_throughput"].ravel(), minlength=n_aps * n_steps
+        ).reshape(n_aps, n_steps)
+        aggregates["mac_throughput_bps"] = bucket_mean(served_throughput, edges)
+    return aggregates
+
+
+def percentile_bands(result, edges, percentiles=PERCENTILES):
+    """
+    Percentiles across users of serving SINR, throughput and MAC throughput
+    at every step, averaged over the given time buckets. Series missing from
+    the result are left out.
+    """
+    handover = result["users_handover"]
+    serving_sinr = np.take_along_axis(result["users_sinr"], handover[:, None, :] - 1, axis=1)[:, 0, :]
+    series = {"serving_sinr_dB": serving_sinr}
+    for name, field in (("throughput_bps", "users_throughput"),
+                        ("mac_throughput_bps", "users_mac_throughput")):
+        if field in result:
+            series[name] = result[field]
+    bands = {"time": bucket_time(result["time"], edges)}
+    for name, values in series.items():
+        per_step = np.percentile(values, percentiles, axis=0)
+        bands[name] = {f"p{q}": bucket_mean(band, edges) for q, band in zip(percentiles, per_step)}
+    return bands
+
+
+# --- Result reduction ---
+def reduce_result(result, method="minmax", points=DEFAULT_POINTS, ap_stats=False, bands=False):
+    """
+    Returns a copy of a raw single-run result with every per-step field
+    reduced to at most `points` samples along time (see module docstring),
+    or left at full resolution with method=None.
+
+    "time" becomes the mean step of each bucket. "minmax" adds an
+    "envelope" {field: {"min", "max"}}, "lttb" a "lttb_time" {field: steps}
+    with the step of every kept sample. ap_stats adds "ap_aggregates" and
+    bands adds "percentile_bands", each on the time buckets with its own
+    "time" member.
+    """
+    if method is not None and method not in METHODS:
+        raise ValueError(f"unknown downsampling method {method!r}")
+    time = result["time"]
+    n_steps = time.shape[0]
+    edges = bucket_edges(n_steps, points)
+    ends = edges[1:] - 1
+    reduced = dict(result)
+
+    if ap_stats and "users_sinr" in result:
+        reduced["ap_aggregates"] = ap_aggregates(result, edges)
+    if bands and "users_sinr" in result:
+        reduced["percentile_bands"] = percentile_bands(result, edges)
+    if method is None:
+        return reduced
+
+    reduced["time"] = bucket_time(time, edges)
+    if method == "lttb":
+        reduced["lttb_time"] = {}
+    elif method == "minmax":
+        reduced["envelope"] = {}
+    for name in USER_FIELDS + USER_AP_FIELDS:
+        if name not in result:
+            continue
+        values = result[name]
+        if method == "lttb":
+            rows = values.reshape(-1, n_steps)
+            idx = lttb_indices(rows, points)
+            reduced[name] = np.take_along_axis(rows, idx, axis=1).reshape(values.shape[:-1] + (-1,))
+            reduced["lttb_time"][name] = time[idx].reshape(reduced[name].shape)
+            continue
+        reduced[name] = bucket_mean(values, edges)
+        if method == "minmax":
+            low, high = bucket_min_max(values, edges)
+            reduced["envelope"][name] = {"min": low, "max": high}
+    for name in CATEGORICAL_FIELDS:
+        if name in result:
+            reduced[name] = result[name][..., ends]
+    return reduced
+
+
+def reduce_for_request(result, env):
+    """
+    Applies the downsampling options of env (downsample, downsamplePoints,
+    apAggregates, percentileBands) to a raw single-run result. Results
+    without per-user series, such as Monte Carlo summaries, pass through.
+    """
+    if "time" not in result or "realizations" in result or not (
+        env.get("downsample") or env.get("apAggregates") or env.get("percentileBands")
+    ):
+        return result
+    with stage("downsample", n_steps=result["time"].shape[0]):
+        return reduce_result(
+            result,
+            method=env.get("downsample"),
+            points=env.get("downsamplePoints", DEFAULT_POINTS),
+            ap_stats=env.get("apAggregates", False),
+            bands=env.get("percentileBands", False),
+        )
+
+
+def reduce_chunks_for_request(chunks, env):
+    """
+    reduce_for_request over raw streamed chunks. downsamplePoints is shared
+    between the chunks in proportion to their length, so the whole stream
+    carries about as many points as the equivalent full result.
+    """
+    n_steps = int(float(env["simulationTime"]) / float(env["timeStep"]))
+    points = env.get("downsamplePoints", DEFAULT_POINTS)
+    for chunk in chunks:
+        share = max(3, -(-points * len(chunk["time"]) // n_steps))
+        yield reduce_for_request(chunk, dict(env, downsamplePoints=share))
@@ -19,6 +19,36 @@ def build_environment(data: dict):
     max_retries = int(data.get("maxRetries", 3))
     antenna_gains = data.get("antennaGains", [0] * num_aps)
     beamwidths = data.get("beamwidths", [360] * num_aps)
+    window_steps = int(data.get("windowSteps", 600))
+    seed = data.get("seed")
+    seed = None if seed is None else int(seed)
+    workers = data.get("workers")
+    workers = None if workers is None else int(workers)
+    hysteresis_dB = float(data.get("hysteresis_dB", 3.0))
+    time_to_trigger = float(data.get("timeToTrigger", 0.0))
+    realizations = int(data.get("realizations", 1))
+    per_realization = bool(data.get("perRealization", False))
+    radio_map_resolution = data.get("radioMapResolution")
+    radio_map_resolution = None if radio_map_resolution is None else float(radio_map_resolution)
+    interference_radius = data.get("interferenceRadius")
+    interference_radius = None if interference_radius is None else float(interference_radius)
+    interference_threshold = data.get("interferenceThresholdDBm")
+    interference_threshold = None if interference_threshold is None else float(interference_threshold)
+    pruning_report = bool(data.get("pruningReport", False))
+    precision = str(data.get("precision", "float64"))
+    downsample = data.get("downsample")
+    downsample_points = int(data.get("downsamplePoints", 1000))
+    ap_aggregates = bool(data.get("apAggregates", False))
+    percentile_bands = bool(data.get("percentileBands", False))
+    fields = data.get("fields")
+    fields = None if fields is None else sorted(set(fields))
+    mac_model = str(data.get("macModel", "analytic"))
+    traffic_model = str(data.get("trafficModel", "saturated"))
+    traffic_rate = float(data.get("trafficRate", 100.0))
+    shadow_decorrelation = data.get("shadowDecorrelationDistance")
+    shadow_decorrelation = None if shadow_decorrelation is None else float(shadow_decorrelation)
+    fading_decorrelation = data.get("fadingDecorrelationDistance")
+    fading_decorrelation = None if fading_decorrelation is None else float(fading_decorrelation)
 
     beamwidths = [float(b) for b in beamwidths]
     antenna_gains = [float(g) for g in antenna_gains]
@@ -44,5 +74,27 @@ def build_environment(data: dict):
         "shadowSigmaDB": shadow_sigma_dB,
         "maxRetries": max_retries,
         "antennaGains": antenna_gains,
-        "beamwidths": beamwidths
+        "beamwidths": beamwidths,
+        "windowSteps": window_steps,
+        "seed": seed,
+        "workers": workers,
+        "hysteresis_dB": hysteresis_dB,
+        "timeToTrigger": time_to_trigger,
+        "realizations": realizations,
+        "perRealization": per_realization,
+        "radioMapResolution": radio_map_resolution,
+        "interferenceRadius": interference_radius,
+        "interferenceThresholdDBm": interference_threshold,
+        "pruningReport": pruning_report,
+        "precision": precision,
+        "downsample": downsample,
+        "downsamplePoints": downsample_points,
+        "apAggregates": ap_aggregates,
+        "percentileBands": percentile_bands,
+        "fields": fields,
+        "macModel": mac_model,
+        "trafficModel": traffic_model,
+        "trafficRate": traffic_rate,
+        "shadowDecorrelationDistance": shadow_decorrelation,
+        "fadingDecorrelationDistance": fading_decorrelation
     }
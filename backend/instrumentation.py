@@ -0,0 +1,209 @@
+"""
+Hot-path instrumentation of the simulation pipeline.
+
+Pipeline stages are wrapped in `with stage("sinr", n_users=..., ...):`.
+Each finished stage is observed in a per-stage latency histogram that
+/metrics exposes in the Prometheus text format. Inside collect_timings() the
+stage is also recorded with its wall time, the sizes passed to stage() and,
+with memory=True, its peak traced memory.
+
+watch_stages(callback) reports every stage start and end in its context
+to callback, which is how jobs track progress and stop when cancelled.
+
+With metrics disabled (NETVISOR_METRICS=0) and no active collect_timings()
+or watch_stages(), stage() returns a shared no-op context manager and costs
+a flag check and two context-variable lookups.
+"""
+import bisect
+import contextvars
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Histogram bucket upper bounds (Prometheus "le")
+STAGE_BUCKETS_S = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Request size classes by number of user-AP-step samples (powers of ten)
+SIZE_BUCKETS = (10**4, 10**5, 10**6, 10**7, 10**8)
+
+METRICS_ENABLED = os.environ.get("NETVISOR_METRICS", "1") != "0"
+
+_collector = contextvars.ContextVar("netvisor_timings", default=None)
+_listener = contextvars.ContextVar("netvisor_stage_listener", default=None)
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus histogram with one series per label set.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(s["counts"]), s["sum"]) for labels, s in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return "\n".join(lines)
+
+
+stage_seconds = Histogram(
+    "netvisor_stage_seconds", "Wall time of simulation pipeline stages.", ["stage"], STAGE_BUCKETS_S
+)
+request_seconds = Histogram(
+    "netvisor_request_seconds", "Wall time of simulation requests by endpoint and size class.",
+    ["endpoint", "size"], STAGE_BUCKETS_S
+)
+
+
+def size_class(samples):
+    """
+    Label of the SIZE_BUCKETS class holding a request of this many samples.
+    """
+    def fmt(n):
+        return f"1e{round(math.log10(n))}"
+
+    i = bisect.bisect_left(SIZE_BUCKETS, samples)
+    if i == 0:
+        return f"<={fmt(SIZE_BUCKETS[0])}"
+    if i == len(SIZE_BUCKETS):
+        return f">{fmt(SIZE_BUCKETS[-1])}"
+    return f"{fmt(SIZE_BUCKETS[i-1])}-{fmt(SIZE_BUCKETS[i])}"
+
+
+class _Stage:
+    __slots__ = ("name", "sizes", "records", "memory", "listener", "start", "mem_start")
+
+    def __init__(self, name, sizes, records, memory, listener=None):
+        self.name = name
+        self.sizes = sizes
+        self.records = records
+        self.memory = memory
+        self.listener = listener
+
+    def __enter__(self):
+        if self.listener is not None:
+            self.listener(self.name, False)
+        if self.memory:
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        if METRICS_ENABLED:
+            stage_seconds.observe(seconds, self.name)
+        if self.records is not None:
+            record = {"stage": self.name, "seconds": seconds, **self.sizes}
+            if self.memory:
+                record["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - self.mem_start)
+            self.records.append(record)
+        if self.listener is not None and exc[0] is None:
+            self.listener(self.name, True)
+        return False
+
+
+def stage(name, **sizes):
+    """
+    Context manager timing one pipeline stage; sizes (e.g. n_users=...) are
+    attached to the collected record. Stages must not nest while memory is
+    traced, since each stage resets the traced peak.
+    """
+    collector = _collector.get()
+    listener = _listener.get()
+    if collector is None:
+        if listener is None and not METRICS_ENABLED:
+            return _NOOP
+        return _Stage(name, sizes, None, False, listener)
+    return _Stage(name, sizes, collector[0], collector[1], listener)
+
+
+@contextmanager
+def watch_stages(callback):
+    """
+    Calls callback(name, finished) as each stage run in this context starts
+    (finished=False) and completes (finished=True). An exception raised by
+    the callback at the start of a stage aborts the run before the stage.
+    """
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+@contextmanager
+def collect_timings(memory=False):
+    """
+    Collects the stages run in this context (thread or task) into the
+    yielded list. memory=True also traces peak memory per stage, which slows
+    down allocations while active; the peak is process-wide, so concurrent
+    traced requests see each other's allocations.
+    """
+    global _tracing_users, _tracing_owned
+    records = []
+    if memory:
+        with _tracing_lock:
+            if _tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_owned = True
+            _tracing_users += 1
+    token = _collector.set((records, memory))
+    try:
+        yield records
+    finally:
+        _collector.reset(token)
+        if memory:
+            with _tracing_lock:
+                _tracing_users -= 1
+                if _tracing_users == 0 and _tracing_owned:
+                    tracemalloc.stop()
+                    _tracing_owned = False
+
+
+def observe_request(endpoint, seconds, samples):
+    if METRICS_ENABLED:
+        request_seconds.observe(seconds, endpoint, size_class(samples))
+
+
+def render_metrics():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    return "\n".join([stage_seconds.render(), request_seconds.render()]) + "\n"
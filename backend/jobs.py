@@ -0,0 +1,214 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from core_simulation import run_multiuser_wifi_simulation
+from instrumentation import watch_stages
+from monte_carlo import run_monte_carlo_simulation
+from result_format import flatten_result, unflatten_result
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+# Progress reported once each pipeline stage completes
+STAGE_PROGRESS = {
+    "mobility": 0.1,
+    "distance": 0.2,
+    "sinr": 0.6,
+    "handover": 0.7,
+    "sinr_handover": 0.7,
+    "throughput": 0.8,
+    "pruning_error": 0.85,
+    "mac": 0.9,
+    "downsample": 0.95,
+}
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is submitted while the queue is at its depth limit.
+    """
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a worker when its running job has been cancelled.
+    """
+
+
+def run_simulation(env):
+    """
+    Raw result of a single or Monte Carlo simulation of env.
+    """
+    if env.get("realizations", 1) > 1:
+        return run_monte_carlo_simulation(env, serialize=False)
+    return run_multiuser_wifi_simulation(env, serialize=False)
+
+
+class JobManager:
+    """
+    Runs simulations in the background on a bounded pool of worker threads.
+
+    At most max_queue jobs wait for a worker; further submissions raise
+    JobQueueFull. Each job calls runner(env) (run_simulation by default),
+    reports progress as its pipeline stages complete, and stops at the next
+    stage boundary when it is cancelled. Results are kept in memory, or
+    written to storage_dir as .npz files when it is set. Only the most
+    recent max_finished finished jobs are retained.
+    """
+
+    def __init__(self, max_workers=2, max_queue=16, storage_dir=None, max_finished=100,
+                 runner=None):
+        self.runner = run_simulation if runner is None else runner
+        self.max_workers = int(max_workers)
+        self.max_finished = int(max_finished)
+        self.storage_dir = storage_dir
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._jobs = OrderedDict()
+        self._results = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        if storage_dir:
+            os.makedirs(storage_dir, exist_ok=True)
+
+    def _start_workers(self):
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, env):
+        """
+        Queues a simulation of env and returns its job id.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "progress": 0.0,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "cancel": threading.Event(),
+        }
+        with self._lock:
+            try:
+                self._queue.put_nowait((job_id, env))
+            except queue.Full:
+                raise JobQueueFull(f"job queue is full ({self._queue.maxsize} jobs waiting)")
+            self._jobs[job_id] = job
+            self._start_workers()
+        return job_id
+
+    def status(self, job_id):
+        """
+        Returns the public status of a job, or None for an unknown id.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != "cancel"}
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued or running job. Returns False for an unknown id.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job["cancel"].set()
+            if job["status"] == QUEUED:
+                self._finish(job, CANCELLED)
+            return True
+
+    def result(self, job_id):
+        """
+        Returns the raw result of a finished job, or None if it has none.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != DONE:
+                return None
+            result = self._results.get(job_id)
+        if result is None and self.storage_dir:
+            with np.load(self._result_path(job_id)) as npz:
+                result = unflatten_result({name: npz[name] for name in npz.files})
+        return result
+
+    def _result_path(self, job_id):
+        return os.path.join(self.storage_dir, f"{job_id}.npz")
+
+    def _finish(self, job, status, error=None):
+        # Caller holds self._lock
+        job["status"] = status
+        job["error"] = error
+        job["finished"] = time.time()
+        if self.storage_dir:
+            with open(os.path.join(self.storage_dir, f"{job['id']}.json"), "w") as f:
+                json.dump({k: v for k, v in job.items() if k != "cancel"}, f)
+        self._evict_finished()
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            self._results.pop(job_id, None)
+            if self.storage_dir:
+                for ext in ("npz", "json"):
+                    path = os.path.join(self.storage_dir, f"{job_id}.{ext}")
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def _run(self, job, env):
+        def on_stage(name, finished):
+            if not finished:
+                if job["cancel"].is_set():
+                    raise JobCancelled()
+                return
+            with self._lock:
+                job["progress"] = max(job["progress"], STAGE_PROGRESS.get(name, 0.0))
+
+        with watch_stages(on_stage):
+            result = self.runner(env)
+        if job["cancel"].is_set():
+            raise JobCancelled()
+        with self._lock:
+            job["progress"] = 1.0
+        return result
+
+    def _worker(self):
+        while True:
+            job_id, env = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != QUEUED:
+                    continue
+                job["status"] = RUNNING
+                job["started"] = time.time()
+            try:
+                result = self._run(job, env)
+                if self.storage_dir:
+                    np.savez(self._result_path(job_id), **flatten_result(result))
+                with self._lock:
+                    if not self.storage_dir:
+                        self._results[job_id] = result
+                    self._finish(job, DONE)
+            except JobCancelled:
+                with self._lock:
+                    self._finish(job, CANCELLED)
+            except Exception as exc:
+                with self._lock:
+                    self._finish(job, FAILED, str(exc))
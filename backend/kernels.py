@@ -0,0 +1,214 @@
+"""
+Fused received-power and SINR kernels.
+
+Received power is computed in the linear domain,
+
+    rx = A * (d + 1e-12)**-n * (|s + sigma*z1 + j*sigma*z2|**2 * exp(c*z3) + 1e-12)
+
+with A the AP's transmit power over the free-space loss at 1 m, n the path
+loss exponent, s and sigma the Rician parameters of the distance-dependent
+K-factor and c*z3 the log-normal shadowing, instead of converting between
+dB and linear at every step. Every operation writes into a buffer with
+out=, so a call allocates nothing but its result.
+
+compute_sinr_batch processes users in blocks of about BLOCK_BYTES per
+buffer, which keeps the working set in cache, and takes the buffers from a
+per-thread workspace that is reused across calls: streaming windows,
+parallel shards and sweep points repeat the same shapes.
+
+When numba is installed the SINR kernel runs as one compiled loop over
+samples, with no temporaries at all. NETVISOR_KERNEL=numpy forces the
+NumPy kernel.
+"""
+import math
+import os
+import threading
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+LN10_10 = math.log(10) / 10
+BLOCK_BYTES = 4 * 2**20
+
+KERNEL = os.environ.get("NETVISOR_KERNEL") or ("numba" if numba is not None else "numpy")
+
+_local = threading.local()
+
+
+# --- Workspace ---
+def workspace_buffer(name, shape, dtype):
+    """
+    A per-thread scratch array of the given shape and dtype. The storage
+    behind name is reused while it is large enough, so the contents are
+    only valid until the next request for the same name.
+    """
+    buffers = _local.__dict__.setdefault("buffers", {})
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape))
+    flat = buffers.get((name, dtype))
+    if flat is None or flat.size < size:
+        flat = buffers[(name, dtype)] = np.empty(size, dtype=dtype)
+    return flat[:size].reshape(shape)
+
+
+def clear_workspace():
+    _local.__dict__.pop("buffers", None)
+
+
+def users_per_block(n_aps, n_steps, dtype):
+    return max(1, BLOCK_BYTES // (n_aps * n_steps * np.dtype(dtype).itemsize))
+
+
+# --- Per-AP constants ---
+def log_amplitude(tx_power_dBm, frequency_Hz, dtype=np.float64):
+    """
+    Natural log of the linear received power at 1 m: transmit power minus
+    the free-space loss at the reference distance.
+    """
+    pl_d0_dB = 20 * np.log10(4 * np.pi * np.asarray(frequency_Hz, dtype=float) / 3e8)
+    return (LN10_10 * (np.asarray(tx_power_dBm, dtype=float) - pl_d0_dB)).astype(dtype)
+
+
+def noise_power(bandwidth_Hz, dtype=np.float64):
+    """
+    Linear thermal noise power (mW) with a 7 dB noise figure.
+    """
+    noise_dBm = -174 + 10 * np.log10(np.asarray(bandwidth_Hz, dtype=float)) + 7
+    return np.exp(LN10_10 * noise_dBm).astype(dtype)
+
+
+# --- NumPy kernels ---
+def rician_fading_into(dist, z, K0_dB, K_decay, shadow_sigma_dB, out, tmp, tmp2):
+    """
+    Writes the linear Rician fading times log-normal shadowing power of
+    every sample of dist into out, from the standard normal draws z[0]
+    (in-phase), z[1] (quadrature) and z[2] (shadowing). tmp and tmp2 are
+    scratch buffers shaped like dist.
+    """
+    # K-factor: K = 10**(K0_dB * exp(-K_decay * d) / 10)
+    np.multiply(dist, -K_decay, out=tmp)
+    np.exp(tmp, out=tmp)
+    tmp *= LN10_10 * K0_dB
+    np.exp(tmp, out=tmp)
+    np.add(tmp, 1, out=tmp2)
+    # s = sqrt(K / (K + 1)), sigma = sqrt(1 / (2 (K + 1)))
+    np.divide(tmp, tmp2, out=tmp)
+    np.sqrt(tmp, out=tmp)
+    np.divide(0.5, tmp2, out=tmp2)
+    np.sqrt(tmp2, out=tmp2)
+
+    np.multiply(z[0], tmp2, out=out)
+    out += tmp
+    np.square(out, out=out)
+    np.multiply(z[1], tmp2, out=tmp)
+    np.square(tmp, out=tmp)
+    out += tmp
+
+    np.multiply(z[2], LN10_10 * shadow_sigma_dB, out=tmp)
+    np.exp(tmp, out=tmp)
+    out *= tmp
+    return out
+
+
+def received_power_into(dist, z, log_amp, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+                        out, tmp, tmp2):
+    """
+    Writes the linear received power (mW) of every sample into out; log_amp
+    (see log_amplitude) broadcasts against dist.
+    """
+    rician_fading_into(dist, z, K0_dB, K_decay, shadow_sigma_dB, out, tmp, tmp2)
+    out += 1e-12
+    np.add(dist, 1e-12, out=tmp)
+    np.log(tmp, out=tmp)
+    tmp *= -path_loss_exp
+    tmp += log_amp
+    np.exp(tmp, out=tmp)
+    out *= tmp
+    return out
+
+
+def _sinr_numpy(dist, z, log_amp, gain, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+                factors, noise, out):
+    n_aps = dist.shape[0]
+    dtype = out.dtype
+    rx = workspace_buffer("rx", dist.shape, dtype)
+    tmp = workspace_buffer("tmp", dist.shape, dtype)
+    tmp2 = workspace_buffer("tmp2", dist.shape, dtype)
+    received_power_into(dist, z, log_amp[:, None, None], path_loss_exp, K0_dB, K_decay,
+                        shadow_sigma_dB, rx, tmp, tmp2)
+    if gain is not None:
+        rx *= gain
+
+    # Interference at serving AP i: sum_j factor[i, j] * rx[j], plus noise
+    np.matmul(factors, rx.reshape(n_aps, -1), out=tmp.reshape(n_aps, -1))
+    tmp += noise[:, None, None]
+    np.divide(rx, tmp, out=out.transpose(1, 0, 2))
+    return out
+
+
+# --- Compiled kernel ---
+def _sinr_loops(dist, z, log_amp, gain, has_gain, path_loss_exp, K0_dB, K_decay, shadow_c,
+                factors, noise, out):
+    """
+    Per-sample loop form of _sinr_numpy, compiled with numba when available.
+    """
+    n_aps, n_users, n_steps = dist.shape
+    rx = np.empty(n_aps)
+    k_scale = LN10_10 * K0_dB
+    for u in range(n_users):
+        for t in range(n_steps):
+            for j in range(n_aps):
+                d = dist[j, u, t]
+                K = math.exp(k_scale * math.exp(-K_decay * d))
+                s = math.sqrt(K / (K + 1.0))
+                sigma = math.sqrt(0.5 / (K + 1.0))
+                re = s + sigma * z[0, j, u, t]
+                im = sigma * z[1, j, u, t]
+                fading = (re * re + im * im) * math.exp(shadow_c * z[2, j, u, t]) + 1e-12
+                rx[j] = fading * math.exp(log_amp[j] - path_loss_exp * math.log(d + 1e-12))
+                if has_gain:
+                    rx[j] *= gain[j, u, t]
+            for i in range(n_aps):
+                interference = 0.0
+                for j in range(n_aps):
+                    interference += factors[i, j] * rx[j]
+                out[u, i, t] = rx[i] / (interference + noise[i])
+    return out
+
+
+if numba is not None:
+    _sinr_compiled = numba.njit(cache=True)(_sinr_loops)
+
+
+def fused_sinr(dist, z, log_amp, factors, noise, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+               gain=None, out=None, kernel=None):
+    """
+    Linear SINR of a block of users towards every AP.
+
+    dist: distances, shape (n_aps, n_users, n_steps); z: standard normal
+    draws, shape (3, n_aps, n_users, n_steps); log_amp, noise: per-AP
+    log_amplitude and noise_power plus any floor added to the denominator;
+    factors: interference_factor_matrix; gain: optional linear antenna
+    gain shaped like dist. Writes into and returns out, shape (n_users,
+    n_aps, n_steps), in the dtype of out (dist's float dtype if None).
+    """
+    kernel = KERNEL if kernel is None else kernel
+    n_aps, n_users, n_steps = dist.shape
+    if out is None:
+        out = np.empty((n_users, n_aps, n_steps), dtype=np.result_type(dist.dtype, np.float32))
+    dtype = out.dtype
+    log_amp = np.asarray(log_amp, dtype=dtype)
+    factors = np.asarray(factors, dtype=dtype)
+    noise = np.asarray(noise, dtype=dtype)
+
+    if kernel == "numba" and numba is not None:
+        has_gain = gain is not None
+        gain = np.asarray(gain, dtype=dtype) if has_gain else np.ones((1, 1, 1), dtype=dtype)
+        return _sinr_compiled(dist, z, log_amp, gain, has_gain, float(path_loss_exp), float(K0_dB),
+                              float(K_decay), LN10_10 * float(shadow_sigma_dB), factors, noise, out)
+    return _sinr_numpy(dist, z, log_amp, gain, path_loss_exp, K0_dB, K_decay, shadow_sigma_dB,
+                       factors, noise, out)
@@ -0,0 +1,325 @@
+"""
+Discrete-event CSMA/CA MAC simulator.
+
+Replaces the analytic 1 / n_users_on_ap MAC share with an 802.11 DCF model
+driven by the SINR and handover results of a simulation. Each AP is one
+contention domain with its own channel busy state. Stations associated with
+it count down a random backoff in idle slots (after DIFS), freeze it while
+the medium is busy, and transmit when it reaches zero. Stations reaching
+zero in the same slot collide; failed transmissions (collision, or a PER
+draw at the station's current SINR) double the contention window up to
+CW_MAX and are retried up to the retry limit. Stations follow their
+serving AP from step to step.
+
+Events live in a binary heap (heapq) of (time, seq, kind, a, b) tuples.
+Backoff countdowns are not simulated slot by slot: each AP keeps its
+contenders in a second heap keyed by the idle slot their backoff expires in,
+and schedules a single RESOLVE event for the earliest one. A packet
+therefore costs about three events (arrival, resolve, end of transmission)
+regardless of backoff lengths, and O(log n) work in the number of stations.
+
+Traffic models are pluggable: any object with `packet_bytes`, `saturated`
+and `next_arrival(rng, now)` (see PoissonTraffic).
+"""
+import heapq
+import math
+
+import numpy as np
+
+from core_simulation import DEFAULT_MCS_TABLE, DEFAULT_MCS_THRESHOLDS, per_lookup
+
+# 802.11 OFDM timing (seconds)
+SLOT_S = 9e-6
+SIFS_S = 16e-6
+DIFS_S = SIFS_S + 2 * SLOT_S
+PHY_HEADER_S = 20e-6
+ACK_S = 44e-6
+CW_MIN = 15
+CW_MAX = 1023
+
+# Event kinds, in tie-breaking order at equal times
+STEP, TX_END, ARRIVAL, RESOLVE = range(4)
+
+
+# --- Traffic models ---
+class SaturatedTraffic:
+    """
+    Every station always has a packet queued.
+    """
+    saturated = True
+
+    def __init__(self, packet_bytes=1500):
+        self.packet_bytes = packet_bytes
+
+    def next_arrival(self, rng, now):
+        return math.inf
+
+
+class PoissonTraffic:
+    """
+    Poisson packet arrivals at rate_pps packets per second per station.
+    """
+    saturated = False
+
+    def __init__(self, rate_pps, packet_bytes=1500):
+        self.rate_pps = float(rate_pps)
+        self.packet_bytes = packet_bytes
+
+    def next_arrival(self, rng, now):
+        return now + rng.exponential(1.0 / self.rate_pps)
+
+
+class ConstantBitRateTraffic:
+    """
+    One packet every 1 / rate_pps seconds per station, with a random phase.
+    """
+    saturated = False
+
+    def __init__(self, rate_pps, packet_bytes=1500):
+        self.interval = 1.0 / float(rate_pps)
+        self.packet_bytes = packet_bytes
+
+    def next_arrival(self, rng, now):
+        if now == 0.0:
+            return rng.uniform(0, self.interval)
+        return now + self.interval
+
+
+TRAFFIC_MODELS = {
+    "saturated": lambda rate, size: SaturatedTraffic(size),
+    "poisson": PoissonTraffic,
+    "cbr": ConstantBitRateTraffic,
+}
+
+
+def make_traffic(name, rate_pps=100.0, packet_bytes=1500):
+    return TRAFFIC_MODELS[name](rate_pps, packet_bytes)
+
+
+# --- Link parameters ---
+def link_tables(serving_sinr_dB, packet_bytes, mcs_table=None, mcs_thresholds=None):
+    """
+    PHY rate (bit/s) and PER of every station at every step on its serving
+    AP, both shaped like serving_sinr_dB (n_users, n_steps).
+    """
+    mcs_table = DEFAULT_MCS_TABLE if mcs_table is None else mcs_table
+    mcs_thresholds = DEFAULT_MCS_THRESHOLDS if mcs_thresholds is None else mcs_thresholds
+    sinr = np.asarray(serving_sinr_dB, dtype=float)
+    mcs_idx = np.clip(np.digitize(sinr, bins=mcs_thresholds), 0, len(mcs_table) - 1)
+    rates = np.array([row[2] for row in mcs_table]) * 1e6
+    per = per_lookup(sinr, mcs_idx, [row[0] for row in mcs_table], packet_bytes * 8)
+    return rates[mcs_idx], per
+
+
+# --- Engine ---
+def simulate_csma(serving_sinr_dB, handover, n_aps, time_step, traffic, retry_limit=7, rng=None):
+    """
+    Runs the DCF model over n_steps * time_step seconds.
+
+    serving_sinr_dB, handover: serving-AP SINR and 1-based serving AP of
+    every station, shape (n_users, n_steps).
+    Returns per-station delivered MAC throughput per step, shape
+    (n_users, n_steps), and a "mac" summary: per-station packet counts and
+    mean access delay (from reaching the head of the queue to delivery),
+    per-AP busy and collision fractions, and the number of events processed.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    n_users, n_steps = handover.shape
+    end_time = n_steps * time_step
+    packet_bits = traffic.packet_bytes * 8
+    rate_table, per_table = link_tables(serving_sinr_dB, traffic.packet_bytes)
+    airtime_table = (PHY_HEADER_S + packet_bits / rate_table).tolist()
+    per_table = per_table.tolist()
+    ap_of = (handover[:, 0] - 1).tolist()
+    saturated = traffic.saturated
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    # Station state. token[s] invalidates the station's stale backoff entry
+    # after it leaves an AP.
+    queue = [1 if saturated else 0] * n_users
+    hol_start = [0.0] * n_users
+    cw = [CW_MIN] * n_users
+    retries = [0] * n_users
+    transmitting = [False] * n_users
+    contending = [False] * n_users
+    token = [0] * n_users
+    delivered_bits = np.zeros((n_users, n_steps))
+    delivered = [0] * n_users
+    dropped = [0] * n_users
+    attempts = [0] * n_users
+    collisions = [0] * n_users
+    delay_sum = [0.0] * n_users
+
+    # AP state. Backoffs count on an idle-slot clock that only runs while
+    # the medium is idle: slot_clock[ap] idle slots had elapsed at time
+    # count_start[ap]. Each contender is a heap entry (expiry slot,
+    # station, token), so the medium freezes every countdown for free and
+    # the next transmitter is the heap head.
+    backoffs = [[] for _ in range(n_aps)]
+    slot_clock = [0] * n_aps
+    count_start = [DIFS_S] * n_aps
+    busy = [False] * n_aps
+    scheduled = [None] * n_aps
+    version = [0] * n_aps
+    busy_time = [0.0] * n_aps
+    collision_time = [0.0] * n_aps
+
+    events = []
+    seq = 0
+    draw_backoff = rng.integers
+    draw_error = rng.random
+
+    def push(t, kind, a, b=0):
+        nonlocal seq
+        seq += 1
+        heappush(events, (t, seq, kind, a, b))
+
+    def schedule_resolve(ap, expiry):
+        scheduled[ap] = expiry
+        version[ap] += 1
+        push(count_start[ap] + (expiry - slot_clock[ap]) * SLOT_S, RESOLVE, ap, version[ap])
+
+    def join(s, now):
+        ap = ap_of[s]
+        current = slot_clock[ap]
+        if not busy[ap] and now > count_start[ap]:
+            # Start counting at the next slot boundary
+            current += math.ceil((now - count_start[ap]) / SLOT_S - 1e-9)
+        expiry = current + int(draw_backoff(0, cw[s] + 1))
+        token[s] += 1
+        contending[s] = True
+        heappush(backoffs[ap], (expiry, s, token[s]))
+        if not busy[ap] and (scheduled[ap] is None or expiry < scheduled[ap]):
+            schedule_resolve(ap, expiry)
+
+    def next_expiry(ap):
+        pending = backoffs[ap]
+        while pending and pending[0][2] != token[pending[0][1]]:
+            heappop(pending)
+        return pending[0][0] if pending else None
+
+    for s in range(n_users):
+        if saturated:
+            join(s, 0.0)
+        else:
+            first = traffic.next_arrival(rng, 0.0)
+            if first < end_time:
+                push(first, ARRIVAL, s)
+    for k in range(1, n_steps):
+        push(k * time_step, STEP, k)
+
+    n_events = 0
+    while events:
+        now, _, kind, a, b = heappop(events)
+        if now >= end_time:
+            break
+        n_events += 1
+
+        if kind == RESOLVE:
+            ap = a
+            if b != version[ap] or busy[ap]:
+                continue
+            target, scheduled[ap] = scheduled[ap], None
+            expiry = next_expiry(ap)
+            if expiry is None:
+                continue
+            if expiry > target:
+                # The station this was scheduled for left the AP
+                schedule_resolve(ap, expiry)
+                continue
+            pending = backoffs[ap]
+            winners = []
+            while pending and pending[0][0] == expiry:
+                _, s, tok = heappop(pending)
+                if tok == token[s]:
+                    winners.append(s)
+                    contending[s] = False
+                    transmitting[s] = True
+                    attempts[s] += 1
+            step = min(int(now / time_step), n_steps - 1)
+            collided = len(winners) > 1
+            airtime = max(airtime_table[s][step] for s in winners)
+            duration = airtime if collided else airtime + SIFS_S + ACK_S
+            slot_clock[ap] = expiry
+            busy[ap] = True
+            busy_time[ap] += duration
+            if collided:
+                collision_time[ap] += duration
+            push(now + duration, TX_END, ap, (winners, collided))
+
+        elif kind == TX_END:
+            ap = a
+            winners, collided = b
+            busy[ap] = False
+            count_start[ap] = now + DIFS_S
+            step = min(int(now / time_step), n_steps - 1)
+            for s in winners:
+                transmitting[s] = False
+                if collided or draw_error() < per_table[s][step]:
+                    if collided:
+                        collisions[s] += 1
+                    retries[s] += 1
+                    if retries[s] <= retry_limit:
+                        cw[s] = min(2 * cw[s] + 1, CW_MAX)
+                        join(s, now)
+                        continue
+                    dropped[s] += 1
+                else:
+                    delivered[s] += 1
+                    delivered_bits[s, step] += packet_bits
+                    delay_sum[s] += now - hol_start[s]
+                cw[s] = CW_MIN
+                retries[s] = 0
+                if not saturated:
+                    queue[s] -= 1
+                if queue[s]:
+                    hol_start[s] = now
+                    join(s, now)
+            expiry = next_expiry(ap)
+            if expiry is not None and (scheduled[ap] is None or expiry < scheduled[ap]):
+                schedule_resolve(ap, expiry)
+
+        elif kind == ARRIVAL:
+            s = a
+            queue[s] += 1
+            if queue[s] == 1 and not transmitting[s]:
+                hol_start[s] = now
+                join(s, now)
+            following = traffic.next_arrival(rng, now)
+            if following < end_time:
+                push(following, ARRIVAL, s)
+
+        else:  # STEP: follow handovers to the new serving AP
+            k = a
+            moved = np.flatnonzero(handover[:, k] != handover[:, k - 1]).tolist()
+            new_ap = handover[moved, k] - 1
+            for s, ap in zip(moved, new_ap.tolist()):
+                ap_of[s] = ap
+                # A transmitting station rejoins at its new AP on TX_END
+                if contending[s]:
+                    join(s, now)
+
+    delivered_arr = np.array(delivered)
+    return {
+        "users_mac_throughput": delivered_bits / time_step,
+        "mac": {
+            "users_delivered": delivered_arr,
+            "users_dropped": np.array(dropped),
+            "users_attempts": np.array(attempts),
+            "users_collisions": np.array(collisions),
+            "users_access_delay_s": np.array(delay_sum) / np.maximum(delivered_arr, 1),
+            "ap_busy_fraction": np.array(busy_time) / end_time,
+            "ap_collision_fraction": np.array(collision_time) / end_time,
+            "events": n_events,
+        },
+    }
+
+
+def simulate_csma_for_result(result, n_aps, time_step, traffic, retry_limit=7, rng=None):
+    """
+    Runs simulate_csma on a simulation result with users_sinr and
+    users_handover.
+    """
+    handover = result["users_handover"]
+    serving_sinr = np.take_along_axis(result["users_sinr"], handover[:, None, :] - 1, axis=1)[:, 0, :]
+    return simulate_csma(serving_sinr, handover, n_aps, time_step, traffic, retry_limit, rng)
@@ -1,36 +1,68 @@
 import numpy as np
 
-def generate_realistic_user_positions(n_users, n_steps, ap_positions, velocity, time_step):
+# Random-waypoint model parameters
+START_JITTER_M = 2.0       # initial offset around the starting AP
+TARGET_JITTER_M = 5.0      # per-step offset around the target AP
+RETARGET_PROB = 0.05       # chance per step of picking a new target AP
+
+
+def init_user_mobility(n_users, ap_positions, rng):
     """
-    Generates realistic user positions for a multi-AP WiFi simulation.
-    
-    Each user performs a random waypoint movement around APs with some jitter.
+    Returns the initial mobility state (positions, targets) for n_users.
+
+    positions: shape (n_users, 2), each user placed near a random starting AP
+    targets: shape (n_users,), index of each user's current target AP
+    """
+    ap_positions = np.asarray(ap_positions, dtype=float)
+    targets = rng.integers(0, len(ap_positions), size=n_users)
+    positions = ap_positions[targets] + rng.uniform(-START_JITTER_M, START_JITTER_M, (n_users, 2))
+    return positions, targets
+
+
+def advance_user_mobility(positions, targets, n_steps, ap_positions, velocity, time_step, rng):
     """
-    user_positions = np.zeros((n_users, 2, n_steps))
-    ap_positions = np.array(ap_positions)
+    Advances all users n_steps random-waypoint steps at once.
 
-    # Assign each user a random starting AP
-    user_targets = np.random.randint(0, len(ap_positions), size=n_users)
-    user_current_pos = np.array([ap_positions[ap_idx] + np.random.uniform(-2,2,2) 
-                                 for ap_idx in user_targets])
+    positions and targets are updated in place, so the same state can be
+    passed again to continue the trajectory. Returns the visited positions
+    with shape (n_users, 2, n_steps).
+    """
+    ap_positions = np.asarray(ap_positions, dtype=float)
+    n_users = positions.shape[0]
+    n_aps = len(ap_positions)
+    max_step = velocity * time_step
+    user_positions = np.empty((n_users, 2, n_steps))
 
     for t in range(n_steps):
-        for u in range(n_users):
-            target_ap_idx = user_targets[u]
-            # Small random offset around AP to simulate roaming
-            target_pos = ap_positions[target_ap_idx] + np.random.uniform(-5, 5, 2)
+        # Small random offset around AP to simulate roaming
+        target_pos = ap_positions[targets] + rng.uniform(-TARGET_JITTER_M, TARGET_JITTER_M, (n_users, 2))
 
-            # Compute direction vector
-            direction = target_pos - user_current_pos[u]
-            distance = np.linalg.norm(direction)
-            if distance > 0:
-                step = min(velocity * time_step, distance)
-                user_current_pos[u] += (direction / distance) * step
+        # Move each user towards its target, without overshooting
+        direction = target_pos - positions
+        distance = np.sqrt(np.sum(direction**2, axis=1))
+        scale = np.divide(np.minimum(max_step, distance), distance,
+                          out=np.zeros(n_users), where=distance > 0)
+        positions += direction * scale[:, None]
 
-            # Occasionally choose a new target AP
-            if np.random.rand() < 0.05:  # 5% chance per step
-                user_targets[u] = np.random.randint(0, len(ap_positions))
+        # Occasionally choose a new target AP
+        retarget = rng.random(n_users) < RETARGET_PROB
+        n_retarget = np.count_nonzero(retarget)
+        if n_retarget:
+            targets[retarget] = rng.integers(0, n_aps, size=n_retarget)
 
-            user_positions[u, :, t] = user_current_pos[u]
+        user_positions[:, :, t] = positions
 
     return user_positions
+
+
+def generate_realistic_user_positions(n_users, n_steps, ap_positions, velocity, time_step, seed=None):
+    """
+    Generates realistic user positions for a multi-AP WiFi simulation.
+
+    Each user performs a random waypoint movement around APs with some jitter.
+    All users are advanced together as arrays. seed may be an int,
+    SeedSequence or Generator, for a reproducible trajectory.
+    """
+    rng = np.random.default_rng(seed)
+    positions, targets = init_user_mobility(n_users, ap_positions, rng)
+    return advance_user_mobility(positions, targets, n_steps, ap_positions, velocity, time_step, rng)
@@ -0,0 +1,160 @@
+import numpy as np
+
+from core_simulation import (
+    _build_aps_meta,
+    _simulation_params,
+    _to_serializable,
+    compute_distances,
+    serving_load,
+    sinr_and_handover_stage,
+    spawn_streams,
+    throughput_stage,
+    users_per_ap,
+)
+from channel import correlated_channel
+from instrumentation import stage
+from mobility import generate_realistic_user_positions
+
+PERCENTILES = (5, 50, 95)
+
+
+def _stats(values):
+    """
+    Summary statistics of per-realization values along axis 0: mean, std,
+    a normal-approximation 95% confidence interval of the mean, and
+    percentiles.
+    """
+    n = values.shape[0]
+    mean = values.mean(axis=0)
+    std = values.std(axis=0, ddof=1) if n > 1 else np.zeros_like(mean)
+    half_width = 1.96 * std / np.sqrt(n)
+    stats = {
+        "mean": mean,
+        "std": std,
+        "ci95_low": mean - half_width,
+        "ci95_high": mean + half_width,
+    }
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES, axis=0)):
+        stats[f"p{q}"] = value
+    return stats
+
+
+def simulate_monte_carlo(
+    aps,
+    n_users,
+    n_steps,
+    velocity,
+    time_step,
+    path_loss_exp,
+    K0_dB,
+    K_decay,
+    shadow_sigma_dB,
+    hysteresis_dB,
+    packet_size_bytes,
+    max_retries,
+    realizations,
+    seed=None,
+    per_realization=False,
+    time_to_trigger_steps=0,
+    radio_map_resolution=None,
+    interference_radius=None,
+    dtype=np.float64,
+    shadow_decorrelation_m=None,
+    fading_decorrelation_m=None
+):
+    """
+    Runs independent realizations of one scenario in a single batched pass.
+
+    The realizations are stacked as a leading batch axis over users, so
+    mobility, SINR, handover and throughput each run once over
+    realizations * n_users users; only the per-AP load is computed per
+    realization. Returns per-realization KPI statistics and per-step
+    percentile bands; with per_realization=True the raw fields are added
+    with shape (realizations, n_users, ...).
+    """
+    n_aps = len(aps)
+    n_total = realizations * n_users
+    streams = spawn_streams(seed, n_total)
+
+    with stage("mobility", n_users=n_total, n_steps=n_steps):
+        user_positions = generate_realistic_user_positions(
+            n_users=n_total,
+            n_steps=n_steps,
+            ap_positions=[ap["position"] for ap in aps],
+            velocity=velocity,
+            time_step=time_step,
+            seed=streams["mobility"]
+        )
+    with stage("distance", n_users=n_total, n_aps=n_aps, n_steps=n_steps):
+        dist_matrix = compute_distances(aps, user_positions, dtype)
+    sinr_dB, handover, _, _ = sinr_and_handover_stage(
+        aps, dist_matrix, user_positions, path_loss_exp, K0_dB, K_decay,
+        shadow_sigma_dB, hysteresis_dB, fading_rngs=streams["fading"],
+        time_to_trigger_steps=time_to_trigger_steps,
+        radio_map_resolution=radio_map_resolution,
+        interference_radius=interference_radius,
+        correlation=correlated_channel(shadow_decorrelation_m, fading_decorrelation_m)
+    )
+
+    # Users only share APs with users of the same realization
+    with stage("throughput", n_users=n_total, n_steps=n_steps):
+        load = np.concatenate([
+            serving_load(h, users_per_ap(h, n_aps))
+            for h in handover.reshape(realizations, n_users, n_steps)
+        ])
+        metrics = throughput_stage(
+            sinr_dB, handover, load, packet_size_bytes, max_retries, streams["retry"]
+        )
+
+    def batched(arr):
+        return arr.reshape((realizations, n_users) + arr.shape[1:])
+
+    serving_sinr = np.take_along_axis(sinr_dB, handover[:, None, :] - 1, axis=1)[:, 0, :]
+    handover_b = batched(handover)
+    kpis = {
+        "throughput_bps": batched(metrics["users_throughput"]).mean(axis=(1, 2)),
+        "mac_throughput_bps": batched(metrics["users_mac_throughput"]).mean(axis=(1, 2)),
+        "serving_sinr_dB": batched(serving_sinr).mean(axis=(1, 2)),
+        "per": batched(metrics["users_per"]).mean(axis=(1, 2)),
+        "retries": batched(metrics["users_retries"]).mean(axis=(1, 2)),
+        "collision_rate": batched(metrics["users_collision"]).mean(axis=(1, 2)),
+        "handovers_per_user": np.count_nonzero(np.diff(handover_b, axis=2), axis=(1, 2)) / n_users,
+    }
+    series = {
+        "network_mac_throughput_bps": batched(metrics["users_mac_throughput"]).sum(axis=1),
+        "mean_serving_sinr_dB": batched(serving_sinr).mean(axis=1),
+    }
+
+    result = {
+        "realizations": realizations,
+        "kpis": {name: _stats(values) for name, values in kpis.items()},
+        "series": {name: _stats(values) for name, values in series.items()},
+        "time": np.arange(1, n_steps+1),
+    }
+    if per_realization:
+        result["per_realization"] = {
+            "users_sinr": batched(sinr_dB),
+            "users_handover": handover_b,
+            **{name: batched(value) for name, value in metrics.items()},
+            "users_distance": batched(dist_matrix.transpose(1, 0, 2)),
+        }
+    return result
+
+
+def run_monte_carlo_simulation(env, serialize=True):
+    """
+    Monte Carlo counterpart of run_multiuser_wifi_simulation, driven by the
+    realizations and perRealization environment fields.
+    """
+    params = _simulation_params(env)
+    params.pop("workers")
+    params.pop("fields")  # the KPI statistics need every field
+    for name in ("mac_model", "traffic_model", "traffic_rate"):
+        params.pop(name)  # realizations use the analytic MAC
+    result = simulate_monte_carlo(
+        aps=_build_aps_meta(env),
+        realizations=int(env.get("realizations", 1)),
+        per_realization=bool(env.get("perRealization", False)),
+        **params
+    )
+    return _to_serializable(result) if serialize else result
@@ -0,0 +1,200 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core_simulation import (
+    METRIC_FIELDS,
+    OUTPUT_FIELDS,
+    compute_distances,
+    serving_load,
+    sinr_and_handover_stage,
+    spawn_streams,
+    throughput_stage,
+)
+from channel import correlated_channel
+from instrumentation import stage
+
+# Below this many user-AP-step samples the process start-up and shared-memory
+# setup cost more than they save, so auto mode stays serial
+PARALLEL_MIN_SAMPLES = 2_000_000
+
+
+def resolve_workers(workers, n_users, n_aps, n_steps):
+    """
+    Returns the number of worker processes to use. workers=None picks one
+    per CPU for large scenarios and serial execution for small ones.
+    """
+    if workers is None:
+        if n_users * n_aps * n_steps < PARALLEL_MIN_SAMPLES:
+            return 1
+        workers = os.cpu_count() or 1
+    return max(1, min(int(workers), n_users))
+
+
+# --- Shared-memory arrays ---
+def _create_shared(shape, dtype):
+    dtype = np.dtype(dtype)
+    size = max(1, int(np.prod(shape)) * dtype.itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm, (shm.name, shape, dtype.str)
+
+
+@contextmanager
+def _attached(specs):
+    """
+    Maps shared-memory blocks described by specs {key: (name, shape, dtype)}
+    to NumPy arrays for the duration of the block.
+    """
+    handles = {key: shared_memory.SharedMemory(name=spec[0]) for key, spec in specs.items()}
+    arrays = {key: np.ndarray(specs[key][1], dtype=specs[key][2], buffer=handles[key].buf)
+              for key in specs}
+    try:
+        yield arrays
+    finally:
+        arrays.clear()
+        for shm in handles.values():
+            shm.close()
+
+
+# --- Worker tasks ---
+def _sinr_handover_shard(specs, lo, hi, aps, channel, seed):
+    """
+    Returns this shard's contribution to the per-AP user count.
+    """
+    with _attached(specs) as arrays:
+        n_users = arrays["positions"].shape[0]
+        streams = spawn_streams(seed, n_users, slice(lo, hi))
+        sinr_dB, handover, n_users_on_ap, _ = sinr_and_handover_stage(
+            aps,
+            arrays["distance"][:, lo:hi, :],
+            arrays["positions"][lo:hi],
+            fading_rngs=streams["fading"],
+            **channel
+        )
+        arrays["sinr"][lo:hi] = sinr_dB
+        arrays["handover"][lo:hi] = handover
+    return n_users_on_ap
+
+
+def _throughput_shard(specs, lo, hi, packet_size_bytes, max_retries, seed, metric_fields):
+    with _attached(specs) as arrays:
+        n_users = arrays["positions"].shape[0]
+        streams = spawn_streams(seed, n_users, slice(lo, hi))
+        handover = arrays["handover"][lo:hi]
+        metrics = throughput_stage(
+            arrays["sinr"][lo:hi],
+            handover,
+            serving_load(handover, arrays["n_users_on_ap"]),
+            packet_size_bytes,
+            max_retries,
+            retry_rngs=streams["retry"],
+            fields=metric_fields
+        )
+        for name in metric_fields:
+            arrays[name][lo:hi] = metrics[name]
+
+
+# --- Parallel simulation ---
+def simulate_multi_user_wifi_parallel(
+    aps,
+    user_positions,
+    path_loss_exp,
+    K0_dB,
+    K_decay,
+    shadow_sigma_dB,
+    hysteresis_dB,
+    packet_size_bytes,
+    max_retries,
+    seed,
+    workers,
+    time_to_trigger_steps=0,
+    radio_map_resolution=None,
+    interference_radius=None,
+    dtype=np.float64,
+    fields=None,
+    shadow_decorrelation_m=None,
+    fading_decorrelation_m=None
+):
+    """
+    Same result as simulate_multi_user_wifi_py with spawn_streams(seed), with
+    users sharded across a process pool.
+
+    user_positions and the distance tensor live in shared memory, and workers
+    write their SINR, handover and metric rows straight into shared outputs.
+    The pool runs in two phases with a barrier in between, because every
+    user's MAC share needs the per-AP load n_users_on_ap of all users.
+    seed must not be None, so that every worker derives the same streams.
+    The float outputs, and their shared-memory blocks, use dtype. Only the
+    metric blocks and pool phases that feed fields are created and run.
+    """
+    n_users, _, n_steps = user_positions.shape
+    n_aps = len(aps)
+    fields = OUTPUT_FIELDS if fields is None else fields
+    metric_fields = [f for f in METRIC_FIELDS if f in fields]
+    if not (metric_fields or "users_sinr" in fields or "users_handover" in fields):
+        with stage("distance", n_users=n_users, n_aps=n_aps, n_steps=n_steps):
+            distance = compute_distances(aps, user_positions, dtype)
+        return {"users_distance": distance.transpose(1, 0, 2), "time": np.arange(1, n_steps+1)}
+
+    layout = {
+        "positions": ((n_users, 2, n_steps), np.float64),
+        "distance": ((n_aps, n_users, n_steps), dtype),
+        "sinr": ((n_users, n_aps, n_steps), dtype),
+        "handover": ((n_users, n_steps), np.int_),
+        "n_users_on_ap": ((n_aps, n_steps), np.int_),
+        **{name: ((n_users, n_steps), dtype) for name in metric_fields},
+    }
+    handles, specs = {}, {}
+    try:
+        for key, (shape, field_dtype) in layout.items():
+            handles[key], specs[key] = _create_shared(shape, field_dtype)
+
+        with _attached(specs) as arrays, stage("distance", n_users=n_users, n_aps=n_aps, n_steps=n_steps):
+            arrays["positions"][:] = user_positions
+            arrays["distance"][:] = compute_distances(aps, user_positions, dtype)
+
+        bounds = [(int(s[0]), int(s[-1]) + 1)
+                  for s in np.array_split(np.arange(n_users), workers) if s.size]
+        channel = dict(path_loss_exp=path_loss_exp, K0_dB=K0_dB, K_decay=K_decay,
+                       shadow_sigma_dB=shadow_sigma_dB, hysteresis_dB=hysteresis_dB,
+                       time_to_trigger_steps=time_to_trigger_steps,
+                       radio_map_resolution=radio_map_resolution,
+                       interference_radius=interference_radius,
+                       correlation=correlated_channel(shadow_decorrelation_m, fading_decorrelation_m))
+
+        sizes = dict(n_users=n_users, n_aps=n_aps, n_steps=n_steps, workers=len(bounds))
+        with ProcessPoolExecutor(max_workers=len(bounds)) as pool:
+            with stage("sinr_handover", **sizes):
+                shard_counts = pool.map(_sinr_handover_shard, *zip(*[
+                    (specs, lo, hi, aps, channel, seed) for lo, hi in bounds
+                ]))
+
+                # Barrier: per-AP load needs every user's serving AP
+                with _attached(specs) as arrays:
+                    arrays["n_users_on_ap"][:] = sum(shard_counts)
+
+            if metric_fields:
+                with stage("throughput", **sizes):
+                    list(pool.map(_throughput_shard, *zip(*[
+                        (specs, lo, hi, packet_size_bytes, max_retries, seed, metric_fields)
+                        for lo, hi in bounds
+                    ])))
+
+        with _attached(specs) as arrays:
+            result = {
+                "users_sinr": arrays["sinr"].copy(),
+                "users_handover": arrays["handover"].copy(),
+                **{name: arrays[name].copy() for name in metric_fields},
+                "users_distance": arrays["distance"].transpose(1, 0, 2).copy(),
+            }
+            result = {name: result[name] for name in OUTPUT_FIELDS if name in fields}
+    finally:
+        for shm in handles.values():
+            shm.close()
+            shm.unlink()
+
+    result["time"] = np.arange(1, n_steps+1)
+    return result
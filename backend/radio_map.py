@@ -0,0 +1,212 @@
+"""
+Precomputed radio maps for static AP layouts.
+
+A radio map holds, for every AP, the deterministic mean received power
+(transmit power minus path loss, plus antenna gain) in dBm on a regular
+grid covering the AP layout. Users sample it by bilinear interpolation,
+so only fading and shadowing remain to be drawn per sample. Maps are
+cached per AP configuration.
+
+Samples outside the grid, in cells within NEAR_AP_CELLS cells of an AP
+(where log-distance path loss is steep), or in cells where interpolation
+is off by more than RADIO_MAP_TOLERANCE_DB at the cell centre (e.g. across
+an edge of the antenna pattern) fall back to the exact computation.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core_simulation import directional_gain, mean_received_power_dBm
+
+RADIO_MAP_MARGIN_M = 10.0      # grid extent beyond the outermost APs
+RADIO_MAP_TOLERANCE_DB = 0.1   # max interpolation error at a cell centre
+NEAR_AP_CELLS = 3.0            # cells this close to an AP are always exact
+RADIO_MAP_CACHE_SIZE = 8
+RADIO_MAP_MAX_NODES = 2**22    # grid nodes summed over all APs (32 MiB per float64 grid)
+
+
+def _ap_arrays(aps_meta):
+    return {
+        "position": np.array([ap["position"] for ap in aps_meta], dtype=float),
+        "frequency_Hz": np.array([ap["frequency_Hz"] for ap in aps_meta], dtype=float),
+        "tx_power_dBm": np.array([ap["tx_power_dBm"] for ap in aps_meta], dtype=float),
+        "antenna_gain_dBi": np.array([ap.get("antenna_gain_dBi", 0) for ap in aps_meta], dtype=float),
+        "beamwidth_deg": np.array([ap.get("beamwidth_deg", 360) for ap in aps_meta], dtype=float),
+    }
+
+
+def _exact_mean_rx_dBm(aps, ap_idx, x, y, distances, path_loss_exp):
+    """
+    Mean received power with antenna gain (dBm) of AP ap_idx at points
+    (x, y); aps holds the columns from _ap_arrays. All arguments broadcast.
+    """
+    ap = {key: aps[key][ap_idx] for key in ("frequency_Hz", "tx_power_dBm")}
+    mean_dBm = mean_received_power_dBm(distances, ap, path_loss_exp)
+    if aps["antenna_gain_dBi"].any():
+        theta = np.arctan2(y - aps["position"][ap_idx, 1], x - aps["position"][ap_idx, 0])
+        gain = directional_gain(
+            theta, aps["antenna_gain_dBi"][ap_idx], aps["beamwidth_deg"][ap_idx]
+        )
+        mean_dBm = mean_dBm + 10 * np.log10(gain)
+    return mean_dBm
+
+
+def _grid_extent(ap_positions, resolution):
+    """
+    Lower and upper grid corners and node counts (nx, ny) of the radio map
+    grid around ap_positions, shape (n_aps, 2).
+    """
+    lo = np.floor((ap_positions.min(axis=0) - RADIO_MAP_MARGIN_M) / resolution) * resolution
+    hi = np.ceil((ap_positions.max(axis=0) + RADIO_MAP_MARGIN_M) / resolution) * resolution
+    nx, ny = (np.round((hi - lo) / resolution).astype(int) + 1)
+    return lo, hi, int(nx), int(ny)
+
+
+def radio_map_nodes(ap_positions, resolution):
+    """
+    Number of grid nodes, summed over the APs, of the radio map of a layout.
+    """
+    ap_positions = np.asarray(ap_positions, dtype=float).reshape(-1, 2)
+    _, _, nx, ny = _grid_extent(ap_positions, float(resolution))
+    return len(ap_positions) * nx * ny
+
+
+def build_radio_map(aps_meta, path_loss_exp, resolution):
+    """
+    Computes the radio map of an AP layout on a grid with the given
+    resolution in meters. Returns a dict with the grid origin, resolution,
+    the per-AP grids "mean_rx_dBm" (including antenna gain) and "gain_dB"
+    of shape (n_aps, ny, nx), and the per-AP cell mask "exact" of shape
+    (n_aps, ny - 1, nx - 1). The arrays are read-only. Raises ValueError
+    when the grid would exceed RADIO_MAP_MAX_NODES.
+    """
+    resolution = float(resolution)
+    if resolution <= 0:
+        raise ValueError("radio map resolution must be positive")
+    aps = _ap_arrays(aps_meta)
+    lo, hi, nx, ny = _grid_extent(aps["position"], resolution)
+    if len(aps_meta) * nx * ny > RADIO_MAP_MAX_NODES:
+        raise ValueError(f"radio map of {len(aps_meta) * nx * ny} grid nodes exceeds "
+                         f"{RADIO_MAP_MAX_NODES}; use a coarser resolution")
+
+    def mean_rx_on_grid(x, y):
+        ap_idx = np.arange(len(aps_meta))[:, None, None]
+        distances = np.hypot(x - aps["position"][ap_idx, 0], y - aps["position"][ap_idx, 1])
+        return _exact_mean_rx_dBm(aps, ap_idx, x, y, distances, path_loss_exp), distances
+
+    x = lo[0] + resolution * np.arange(nx)
+    y = lo[1] + resolution * np.arange(ny)
+    mean_rx_dBm, distances = mean_rx_on_grid(x[None, None, :], y[None, :, None])
+    ap = {key: aps[key][:, None, None] for key in ("frequency_Hz", "tx_power_dBm")}
+    gain_dB = mean_rx_dBm - mean_received_power_dBm(distances, ap, path_loss_exp)
+
+    # Cells around an AP, and cells whose centre is badly approximated by
+    # their corners (e.g. across an edge of the antenna pattern), are
+    # evaluated exactly
+    center, center_distances = mean_rx_on_grid((x[:-1] + resolution / 2)[None, None, :],
+                                               (y[:-1] + resolution / 2)[None, :, None])
+    corners = (mean_rx_dBm[:, :-1, :-1] + mean_rx_dBm[:, :-1, 1:]
+               + mean_rx_dBm[:, 1:, :-1] + mean_rx_dBm[:, 1:, 1:]) / 4
+    exact = ((np.abs(center - corners) > RADIO_MAP_TOLERANCE_DB)
+             | (center_distances < NEAR_AP_CELLS * resolution))
+
+    for arr in (mean_rx_dBm, gain_dB, exact):
+        arr.setflags(write=False)
+    return {
+        "origin": (float(lo[0]), float(lo[1])),
+        "resolution": resolution,
+        "mean_rx_dBm": mean_rx_dBm,
+        "gain_dB": gain_dB,
+        "exact": exact,
+    }
+
+
+def _radio_map_payload(aps_meta, path_loss_exp, resolution):
+    return json.dumps(
+        {"aps": aps_meta, "path_loss_exp": float(path_loss_exp), "resolution": float(resolution)},
+        sort_keys=True
+    )
+
+
+def radio_map_key(aps_meta, path_loss_exp, resolution):
+    """
+    Hash of everything a radio map depends on: the AP configuration, the
+    path-loss exponent and the grid resolution.
+    """
+    payload = _radio_map_payload(aps_meta, path_loss_exp, resolution)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_radio_maps = OrderedDict()
+_radio_maps_lock = threading.Lock()
+
+
+def get_radio_map(aps_meta, path_loss_exp, resolution):
+    """
+    Returns the radio map for an AP configuration, building it on first
+    use. The RADIO_MAP_CACHE_SIZE most recently used maps are kept.
+    """
+    key = radio_map_key(aps_meta, path_loss_exp, resolution)
+    with _radio_maps_lock:
+        radio_map = _radio_maps.get(key)
+        if radio_map is not None:
+            _radio_maps.move_to_end(key)
+            return radio_map
+
+    radio_map = build_radio_map(aps_meta, path_loss_exp, resolution)
+    radio_map["key"] = key
+    with _radio_maps_lock:
+        _radio_maps[key] = radio_map
+        while len(_radio_maps) > RADIO_MAP_CACHE_SIZE:
+            _radio_maps.popitem(last=False)
+    return radio_map
+
+
+def sample_radio_map(radio_map, aps_meta, user_positions, dist_matrix, path_loss_exp):
+    """
+    user_positions: shape (n_users, 2, n_steps)
+    dist_matrix: shape (n_aps, n_users, n_steps)
+    Returns the mean received power with antenna gain (dBm) of every AP at
+    every user sample, shape (n_aps, n_users, n_steps).
+    """
+    grid = radio_map["mean_rx_dBm"]
+    n_aps, ny, nx = grid.shape
+    resolution = radio_map["resolution"]
+    x, y = user_positions[:, 0, :], user_positions[:, 1, :]
+    fx = (x - radio_map["origin"][0]) / resolution
+    fy = (y - radio_map["origin"][1]) / resolution
+    inside = (fx >= 0) & (fx <= nx - 1) & (fy >= 0) & (fy <= ny - 1)
+
+    # Bilinear weights of the four surrounding nodes, shared by all APs
+    ix = np.clip(fx, 0, nx - 2).astype(np.intp)
+    iy = np.clip(fy, 0, ny - 2).astype(np.intp)
+    wx = np.clip(fx - ix, 0, 1)
+    wy = np.clip(fy - iy, 0, 1)
+    node = iy * nx + ix
+    cell = iy * (nx - 1) + ix
+    weighted_nodes = [
+        (node, (1 - wx) * (1 - wy)),
+        (node + 1, wx * (1 - wy)),
+        (node + nx, (1 - wx) * wy),
+        (node + nx + 1, wx * wy),
+    ]
+
+    # One AP at a time, so each gather reads a small grid that stays in cache
+    mean_dBm = np.empty((n_aps,) + node.shape)
+    exact = np.empty((n_aps,) + node.shape, dtype=bool)
+    for a in range(n_aps):
+        ap_grid = grid[a].ravel()
+        np.multiply(ap_grid[node], weighted_nodes[0][1], out=mean_dBm[a])
+        for idx, weight in weighted_nodes[1:]:
+            mean_dBm[a] += ap_grid[idx] * weight
+        np.logical_or(radio_map["exact"][a].ravel()[cell], ~inside, out=exact[a])
+
+    if exact.any():
+        ap_idx, u, t = np.nonzero(exact)
+        mean_dBm[exact] = _exact_mean_rx_dBm(
+            _ap_arrays(aps_meta), ap_idx, x[u, t], y[u, t], dist_matrix[exact], path_loss_exp
+        )
+    return mean_dBm
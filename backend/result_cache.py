@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from result_format import flatten_result, unflatten_result
+
+# Environment fields that change how results are delivered, not the results
+NON_RESULT_FIELDS = {"windowSteps", "workers", "downsample", "downsamplePoints",
+                     "apAggregates", "percentileBands"}
+
+
+def _canonical(value):
+    """
+    Normalizes numbers to float and sequences to lists, so that equivalent
+    environments serialize identically.
+    """
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def scenario_key(env, seed=None):
+    """
+    Returns a stable hash of an environment built by build_environment plus
+    the RNG seed (taken from env["seed"] unless given). Key order and
+    int/float spelling do not affect the key.
+    """
+    if seed is None:
+        seed = env.get("seed")
+    canonical = _canonical({k: v for k, v in env.items()
+                            if k not in NON_RESULT_FIELDS and k != "seed"})
+    payload = json.dumps({"env": canonical, "seed": seed}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _result_nbytes(result):
+    return sum(v.nbytes for v in result.values())
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of raw (array) simulation results. Nested result
+    dicts are stored flattened (see flatten_result).
+
+    The in-memory tier holds at most max_bytes of array data and evicts the
+    least recently used results first. When disk_dir is set, every stored
+    result is also written there as an .npz file, and memory misses fall
+    back to disk, so results survive worker restarts.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, disk_dir=None):
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def _insert(self, key, result):
+        nbytes = _result_nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (result, nbytes)
+        self._nbytes += nbytes
+        while self._nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._nbytes -= evicted
+
+    def get(self, key):
+        """
+        Returns the cached result for key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return unflatten_result(entry[0])
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with np.load(self._disk_path(key)) as npz:
+                result = {name: npz[name] for name in npz.files}
+            for arr in result.values():
+                arr.setflags(write=False)
+            with self._lock:
+                self._insert(key, result)
+                self.disk_hits += 1
+            return unflatten_result(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """
+        Stores a result dict of arrays. The arrays are marked read-only since
+        they are shared between every request that hits this entry.
+        """
+        result = {name: np.asarray(value) for name, value in flatten_result(result).items()}
+        for arr in result.values():
+            arr.setflags(write=False)
+        with self._lock:
+            self._insert(key, result)
+
+        if self.disk_dir:
+            # Write then rename so a concurrent reader never sees a partial file
+            tmp_path = self._disk_path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **result)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,138 @@
+"""
+Compact binary encoding of simulation results.
+
+Layout (all integers little-endian):
+
+    offset  size  content
+    0       4     magic b"NVSR"
+    4       4     uint32 format version (1)
+    8       4     uint32 header length H in bytes
+    12      H     UTF-8 JSON header
+    ...           zero padding up to the next multiple of 8
+    D       ...   column buffers
+
+The header is {"columns": [...], "attrs": {...}}. Each column entry has
+"name", "dtype" (NumPy dtype string such as "<f4" or "|i1"), "shape",
+"offset" and "nbytes". offset is relative to the start of the data section
+D, and each column is a C-ordered buffer that starts on an 8-byte boundary.
+Scalar result fields (e.g. "window") are stored in "attrs". Nested result
+dicts are flattened with dotted names, e.g. "kpis.per.mean".
+
+Float fields are stored as float32 and integer-valued fields (handover,
+retries, collisions, time) as the smallest signed integer type that holds
+their range. A reader can wrap each buffer with np.frombuffer without
+copying.
+"""
+import json
+import struct
+
+import numpy as np
+
+MIMETYPE = "application/vnd.netvisor.columns"
+MAGIC = b"NVSR"
+VERSION = 1
+ALIGNMENT = 8
+
+# Fields whose values are whole numbers and can use a narrow integer type
+INTEGER_FIELDS = {"users_handover", "users_retries", "users_collision", "time"}
+
+
+def flatten_result(result, prefix=""):
+    """
+    Flattens nested result dicts into one level with dotted keys.
+    """
+    flat = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten_result(value, f"{prefix}{name}."))
+        else:
+            flat[f"{prefix}{name}"] = value
+    return flat
+
+
+def unflatten_result(flat):
+    """
+    Inverse of flatten_result.
+    """
+    result = {}
+    for name, value in flat.items():
+        *parents, leaf = name.split(".")
+        node = result
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return result
+
+
+def _pad(n):
+    return -n % ALIGNMENT
+
+
+def _column_dtype(name, arr):
+    if name in INTEGER_FIELDS:
+        lo, hi = (int(arr.min()), int(arr.max())) if arr.size else (0, 0)
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= lo and hi <= info.max:
+                return np.dtype(dtype)
+        return np.dtype(np.int64)
+    return np.dtype(np.float32)
+
+
+def encode_columns(result):
+    """
+    Encodes a result dict of arrays and scalars.
+
+    Yields the encoded payload as a sequence of bytes objects: the preamble
+    and header first, then one buffer per column, so the full payload is
+    never assembled in memory.
+    """
+    columns, buffers, attrs = [], [], {}
+    offset = 0
+    for name, value in flatten_result(result).items():
+        if np.ndim(value) == 0:
+            attrs[name] = value.item() if isinstance(value, (np.generic, np.ndarray)) else value
+            continue
+        arr = np.asarray(value)
+        arr = np.ascontiguousarray(arr, dtype=_column_dtype(name, arr))
+        columns.append({
+            "name": name,
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": offset,
+            "nbytes": arr.nbytes,
+        })
+        buffers.append(arr)
+        offset += arr.nbytes + _pad(arr.nbytes)
+
+    header = json.dumps({"columns": columns, "attrs": attrs}).encode("utf-8")
+    preamble = MAGIC + struct.pack("<II", VERSION, len(header)) + header
+    yield preamble + b"\0" * _pad(len(preamble))
+
+    for arr in buffers:
+        # WSGI servers require bytes, so this is the single copy per column
+        yield arr.tobytes()
+        if _pad(arr.nbytes):
+            yield b"\0" * _pad(arr.nbytes)
+
+
+def decode_columns(payload):
+    """
+    Decodes a payload produced by encode_columns into a dict of arrays
+    (views on payload) and scalar attributes.
+    """
+    payload = memoryview(payload)
+    if bytes(payload[:4]) != MAGIC:
+        raise ValueError("not a NetVisor columnar payload")
+    version, header_len = struct.unpack("<II", payload[4:12])
+    if version != VERSION:
+        raise ValueError(f"unsupported payload version {version}")
+    header = json.loads(bytes(payload[12:12 + header_len]).decode("utf-8"))
+    data_start = 12 + header_len + _pad(12 + header_len)
+
+    result = dict(header["attrs"])
+    for col in header["columns"]:
+        start = data_start + col["offset"]
+        arr = np.frombuffer(payload[start:start + col["nbytes"]], dtype=np.dtype(col["dtype"]))
+        result[col["name"]] = arr.reshape(col["shape"])
+    return result
@@ -0,0 +1,227 @@
+"""
+Memory-mapped on-disk store of simulation runs.
+
+Every run lives in its own directory under the store root: one .npy file
+per result field (nested fields flattened to "group.field", see
+flatten_result) plus a manifest.json with the environment and the shape,
+dtype and axes of every field. Streamed runs are written window by window
+into preallocated .npy memmaps, so a worker never holds more than one
+window in memory, and queries open the fields with mmap_mode="r" and read
+only the users, APs and timesteps they ask for.
+
+The store keeps at most max_runs runs and max_bytes of field data; storing
+a run evicts the oldest runs beyond either bound.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from result_format import flatten_result
+
+MANIFEST = "manifest.json"
+
+_RUN_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def field_axes(name, ndim):
+    """
+    Names of the axes of a result field ("user", "ap", "time"), or None for
+    a field without a known layout.
+    """
+    base = name.rsplit(".", 1)[-1]
+    if base == "time" and ndim == 1:
+        return ["time"]
+    if base.startswith("users_"):
+        return {1: ["user"], 2: ["user", "time"], 3: ["user", "ap", "time"]}.get(ndim)
+    if base.startswith("ap_") and ndim == 1:
+        return ["ap"]
+    return None
+
+
+def _field_entry(name, arr):
+    return {"shape": list(arr.shape), "dtype": arr.dtype.str, "axes": field_axes(name, arr.ndim)}
+
+
+def _run_nbytes(manifest):
+    return sum(int(np.prod(entry["shape"])) * np.dtype(entry["dtype"]).itemsize
+               for entry in manifest["fields"].values())
+
+
+class RunTooLarge(ValueError):
+    """
+    Raised when a single run exceeds the byte quota of the store.
+    """
+
+
+class RunStore:
+    """
+    Stores simulation runs under root_dir and answers sliced queries on
+    them straight from the memory-mapped field files. None for max_runs or
+    max_bytes leaves that bound off.
+    """
+
+    def __init__(self, root_dir, max_runs=100, max_bytes=2 * 2**30):
+        self.root_dir = root_dir
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _run_dir(self, run_id):
+        if not _RUN_ID.match(run_id):
+            raise KeyError(run_id)
+        return os.path.join(self.root_dir, run_id)
+
+    def _commit(self, tmp_dir, run_id, env, fields, n_steps):
+        manifest = {"id": run_id, "created": time.time(), "n_steps": n_steps,
+                    "env": env, "fields": fields}
+        manifest["nbytes"] = _run_nbytes(manifest)
+        if self.max_bytes is not None and manifest["nbytes"] > self.max_bytes:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise RunTooLarge(f"run needs {manifest['nbytes']} bytes, the store holds {self.max_bytes}")
+        with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        with self._lock:
+            # Rename last so a reader never sees a partially written run
+            os.replace(tmp_dir, self._run_dir(run_id))
+            self._evict(keep=run_id)
+        return manifest
+
+    def _evict(self, keep):
+        # Caller holds self._lock; drops the oldest runs beyond the bounds
+        runs = self.list_runs()
+        total = sum(run["nbytes"] for run in runs)
+        for run in runs:
+            over_count = self.max_runs is not None and len(runs) > self.max_runs
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            if run["id"] == keep:
+                continue
+            self.delete(run["id"])
+            runs = [r for r in runs if r["id"] != run["id"]]
+            total -= run["nbytes"]
+
+    def save(self, result, env):
+        """
+        Stores a raw in-memory result and returns its manifest.
+        """
+        run_id = uuid.uuid4().hex
+        tmp_dir = os.path.join(self.root_dir, f".{run_id}.tmp")
+        os.makedirs(tmp_dir)
+        fields = {}
+        for name, value in flatten_result(result).items():
+            arr = np.asarray(value)
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), arr)
+            fields[name] = _field_entry(name, arr)
+        n_steps = len(result["time"]) if "time" in result else None
+        return self._commit(tmp_dir, run_id, env, fields, n_steps)
+
+    def save_chunks(self, chunks, env, n_steps):
+        """
+        Stores a run streamed as raw chunks (see
+        run_multiuser_wifi_simulation_stream) covering n_steps timesteps,
+        writing each chunk into the field memmaps as it arrives. Returns
+        the manifest.
+        """
+        run_id = uuid.uuid4().hex
+        tmp_dir = os.path.join(self.root_dir, f".{run_id}.tmp")
+        os.makedirs(tmp_dir)
+        maps = {}
+        start = 0
+        try:
+            for chunk in chunks:
+                arrays = {name: value for name, value in chunk.items() if isinstance(value, np.ndarray)}
+                if not maps:
+                    maps = {
+                        name: np.lib.format.open_memmap(
+                            os.path.join(tmp_dir, f"{name}.npy"), mode="w+",
+                            dtype=arr.dtype, shape=arr.shape[:-1] + (n_steps,)
+                        )
+                        for name, arr in arrays.items()
+                    }
+                stop = start + len(chunk["time"])
+                for name, arr in arrays.items():
+                    maps[name][..., start:stop] = arr
+                start = stop
+            fields = {name: _field_entry(name, arr) for name, arr in maps.items()}
+            for arr in maps.values():
+                arr.flush()
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        finally:
+            maps.clear()
+        return self._commit(tmp_dir, run_id, env, fields, n_steps)
+
+    def manifest(self, run_id):
+        """
+        Returns the manifest of a run; raises KeyError for an unknown run.
+        """
+        try:
+            with open(os.path.join(self._run_dir(run_id), MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(run_id) from None
+
+    def list_runs(self):
+        """
+        Id, creation time, size in bytes and field names of every stored
+        run, oldest first.
+        """
+        runs = []
+        for run_id in os.listdir(self.root_dir):
+            if _RUN_ID.match(run_id):
+                try:
+                    manifest = self.manifest(run_id)
+                except KeyError:
+                    continue  # deleted meanwhile
+                runs.append({"id": run_id, "created": manifest["created"],
+                             "nbytes": manifest.get("nbytes", _run_nbytes(manifest)),
+                             "fields": sorted(manifest["fields"])})
+        return sorted(runs, key=lambda run: run["created"])
+
+    def delete(self, run_id):
+        """
+        Removes a run. Returns False if it does not exist.
+        """
+        run_dir = self._run_dir(run_id)
+        if not os.path.isdir(run_dir):
+            return False
+        shutil.rmtree(run_dir)
+        return True
+
+    def field(self, run_id, name):
+        """
+        Opens one field of a run as a read-only memmap.
+        """
+        if name not in self.manifest(run_id)["fields"]:
+            raise KeyError(name)
+        return np.load(os.path.join(self._run_dir(run_id), f"{name}.npy"), mmap_mode="r")
+
+    def query(self, run_id, name, users=None, aps=None, start=None, stop=None):
+        """
+        Reads a slice of one field. users and aps select along the user and
+        AP axes (a slice or a list of indices, all if None); start and stop
+        bound the timestep range [start, stop). Selections on axes the field
+        does not have are ignored. Only the selected data is read from disk.
+        """
+        arr = self.field(run_id, name)
+        axes = self.manifest(run_id)["fields"][name]["axes"] or []
+        selections = {"user": users, "ap": aps, "time": slice(start, stop)}
+
+        # Basic slices first (views of the memmap), then index lists one axis
+        # at a time so numpy does not broadcast them against each other
+        view = tuple(selections[axis] if isinstance(selections[axis], slice) else slice(None)
+                     for axis in axes)
+        out = arr[view]
+        for i, axis in enumerate(axes):
+            if isinstance(selections[axis], (list, tuple, np.ndarray)):
+                out = np.take(out, selections[axis], axis=i)
+        return np.array(out)
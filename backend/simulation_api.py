@@ -1,26 +1,460 @@
-from flask import Flask, request, jsonify
+import json
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from core_simulation import run_multiuser_wifi_simulation
+from core_simulation import (
+    OUTPUT_FIELDS,
+    run_multiuser_wifi_simulation,
+    run_multiuser_wifi_simulation_stream,
+    _to_serializable,
+)
+from downsample import METHODS as DOWNSAMPLE_METHODS, reduce_chunks_for_request, reduce_for_request
 from environment import build_environment
+from instrumentation import collect_timings, observe_request, render_metrics, stage
+from jobs import JobManager, JobQueueFull
+from mac import TRAFFIC_MODELS
+from radio_map import RADIO_MAP_MAX_NODES, radio_map_nodes
+from monte_carlo import run_monte_carlo_simulation
+from result_cache import ResultCache, scenario_key
+from run_store import RunStore, RunTooLarge
+from stage_cache import StageStore
+from sweep import expand_grid, run_sweep
+import result_format
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-@app.route("/api/simulation", methods=["POST"])
-def handle_multiuser_simulation():
-    data = request.get_json()
+result_cache = ResultCache(
+    max_bytes=int(os.environ.get("NETVISOR_CACHE_MAX_BYTES", 256 * 2**20)),
+    disk_dir=os.environ.get("NETVISOR_CACHE_DIR") or None
+)
+
+stage_store = StageStore(
+    max_bytes=int(os.environ.get("NETVISOR_STAGE_CACHE_MAX_BYTES", 512 * 2**20))
+)
+
+job_manager = JobManager(
+    max_workers=int(os.environ.get("NETVISOR_JOB_WORKERS", 2)),
+    max_queue=int(os.environ.get("NETVISOR_JOB_QUEUE", 16)),
+    storage_dir=os.environ.get("NETVISOR_JOB_DIR") or None,
+    runner=lambda env: _run_request(env)
+)
+
+run_store = RunStore(
+    os.environ.get("NETVISOR_RUN_DIR") or os.path.join(tempfile.gettempdir(), "netvisor-runs"),
+    max_runs=int(os.environ.get("NETVISOR_RUN_MAX_COUNT", 100)),
+    max_bytes=int(os.environ.get("NETVISOR_RUN_MAX_BYTES", 2 * 2**30))
+)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_simulation_request(data):
+    """
+    Returns an error message for an invalid simulation request, or None.
+    """
     if "numberOfNodes" not in data or data["numberOfNodes"] <= 0:
-        return jsonify({"error": "numberOfNodes must be a positive integer"}), 400
-    
+        return "numberOfNodes must be a positive integer"
+
     if "simulationTime" not in data or data["simulationTime"] <= 0:
-        return jsonify({"error": "simulationTime must be positive"}), 400
+        return "simulationTime must be positive"
+
+    if data.get("timeStep", 1.0) <= 0:
+        return "timeStep must be positive"
+
+    if data["simulationTime"] < data.get("timeStep", 1.0):
+        return "simulationTime must be at least one timeStep"
 
     if "numberOfAccessPoints" not in data or data["numberOfAccessPoints"] <= 0:
-        return jsonify({"error": "numberOfAccessPoints must be a positive integer"}), 400
+        return "numberOfAccessPoints must be a positive integer"
+
+    if data.get("seed") is not None and not (_is_int(data["seed"]) and data["seed"] >= 0):
+        return "seed must be a non-negative integer"
+
+    if data.get("workers") is not None and not (_is_int(data["workers"]) and data["workers"] > 0):
+        return "workers must be a positive integer"
+
+    if not _is_int(data.get("realizations", 1)) or data.get("realizations", 1) <= 0:
+        return "realizations must be a positive integer"
+
+    if data.get("radioMapResolution") is not None:
+        if data["radioMapResolution"] <= 0:
+            return "radioMapResolution must be positive"
+        ap_positions = data.get("apPositions", [[0, 0]] * int(data["numberOfAccessPoints"]))
+        if radio_map_nodes(ap_positions, data["radioMapResolution"]) > RADIO_MAP_MAX_NODES:
+            return f"radioMapResolution is too fine for this layout (over {RADIO_MAP_MAX_NODES} grid nodes)"
+
+    if data.get("interferenceRadius") is not None and data["interferenceRadius"] <= 0:
+        return "interferenceRadius must be positive"
+
+    if data.get("precision", "float64") not in ("float32", "float64"):
+        return "precision must be float32 or float64"
+
+    fields = data.get("fields")
+    if fields is not None:
+        if not isinstance(fields, list) or not fields:
+            return "fields must be a non-empty list"
+        unknown = sorted(set(fields) - set(OUTPUT_FIELDS))
+        if unknown:
+            return f"unknown fields: {', '.join(unknown)}"
+
+    if data.get("macModel", "analytic") not in ("analytic", "csma"):
+        return "macModel must be analytic or csma"
+
+    if data.get("trafficModel", "saturated") not in TRAFFIC_MODELS:
+        return f"trafficModel must be one of {', '.join(TRAFFIC_MODELS)}"
+
+    if data.get("trafficRate", 1) <= 0:
+        return "trafficRate must be positive"
+
+    if data.get("realizations", 1) > 1:
+        # Monte Carlo runs report KPI statistics of every field, serially,
+        # with the analytic MAC
+        for key in ("fields", "workers", "trafficModel", "trafficRate"):
+            if data.get(key) is not None:
+                return f"{key} is not supported with realizations > 1"
+        if data.get("macModel") == "csma":
+            return "macModel csma runs single realizations only"
+
+    if data.get("downsample") is not None and data["downsample"] not in DOWNSAMPLE_METHODS:
+        return f"downsample must be one of {', '.join(DOWNSAMPLE_METHODS)}"
+
+    if data.get("downsamplePoints", 3) < 3:
+        return "downsamplePoints must be at least 3"
+
+    pruning = data.get("interferenceRadius") is not None or data.get("interferenceThresholdDBm") is not None
+    if pruning and data.get("radioMapResolution") is not None:
+        return "interference pruning cannot be combined with radioMapResolution"
+
+    correlated = False
+    for key in ("shadowDecorrelationDistance", "fadingDecorrelationDistance"):
+        if data.get(key) is not None:
+            if data[key] <= 0:
+                return f"{key} must be positive"
+            correlated = True
+    if correlated and (pruning or data.get("radioMapResolution") is not None):
+        return "correlated fading cannot be combined with radioMapResolution or interference pruning"
+
+    return None
+
+
+def _wants_binary():
+    """
+    True when the client asked for the columnar binary format, either with
+    ?format=binary or by preferring its mimetype in the Accept header.
+    """
+    if request.args.get("format") == "binary":
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", result_format.MIMETYPE])
+    return best == result_format.MIMETYPE
+
+
+def _run_cached(env):
+    """
+    Returns the raw result for env, running the simulation only on a cache
+    miss. Single runs reuse the unchanged stages of earlier runs. Unseeded
+    runs are never cached, so every request draws a fresh sample.
+    """
+    seeded = env.get("seed") is not None
+    key = scenario_key(env) if seeded else None
+    result = result_cache.get(key) if seeded else None
+    if result is None:
+        if env.get("realizations", 1) > 1:
+            result = run_monte_carlo_simulation(env, serialize=False)
+        else:
+            result = run_multiuser_wifi_simulation(env, serialize=False,
+                                                   stage_store=stage_store if seeded else None)
+        if seeded:
+            result_cache.put(key, result)
+    return result
+
+
+def _summary_env(env):
+    """
+    env, with the SINR and serving APs added to a field selection when the
+    AP aggregates or percentile bands, which are computed from them, are
+    requested.
+    """
+    fields = env.get("fields")
+    if fields is None or not (env.get("apAggregates") or env.get("percentileBands")):
+        return env
+    return dict(env, fields=sorted(set(fields) | {"users_sinr", "users_handover"}))
+
+
+def _select_fields(result, fields):
+    """
+    Drops the per-step fields, and their envelopes or LTTB steps, that are
+    not in fields (all kept if None).
+    """
+    if fields is None:
+        return result
+    result = {name: value for name, value in result.items() if name not in OUTPUT_FIELDS or name in fields}
+    for name in ("envelope", "lttb_time"):
+        if name in result:
+            result[name] = {field: value for field, value in result[name].items() if field in fields}
+    return result
+
+
+def _run_request(env):
+    """
+    The raw result POST /api/simulation returns for env: the cached run,
+    downsampled as requested. Jobs run through the same path.
+    """
+    result = reduce_for_request(_run_cached(_summary_env(env)), env)
+    return _select_fields(result, env.get("fields"))
+
+
+def _request_samples(env):
+    """
+    Number of user-AP-step samples a request simulates.
+    """
+    n_steps = int(float(env["simulationTime"]) / float(env["timeStep"]))
+    return (int(env["numberOfNodes"]) * int(env["numberOfAccessPoints"]) * n_steps
+            * int(env.get("realizations", 1)))
+
+
+def _server_timing(timings):
+    """
+    Server-Timing header value listing the duration of every stage.
+    """
+    return ", ".join(f"{t['stage']};dur={t['seconds'] * 1e3:.3f}" for t in timings)
+
+
+@app.route("/api/simulation", methods=["POST"])
+def handle_multiuser_simulation():
+    """
+    Runs a simulation. With ?timings=1 the JSON response gets a "timings"
+    block with the wall time, sizes and peak memory of every stage up to
+    serialization, and a Server-Timing header that also covers the JSON
+    encoding. The downsample options reduce the time series before encoding
+    (see downsample.reduce_result).
+    """
+    data = request.get_json()
+    error = _validate_simulation_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    env = build_environment(data)
+    want_timings = request.args.get("timings") in ("1", "true") and not _wants_binary()
+    start = time.perf_counter()
+    with collect_timings(memory=True) if want_timings else nullcontext() as timings:
+        result = _run_request(env)
+        if _wants_binary():
+            observe_request("simulation", time.perf_counter() - start, _request_samples(env))
+            return Response(result_format.encode_columns(result), mimetype=result_format.MIMETYPE)
+        with stage("serialization"):
+            payload = _to_serializable(result)
+        if want_timings:
+            payload["timings"] = {"total_seconds": time.perf_counter() - start, "stages": list(timings)}
+        with stage("json_encode"):
+            body = app.json.dumps(payload)
+    observe_request("simulation", time.perf_counter() - start, _request_samples(env))
+
+    response = Response(body, mimetype="application/json")
+    if want_timings:
+        response.headers["Server-Timing"] = _server_timing(timings)
+    return response
+
+
+@app.route("/api/simulation/stream", methods=["POST"])
+def handle_multiuser_simulation_stream():
+    """
+    Streams per-window result chunks as newline-delimited JSON, one chunk per
+    line, as soon as each window is computed. The downsample options reduce
+    every chunk, sharing downsamplePoints between the windows.
+    """
+    data = request.get_json()
+    error = _validate_simulation_request(data)
+    if error is None and data.get("macModel") == "csma":
+        error = "macModel csma is not supported when streaming"
+    if error:
+        return jsonify({"error": error}), 400
+
+    env = build_environment(data)
+
+    def generate():
+        chunks = run_multiuser_wifi_simulation_stream(_summary_env(env), serialize=False)
+        for chunk in reduce_chunks_for_request(chunks, env):
+            yield json.dumps(_to_serializable(_select_fields(chunk, env["fields"]))) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/api/sweep", methods=["POST"])
+def handle_sweep():
+    """
+    Runs a parameter sweep: {"base": request, "axes": {field: values or
+    range}, "workers": n}. Returns one row of summary KPIs per grid point
+    (see sweep.run_sweep).
+    """
+    data = request.get_json()
+    base, axes = data.get("base", {}), data.get("axes")
+    if not isinstance(axes, dict) or not axes:
+        return jsonify({"error": "axes must be a non-empty object"}), 400
+    try:
+        _, requests = expand_grid(base, axes)
+    except (ValueError, KeyError, TypeError) as exc:
+        return jsonify({"error": f"invalid sweep: {exc}"}), 400
+    for point in requests:
+        error = _validate_simulation_request(point)
+        if error is None and point.get("realizations", 1) > 1:
+            error = "sweeps run single realizations only"
+        if error:
+            return jsonify({"error": error}), 400
+
+    start = time.perf_counter()
+    table = run_sweep(base, axes, workers=data.get("workers"), store=stage_store)
+    samples = sum(_request_samples(build_environment(point)) for point in requests)
+    observe_request("sweep", time.perf_counter() - start, samples)
+    return jsonify(table)
+
+
+@app.route("/metrics", methods=["GET"])
+def handle_metrics():
+    """
+    Prometheus scrape endpoint: per-stage and per-request-size latency histograms.
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/cache/stats", methods=["GET"])
+def handle_cache_stats():
+    return jsonify({**result_cache.stats(), "stages": stage_store.stats()})
+
+
+@app.route("/api/jobs", methods=["POST"])
+def handle_submit_job():
+    data = request.get_json()
+    error = _validate_simulation_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        job_id = job_manager.submit(build_environment(data))
+    except JobQueueFull as exc:
+        return jsonify({"error": str(exc)}), 429
+    return jsonify(job_manager.status(job_id)), 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def handle_job_status(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(status)
+
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def handle_cancel_job(job_id):
+    if not job_manager.cancel(job_id):
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job_manager.status(job_id))
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def handle_job_result(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "unknown job"}), 404
+    if status["status"] != "done":
+        return jsonify({"error": f"job is {status['status']}", **status}), 409
+
+    result = job_manager.result(job_id)
+    if _wants_binary():
+        return Response(result_format.encode_columns(result), mimetype=result_format.MIMETYPE)
+    return jsonify(_to_serializable(result))
+
+
+def _index_arg(name):
+    """
+    Parses a user or AP selection query argument: "a:b" for a range, or a
+    comma-separated list of indices. None when absent.
+    """
+    text = request.args.get(name)
+    if text is None:
+        return None
+    if ":" in text:
+        lo, hi = text.split(":", 1)
+        return slice(int(lo) if lo else None, int(hi) if hi else None)
+    return [int(v) for v in text.split(",") if v]
+
+
+@app.route("/api/runs", methods=["POST"])
+def handle_store_run():
+    """
+    Runs a simulation into the run store and returns its manifest. The
+    stored result is the one POST /api/simulation computes for the same
+    request, at full resolution: slices are taken at query time, so the
+    downsample options are rejected.
+    """
+    data = request.get_json()
+    error = _validate_simulation_request(data)
+    if error is None and data.get("downsample") is not None:
+        error = "stored runs are kept at full resolution; query slices instead of downsample"
+    if error:
+        return jsonify({"error": error}), 400
 
     env = build_environment(data)
-    result = run_multiuser_wifi_simulation(env)
-    return jsonify(result)
+    try:
+        manifest = run_store.save(_run_cached(env), env)
+    except RunTooLarge as exc:
+        return jsonify({"error": str(exc)}), 413
+    return jsonify(manifest), 201
+
+
+@app.route("/api/runs", methods=["GET"])
+def handle_list_runs():
+    return jsonify(run_store.list_runs())
+
+
+@app.route("/api/runs/<run_id>", methods=["GET"])
+def handle_run_manifest(run_id):
+    try:
+        return jsonify(run_store.manifest(run_id))
+    except KeyError:
+        return jsonify({"error": "unknown run"}), 404
+
+
+@app.route("/api/runs/<run_id>", methods=["DELETE"])
+def handle_delete_run(run_id):
+    try:
+        deleted = run_store.delete(run_id)
+    except KeyError:
+        deleted = False
+    if not deleted:
+        return jsonify({"error": "unknown run"}), 404
+    return "", 204
+
+
+@app.route("/api/runs/<run_id>/fields/<field>", methods=["GET"])
+def handle_run_field(run_id, field):
+    """
+    Reads a slice of one stored field: ?users= and ?aps= take "a:b" or a
+    comma-separated list of indices, ?start= and ?stop= bound the timestep
+    range. Only the selected data is read from disk.
+    """
+    try:
+        users, aps = _index_arg("users"), _index_arg("aps")
+        start, stop = request.args.get("start", type=int), request.args.get("stop", type=int)
+    except ValueError:
+        return jsonify({"error": "invalid selection"}), 400
+    try:
+        data = run_store.query(run_id, field, users=users, aps=aps, start=start, stop=stop)
+    except KeyError:
+        return jsonify({"error": "unknown run or field"}), 404
+    except IndexError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if _wants_binary():
+        return Response(result_format.encode_columns({field: data}), mimetype=result_format.MIMETYPE)
+    return jsonify({"field": field, "shape": list(data.shape), "data": _to_serializable(data)})
+
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,218 @@
+"""
+Incremental re-simulation with cached pipeline stages.
+
+A single-run simulation is split into the stages positions -> distances ->
+sinr -> handover -> throughput. Each stage's artifact is keyed by a hash of
+the key of the stage before it plus the environment fields the stage itself
+reads (STAGE_FIELDS), so a key changes exactly when the stage or anything
+upstream of it has different inputs. Resubmitting a scenario with, say, a
+new dataSize or maxRetries reuses positions, distances, SINR and handover
+from the StageStore and recomputes only the throughput stage.
+
+Only seeded runs are staged: every stage draws from its own streams of
+spawn_streams(seed), so recomputing one stage reproduces the draws it would
+have made in a full run.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core_simulation import (
+    METRIC_FIELDS,
+    OUTPUT_FIELDS,
+    compute_distances,
+    handover_stage,
+    serving_load,
+    sinr_stage,
+    spawn_streams,
+    throughput_stage,
+)
+from channel import correlated_channel
+from instrumentation import stage
+from mobility import generate_realistic_user_positions
+from result_cache import _canonical
+
+STAGES = ["positions", "distances", "sinr", "handover", "throughput"]
+
+# Environment fields read by each stage, in addition to its upstream stage
+STAGE_FIELDS = {
+    "positions": ["simulationTime", "timeStep", "numberOfNodes", "numberOfAccessPoints",
+                  "apPositions", "velocity", "seed"],
+    "distances": ["precision"],
+    "sinr": ["pathLossExponent", "K0dB", "KDecay", "shadowSigmaDB", "transmissionPowers",
+             "frequencies", "bandwidths", "antennaGains", "beamwidths", "radioMapResolution",
+             "interferenceRadius", "interferenceThresholdDBm", "shadowDecorrelationDistance",
+             "fadingDecorrelationDistance"],
+    "handover": ["hysteresis_dB", "timeToTrigger"],
+    "throughput": ["dataSize", "maxRetries"],
+}
+
+
+def stage_keys(env, metric_fields=METRIC_FIELDS):
+    """
+    Returns the cache key of every stage for env. metric_fields, the
+    throughput metrics computed, is part of the throughput key because it
+    selects how retries are sampled.
+    """
+    keys = {}
+    upstream = ""
+    for name in STAGES:
+        inputs = {field: env.get(field) for field in STAGE_FIELDS[name]}
+        if name == "throughput":
+            inputs["metrics"] = sorted(metric_fields)
+        payload = json.dumps({"stage": name, "upstream": upstream, "inputs": _canonical(inputs)},
+                             sort_keys=True, separators=(",", ":"))
+        upstream = keys[name] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return keys
+
+
+def _artifact_nbytes(artifact):
+    if isinstance(artifact, dict):
+        return sum(_artifact_nbytes(v) for v in artifact.values())
+    if isinstance(artifact, tuple):
+        return sum(_artifact_nbytes(v) for v in artifact)
+    return artifact.nbytes
+
+
+def _freeze(artifact):
+    if isinstance(artifact, dict):
+        for value in artifact.values():
+            _freeze(value)
+    elif isinstance(artifact, tuple):
+        for value in artifact:
+            _freeze(value)
+    else:
+        artifact.setflags(write=False)
+    return artifact
+
+
+class StageStore:
+    """
+    Thread-safe LRU store of stage artifacts (arrays, tuples or dicts of
+    arrays), bounded to max_bytes of array data. Stored arrays are marked
+    read-only since every later run hitting the entry shares them.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20):
+        self.max_bytes = int(max_bytes)
+        self.hits = dict.fromkeys(STAGES, 0)
+        self.misses = dict.fromkeys(STAGES, 0)
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, stage_name, key, compute):
+        """
+        Returns the artifact stored for (stage_name, key), computing and
+        storing it with compute() on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get((stage_name, key))
+            if entry is not None:
+                self._entries.move_to_end((stage_name, key))
+                self.hits[stage_name] += 1
+                return entry[0]
+            self.misses[stage_name] += 1
+
+        artifact = _freeze(compute())
+        nbytes = _artifact_nbytes(artifact)
+        if nbytes <= self.max_bytes:
+            with self._lock:
+                if (stage_name, key) in self._entries:
+                    self._nbytes -= self._entries.pop((stage_name, key))[1]
+                self._entries[(stage_name, key)] = (artifact, nbytes)
+                self._nbytes += nbytes
+                while self._nbytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._nbytes -= evicted
+        return artifact
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def upstream_stages(env, aps_meta, params, store):
+    """
+    Positions and distances of a seeded env, from store or computed into
+    it. Returns the user positions and the distance tensor.
+    """
+    keys = stage_keys(env)
+    n_users, n_steps = params["n_users"], params["n_steps"]
+
+    def positions():
+        with stage("mobility", n_users=n_users, n_steps=n_steps):
+            return generate_realistic_user_positions(
+                n_users=n_users,
+                n_steps=n_steps,
+                ap_positions=env["apPositions"],
+                velocity=params["velocity"],
+                time_step=params["time_step"],
+                seed=spawn_streams(params["seed"], 0)["mobility"]
+            )
+
+    user_positions = store.get_or_compute("positions", keys["positions"], positions)
+
+    def distances():
+        with stage("distance", n_users=n_users, n_aps=len(aps_meta), n_steps=n_steps):
+            return compute_distances(aps_meta, user_positions, params["dtype"])
+
+    return user_positions, store.get_or_compute("distances", keys["distances"], distances)
+
+
+def simulate_staged(env, aps_meta, params, store, fields=None):
+    """
+    Staged counterpart of the serial full simulation for a seeded env, with
+    params from _simulation_params. Stages found in store are reused, and
+    stages feeding none of fields (see OUTPUT_FIELDS) are skipped. Returns
+    the result and the user positions.
+    """
+    fields = OUTPUT_FIELDS if fields is None else fields
+    metric_fields = [f for f in METRIC_FIELDS if f in fields]
+    keys = stage_keys(env, metric_fields)
+    n_users, n_steps = params["n_users"], params["n_steps"]
+    streams = spawn_streams(params["seed"], n_users)
+    user_positions, dist_matrix = upstream_stages(env, aps_meta, params, store)
+    result = {"users_distance": dist_matrix.transpose(1, 0, 2)}
+
+    if metric_fields or "users_sinr" in fields or "users_handover" in fields:
+        sinr_dB = store.get_or_compute("sinr", keys["sinr"], lambda: sinr_stage(
+            aps_meta, dist_matrix, user_positions, params["path_loss_exp"], params["K0_dB"],
+            params["K_decay"], params["shadow_sigma_dB"], streams["fading"],
+            params["radio_map_resolution"], params["interference_radius"],
+            correlated_channel(params["shadow_decorrelation_m"], params["fading_decorrelation_m"])
+        ))
+        handover_all, n_users_on_ap = store.get_or_compute("handover", keys["handover"], lambda: handover_stage(
+            sinr_dB, params["hysteresis_dB"], time_to_trigger_steps=params["time_to_trigger_steps"]
+        )[:2])
+        result["users_sinr"] = sinr_dB
+        result["users_handover"] = handover_all
+
+    if metric_fields:
+        def throughput():
+            with stage("throughput", n_users=n_users, n_steps=n_steps):
+                return throughput_stage(
+                    sinr_dB, handover_all, serving_load(handover_all, n_users_on_ap),
+                    params["packet_size_bytes"], params["max_retries"], streams["retry"],
+                    fields=metric_fields
+                )
+
+        result.update(store.get_or_compute("throughput", keys["throughput"], throughput))
+
+    result = {name: result[name] for name in OUTPUT_FIELDS if name in fields}
+    result["time"] = np.arange(1, n_steps+1)
+    return result, user_positions
@@ -0,0 +1,165 @@
+"""
+Parameter sweeps over a grid of scenarios.
+
+run_sweep expands parameter axes (request fields such as pathLossExponent,
+transmissionPowers, apPositions or numberOfNodes) into the full scenario
+grid and runs it on a pool of worker threads, returning one row of summary
+KPIs per grid point.
+
+Work is shared through a StageStore (see stage_cache): all points share one
+seed, so a mobility trace is computed once and reused by every variant that
+only changes path loss or transmit power, and distances are reused by every
+variant that keeps the AP placement. The distinct mobility traces and
+distance tensors are computed first, one per worker, and then every point
+runs on the pool, reading them from the store.
+"""
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core_simulation import (
+    OUTPUT_FIELDS,
+    _build_aps_meta,
+    _simulation_params,
+    run_multiuser_wifi_simulation,
+    users_per_ap,
+)
+from environment import build_environment
+from stage_cache import StageStore, stage_keys, upstream_stages
+
+MAX_SWEEP_POINTS = 1000
+
+# Per-AP list fields that also accept one value for every AP
+PER_AP_FIELDS = ["transmissionPowers", "frequencies", "bandwidths", "antennaGains", "beamwidths"]
+
+KPI_COLUMNS = ["throughput_bps", "mac_throughput_bps", "serving_sinr_dB", "per", "retries",
+               "collision_rate", "handovers_per_user", "ap_load_max"]
+
+SWEEP_FIELDS = [f for f in OUTPUT_FIELDS if f != "users_distance"]
+
+
+def axis_values(spec):
+    """
+    Values of one sweep axis: a list of values as given, or a range
+    {"start", "stop", "num"} (evenly spaced, inclusive) or
+    {"start", "stop", "step"} (stop included when on the step).
+    """
+    if isinstance(spec, dict):
+        start, stop = float(spec["start"]), float(spec["stop"])
+        if "num" in spec:
+            return np.linspace(start, stop, int(spec["num"])).tolist()
+        step = float(spec["step"])
+        if step <= 0:
+            raise ValueError("sweep range step must be positive")
+        return np.arange(start, stop + step / 2, step).tolist()
+    if not isinstance(spec, list) or not spec:
+        raise ValueError("sweep axis must be a non-empty list or a range")
+    return list(spec)
+
+
+def _point_request(base, point):
+    """
+    Request data of one grid point: base overridden by the point's values.
+    numberOfAccessPoints follows apPositions, and scalar values of per-AP
+    fields are repeated for every AP.
+    """
+    data = {**base, **point}
+    if "apPositions" in point and "numberOfAccessPoints" not in point:
+        data["numberOfAccessPoints"] = len(point["apPositions"])
+    n_aps = int(data.get("numberOfAccessPoints", 3))
+    for field in PER_AP_FIELDS:
+        if isinstance(data.get(field), (int, float)):
+            data[field] = [data[field]] * n_aps
+    return data
+
+
+def expand_grid(base, axes):
+    """
+    Returns the grid points, as dicts {axis field: value}, and the request
+    data of each, in row-major order over axes.
+    """
+    names = list(axes)
+    values = [axis_values(axes[name]) for name in names]
+    n_points = int(np.prod([len(v) for v in values]))
+    if n_points > MAX_SWEEP_POINTS:
+        raise ValueError(f"sweep has {n_points} points, more than {MAX_SWEEP_POINTS}")
+    points = [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    return points, [_point_request(base, point) for point in points]
+
+
+def point_kpis(result):
+    """
+    Summary KPIs of one single-run result, averaged over users and steps.
+    """
+    handover = result["users_handover"]
+    n_users, n_aps, _ = result["users_sinr"].shape
+    serving_sinr = np.take_along_axis(result["users_sinr"], handover[:, None, :] - 1, axis=1)
+    return {
+        "throughput_bps": float(result["users_throughput"].mean()),
+        "mac_throughput_bps": float(result["users_mac_throughput"].mean()),
+        "serving_sinr_dB": float(serving_sinr.mean()),
+        "per": float(result["users_per"].mean()),
+        "retries": float(result["users_retries"].mean()),
+        "collision_rate": float(result["users_collision"].mean()),
+        "handovers_per_user": np.count_nonzero(np.diff(handover, axis=1)) / n_users,
+        "ap_load_max": int(users_per_ap(handover, n_aps).max()),
+    }
+
+
+def run_sweep(base, axes, workers=None, store=None):
+    """
+    Runs every point of the grid spanned by axes over the base request.
+
+    base and the grid points are raw request dicts (as posted to
+    /api/simulation); each point must be a single realization. store is the
+    StageStore to share stages through, a fresh one if None. Returns a
+    table {"columns", "rows"} with the axis values and KPI_COLUMNS of every
+    point, the shared seed, and the number of stages computed and reused.
+    """
+    points, requests = expand_grid(base, axes)
+    seed = base.get("seed")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2**63)
+    envs = [build_environment({**data, "seed": seed, "workers": 1, "fields": SWEEP_FIELDS})
+            for data in requests]
+    if any(env["realizations"] > 1 for env in envs):
+        raise ValueError("sweeps run single realizations only")
+    store = StageStore() if store is None else store
+
+    # One point per distinct (positions, distances) chain; points sharing a
+    # mobility trace but not the AP layout are computed by one worker
+    traces = {}
+    for env in envs:
+        keys = stage_keys(env)
+        traces.setdefault(keys["positions"], {}).setdefault(keys["distances"], env)
+
+    before = store.stats()
+    rows = [None] * len(envs)
+
+    def run_upstream(layouts):
+        for env in layouts.values():
+            upstream_stages(env, _build_aps_meta(env), _simulation_params(env), store)
+
+    def run_point(i):
+        result = run_multiuser_wifi_simulation(envs[i], serialize=False, stage_store=store)
+        kpis = point_kpis(result)
+        rows[i] = [points[i][name] for name in axes] + [kpis[c] for c in KPI_COLUMNS]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(envs)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run_upstream, traces.values()))
+        list(pool.map(run_point, range(len(envs))))
+
+    after = store.stats()
+    return {
+        "columns": list(axes) + KPI_COLUMNS,
+        "rows": rows,
+        "seed": seed,
+        "points": len(rows),
+        "stages_computed": sum(after["misses"].values()) - sum(before["misses"].values()),
+        "stages_reused": sum(after["hits"].values()) - sum(before["hits"].values()),
+    }
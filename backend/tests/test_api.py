@@ -0,0 +1,304 @@
+import json
+
+import numpy as np
+import pytest
+from backend import simulation_api
+
+
+@pytest.fixture
+def client():
+    simulation_api.app.config["TESTING"] = True
+    simulation_api.result_cache.clear()
+    simulation_api.stage_store.clear()
+    return simulation_api.app.test_client()
+
+
+@pytest.fixture
+def scenario():
+    return {
+        "simulationTime": 12,
+        "timeStep": 1,
+        "numberOfNodes": 2,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [10, 0]],
+        "frequencies": [5.18e9, 5.22e9],
+    }
+
+
+def test_simulation_rejects_invalid_request(client, scenario):
+    scenario["numberOfNodes"] = 0
+    resp = client.post("/api/simulation", json=scenario)
+    assert resp.status_code == 400
+    resp = client.post("/api/simulation/stream", json=scenario)
+    assert resp.status_code == 400
+
+
+def test_simulation_rejects_runs_shorter_than_one_step(client, scenario):
+    scenario.update(simulationTime=1, timeStep=2)
+    assert client.post("/api/simulation", json=scenario).status_code == 400
+    assert client.post("/api/simulation/stream", json=scenario).status_code == 400
+    scenario["timeStep"] = 0
+    assert client.post("/api/simulation", json=scenario).status_code == 400
+
+
+def test_simulation_rejects_invalid_seed_and_workers(client, scenario):
+    for option in ({"seed": "abc"}, {"seed": -1}, {"seed": 1.5}, {"workers": 0}, {"workers": "2"}):
+        resp = client.post("/api/simulation", json=dict(scenario, **option))
+        assert resp.status_code == 400
+        assert list(option)[0] in resp.get_json()["error"]
+
+
+def test_simulation_stream_returns_ndjson_chunks(client, scenario):
+    scenario["windowSteps"] = 5
+    resp = client.post("/api/simulation/stream", json=scenario)
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+
+    chunks = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [c["window"] for c in chunks] == [0, 1, 2]
+    assert sum((c["time"] for c in chunks), []) == list(range(1, 13))
+    sinr = np.concatenate([np.array(c["users_sinr"]) for c in chunks], axis=2)
+    assert sinr.shape == (2, 2, 12)
+
+
+def test_simulation_binary_format_matches_json(client, scenario):
+    from backend import result_format
+
+    resp = client.post("/api/simulation?format=binary", json=scenario)
+    assert resp.status_code == 200
+    assert resp.mimetype == result_format.MIMETYPE
+    cols = result_format.decode_columns(resp.get_data())
+
+    assert cols["users_sinr"].dtype == np.float32
+    assert cols["users_sinr"].shape == (2, 2, 12)
+    assert cols["users_handover"].dtype == np.int8
+    assert set(np.unique(cols["users_handover"])).issubset({1, 2})
+    assert cols["time"].tolist() == list(range(1, 13))
+
+    resp = client.post("/api/simulation", json=scenario,
+                       headers={"Accept": result_format.MIMETYPE})
+    assert resp.mimetype == result_format.MIMETYPE
+
+    # JSON stays the default
+    resp = client.post("/api/simulation", json=scenario)
+    assert resp.mimetype == "application/json"
+
+
+def test_simulation_repeated_scenario_hits_cache(client, scenario):
+    scenario["seed"] = 5
+    before = client.get("/api/cache/stats").get_json()
+    first = client.post("/api/simulation", json=scenario).get_json()
+    # Same scenario with a different key order and int/float spelling
+    reordered = dict(reversed(list(scenario.items())), simulationTime=12.0)
+    second = client.post("/api/simulation", json=reordered).get_json()
+    after = client.get("/api/cache/stats").get_json()
+
+    assert first == second
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_unseeded_simulation_is_not_cached(client, scenario):
+    before = client.get("/api/cache/stats").get_json()
+    first = client.post("/api/simulation", json=scenario).get_json()
+    second = client.post("/api/simulation", json=scenario).get_json()
+    after = client.get("/api/cache/stats").get_json()
+
+    assert first["users_sinr"] != second["users_sinr"]
+    assert after["hits"] == before["hits"]
+    assert after["entries"] == before["entries"]
+
+
+def test_job_api_lifecycle(client, scenario):
+    import time
+
+    resp = client.post("/api/jobs", json=scenario)
+    assert resp.status_code == 202
+    job_id = resp.get_json()["id"]
+
+    deadline = time.time() + 10
+    while client.get(f"/api/jobs/{job_id}").get_json()["status"] != "done":
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    result = client.get(f"/api/jobs/{job_id}/result").get_json()
+    assert np.array(result["users_sinr"]).shape == (2, 2, 12)
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_job_result_matches_synchronous_simulation(client, scenario):
+    import time
+
+    scenario.update(seed=6, simulationTime=30, windowSteps=10, downsample="lttb", downsamplePoints=12)
+    expected = client.post("/api/simulation", json=scenario).get_json()
+    # Recompute instead of reading the cached result
+    simulation_api.result_cache.clear()
+    simulation_api.stage_store.clear()
+
+    job_id = client.post("/api/jobs", json=scenario).get_json()["id"]
+    deadline = time.time() + 10
+    while client.get(f"/api/jobs/{job_id}").get_json()["status"] != "done":
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert client.get(f"/api/jobs/{job_id}/result").get_json() == expected
+
+
+def test_simulation_realizations_returns_statistics(client, scenario):
+    scenario.update(realizations=4, seed=1)
+    result = client.post("/api/simulation", json=scenario).get_json()
+    assert result["realizations"] == 4
+    assert set(result["kpis"]["throughput_bps"]) >= {"mean", "p5", "p50", "p95"}
+    assert len(result["series"]["mean_serving_sinr_dB"]["p50"]) == 12
+
+    cached = client.post("/api/simulation", json=scenario).get_json()
+    assert cached == result
+    for option in ({"fields": ["users_sinr"]}, {"workers": 2}, {"trafficModel": "poisson"},
+                   {"realizations": "3"}, {"realizations": 2.5}):
+        assert client.post("/api/simulation", json=dict(scenario, **option)).status_code == 400
+
+    from backend import result_format
+    resp = client.post("/api/simulation?format=binary", json=scenario)
+    cols = result_format.decode_columns(resp.get_data())
+    assert cols["realizations"] == 4
+    assert cols["series.mean_serving_sinr_dB.p50"].shape == (12,)
+
+
+def test_simulation_timings_block_and_metrics(client, scenario):
+    resp = client.post("/api/simulation?timings=1", json=scenario)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert len(body["users_sinr"]) == 2
+    stages = [t["stage"] for t in body["timings"]["stages"]]
+    assert stages == ["mobility", "distance", "sinr", "handover", "throughput", "serialization"]
+    assert [entry.split(";")[0] for entry in resp.headers["Server-Timing"].split(", ")] == \
+        stages + ["json_encode"]
+    sinr = body["timings"]["stages"][2]
+    assert (sinr["n_users"], sinr["n_aps"], sinr["n_steps"]) == (2, 2, 12)
+    assert sinr["peak_bytes"] > 0
+
+    assert "timings" not in client.post("/api/simulation", json=scenario).get_json()
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'netvisor_stage_seconds_count{stage="sinr"}' in metrics
+    assert 'netvisor_request_seconds_bucket{endpoint="simulation",size="<=1e4",le="+Inf"}' in metrics
+
+
+def test_simulation_downsampling_options(client, scenario):
+    scenario.update(simulationTime=120, downsample="minmax", downsamplePoints=10, percentileBands=True)
+    body = client.post("/api/simulation", json=scenario).get_json()
+    assert len(body["time"]) == 10
+    assert len(body["users_sinr"][0][0]) == 10
+    assert len(body["envelope"]["users_sinr"]["max"][0][0]) == 10
+    assert len(body["percentile_bands"]["throughput_bps"]["p50"]) == 10
+
+    scenario["downsample"] = "spline"
+    assert client.post("/api/simulation", json=scenario).status_code == 400
+
+
+def test_summaries_with_selected_fields(client, scenario):
+    scenario.update(fields=["users_throughput"], downsample="minmax", downsamplePoints=4,
+                    apAggregates=True, percentileBands=True)
+    resp = client.post("/api/simulation", json=scenario)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert {"users_sinr", "users_handover"}.isdisjoint(body)
+    assert set(body["envelope"]) == {"users_throughput"}
+    assert len(body["ap_aggregates"]["users_served"][0]) == 4
+    assert len(body["percentile_bands"]["serving_sinr_dB"]["p50"]) == 4
+
+    scenario.update(fields=["users_sinr"], downsample=None, apAggregates=False, percentileBands=False)
+    for option in ("apAggregates", "percentileBands"):
+        body = client.post("/api/simulation", json=dict(scenario, **{option: True})).get_json()
+        assert "users_handover" not in body and len(body["users_sinr"][0][0]) == 12
+        resp = client.post("/api/simulation/stream", json=dict(scenario, **{option: True}))
+        chunks = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+        assert all("users_handover" not in chunk for chunk in chunks)
+
+
+def test_simulation_stream_downsamples_each_window(client, scenario):
+    scenario.update(simulationTime=120, windowSteps=40, seed=4)
+    raw = [json.loads(line) for line in
+           client.post("/api/simulation/stream", json=scenario).get_data(as_text=True).splitlines()]
+    scenario.update(downsample="mean", downsamplePoints=12)
+    reduced = [json.loads(line) for line in
+               client.post("/api/simulation/stream", json=scenario).get_data(as_text=True).splitlines()]
+
+    assert [len(c["time"]) for c in reduced] == [4, 4, 4]
+    assert [c["window"] for c in reduced] == [0, 1, 2]
+    for full, chunk in zip(raw, reduced):
+        sinr = np.array(full["users_sinr"]).reshape(2, 2, 4, 10).mean(axis=-1)
+        np.testing.assert_allclose(chunk["users_sinr"], sinr)
+        assert chunk["time"] == np.array(full["time"]).reshape(4, 10)[:, [0, -1]].mean(axis=1).tolist()
+
+
+def test_sweep_returns_kpi_table(client, scenario):
+    resp = client.post("/api/sweep", json={
+        "base": dict(scenario, seed=2),
+        "axes": {"numberOfNodes": [1, 3], "pathLossExponent": {"start": 3.0, "stop": 3.5, "num": 2}},
+    })
+    assert resp.status_code == 200
+    table = resp.get_json()
+    assert table["points"] == 4
+    assert table["columns"][:2] == ["numberOfNodes", "pathLossExponent"]
+    assert [row[:2] for row in table["rows"]] == [[1, 3.0], [1, 3.5], [3, 3.0], [3, 3.5]]
+
+    resp = client.post("/api/sweep", json={"base": scenario, "axes": {"numberOfNodes": [0]}})
+    assert resp.status_code == 400
+
+
+def test_simulation_csma_mac_options(client, scenario):
+    scenario.update(macModel="csma", trafficModel="poisson", trafficRate=50, seed=3)
+    body = client.post("/api/simulation", json=scenario).get_json()
+    assert len(body["users_mac_throughput"][0]) == 12
+    assert body["mac"]["events"] > 0
+
+    assert client.post("/api/simulation/stream", json=scenario).status_code == 400
+    scenario["trafficModel"] = "bursty"
+    assert client.post("/api/simulation", json=scenario).status_code == 400
+
+
+def test_run_store_endpoints(client, scenario, tmp_path, monkeypatch):
+    from backend.run_store import RunStore
+    monkeypatch.setattr(simulation_api, "run_store", RunStore(str(tmp_path)))
+
+    scenario.update(seed=6, windowSteps=5)
+    resp = client.post("/api/runs", json=scenario)
+    assert resp.status_code == 201
+    run_id = resp.get_json()["id"]
+    assert resp.get_json()["fields"]["users_sinr"]["shape"] == [2, 2, 12]
+    expected = client.post("/api/simulation", json=scenario).get_json()
+    assert [run["id"] for run in client.get("/api/runs").get_json()] == [run_id]
+
+    full = client.get(f"/api/runs/{run_id}/fields/users_sinr").get_json()
+    assert full["data"] == expected["users_sinr"]
+    body = client.get(f"/api/runs/{run_id}/fields/users_sinr?users=1&aps=0:1&start=2&stop=6").get_json()
+    assert body["shape"] == [1, 1, 4]
+    np.testing.assert_array_equal(body["data"], np.array(full["data"])[1:2, 0:1, 2:6])
+
+    assert client.get(f"/api/runs/{run_id}/fields/users_sinr?users=x").status_code == 400
+    assert client.get(f"/api/runs/{run_id}/fields/nope").status_code == 404
+    assert client.delete(f"/api/runs/{run_id}").status_code == 204
+    assert client.get(f"/api/runs/{run_id}").status_code == 404
+    assert client.post("/api/runs", json=dict(scenario, downsample="mean")).status_code == 400
+
+    store = simulation_api.RunStore(str(tmp_path), max_bytes=1000)  # raises the RunTooLarge the app catches
+    monkeypatch.setattr(simulation_api, "run_store", store)
+    assert client.post("/api/runs", json=scenario).status_code == 413
+
+
+def test_simulation_rejects_oversized_radio_map(client, scenario):
+    scenario.update(apPositions=[[0, 0], [5000, 5000]], radioMapResolution=1)
+    resp = client.post("/api/simulation", json=scenario)
+    assert resp.status_code == 400
+    assert "radioMapResolution" in resp.get_json()["error"]
+    scenario["radioMapResolution"] = 50
+    assert client.post("/api/simulation", json=scenario).status_code == 200
+
+
+def test_simulation_decorrelation_validation(client, scenario):
+    scenario["shadowDecorrelationDistance"] = 20
+    assert client.post("/api/simulation", json=scenario).status_code == 200
+    scenario["shadowDecorrelationDistance"] = 0
+    assert client.post("/api/simulation", json=scenario).status_code == 400
+    scenario.update(shadowDecorrelationDistance=20, radioMapResolution=2)
+    assert client.post("/api/simulation", json=scenario).status_code == 400
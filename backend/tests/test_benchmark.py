@@ -0,0 +1,36 @@
+import json
+
+from backend import benchmark
+
+
+def test_run_benchmarks_times_every_stage():
+    report = benchmark.run_benchmarks(users=[3, 6], aps=[2], steps=[20], repeat=1)
+    assert [r["n_users"] for r in report["results"]] == [3, 6]
+    for r in report["results"]:
+        assert set(r["seconds"]) == set(benchmark.STAGES) | {"total"}
+        assert r["samples"] == r["n_users"] * 2 * 20
+        assert all(r["seconds"][stage] > 0 for stage in benchmark.STAGES)
+    json.dumps(report)
+
+    curves = benchmark.format_scaling_curves(report)
+    assert "Scaling with n_users" in curves
+    assert "Scaling with n_aps" not in curves
+
+
+def test_scaling_exponent():
+    assert abs(benchmark.scaling_exponent([10, 20, 40], [1.0, 4.0, 16.0]) - 2.0) < 1e-9
+    assert benchmark.scaling_exponent([10, 10], [1.0, 2.0]) is None
+
+
+def test_compare_to_baseline_flags_slowdowns():
+    def report(sinr_s, handover_s):
+        return {"results": [{"n_users": 10, "n_aps": 2, "n_steps": 50,
+                             "seconds": {"sinr": sinr_s, "handover": handover_s}}]}
+
+    baseline = report(0.10, 0.0001)
+    assert benchmark.compare_to_baseline(report(0.11, 0.0001), baseline, 0.2) == []
+    # Stages below MIN_COMPARABLE_S in the baseline are ignored as noise
+    assert benchmark.compare_to_baseline(report(0.11, 0.01), baseline, 0.2) == []
+
+    regressions = benchmark.compare_to_baseline(report(0.15, 0.0001), baseline, 0.2)
+    assert [(r["stage"], round(r["ratio"], 2)) for r in regressions] == [("sinr", 1.5)]
@@ -0,0 +1,81 @@
+import numpy as np
+from backend import channel
+from backend import core_simulation as ws
+from backend.environment import build_environment
+
+
+def _walk(n_users, n_steps, speed=1.5):
+    # Users walking along x at a constant speed, one step per second
+    x = np.arange(n_steps) * speed
+    return np.broadcast_to(np.stack([x, np.zeros(n_steps)]), (n_users, 2, n_steps)).copy()
+
+
+def test_ar1_correlation_and_marginals():
+    positions = _walk(50, 4000)
+    z = np.random.default_rng(0).standard_normal((3, 2, 50, 4000))
+    channel.CorrelatedChannel(shadow_decorrelation_m=20.0).correlate(z, positions)
+
+    shadow = z[2].reshape(-1, 4000)
+    lag1 = np.mean(shadow[:, 1:] * shadow[:, :-1]) / np.mean(shadow**2)
+    assert abs(lag1 - np.exp(-1.5 / 20.0)) < 0.01
+    assert abs(shadow.std() - 1) < 0.05
+    # Fading without a decorrelation distance stays independent
+    fading = z[0].reshape(-1, 4000)
+    assert abs(np.mean(fading[:, 1:] * fading[:, :-1])) < 0.01
+
+
+def test_state_carries_across_chunks_and_compiled_loop_matches():
+    positions = _walk(3, 30)
+    fresh = np.random.default_rng(1).standard_normal((3, 2, 3, 30))
+
+    whole = fresh.copy()
+    channel.CorrelatedChannel(10.0, 0.5).correlate(whole, positions)
+    chunked = fresh.copy()
+    ch = channel.CorrelatedChannel(10.0, 0.5)
+    ch.correlate(chunked[..., :12], positions[..., :12])
+    ch.correlate(chunked[..., 12:], positions[..., 12:])
+    np.testing.assert_allclose(chunked, whole, rtol=1e-12)
+
+    rho = np.exp(-np.full((30, 3, 1, 3), 1.5) / 10.0)
+    zt = np.ascontiguousarray(np.moveaxis(fresh, -1, 0))
+    expected = zt.copy()
+    prev = np.zeros((3, 2, 3))
+    channel._ar1_numpy(expected, rho, prev)
+    channel._ar1_loops(zt, rho, prev)
+    np.testing.assert_allclose(zt, expected, rtol=1e-12)
+
+
+def test_sinr_batch_blocks_with_correlation(simple_aps_meta, monkeypatch):
+    from backend import kernels
+    positions = _walk(5, 40, speed=0.3)
+    dist = np.stack([np.hypot(*(positions - np.array(ap["position"])[:, None]).transpose(1, 0, 2))
+                     for ap in simple_aps_meta])
+    whole = ws.compute_sinr_batch(dist, simple_aps_meta, user_positions=positions,
+                                  rng=ws.spawn_streams(2, 5)["fading"],
+                                  correlation=channel.correlated_channel(25.0, 0.05))
+
+    monkeypatch.setattr(kernels, "BLOCK_BYTES", 2 * 40 * 8)  # 2 users per block
+    blocked = ws.compute_sinr_batch(dist, simple_aps_meta, user_positions=positions,
+                                    rng=ws.spawn_streams(2, 5)["fading"],
+                                    correlation=channel.correlated_channel(25.0, 0.05))
+    np.testing.assert_allclose(blocked, whole, rtol=1e-12)
+    assert channel.correlated_channel() is None
+
+
+def test_correlated_simulation_runs_and_streams():
+    env = build_environment({
+        "simulationTime": 20,
+        "numberOfNodes": 3,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [15, 0]],
+        "seed": 6,
+        "shadowDecorrelationDistance": 20,
+        "fadingDecorrelationDistance": 0.1,
+    })
+    full = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    again = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    np.testing.assert_array_equal(full["users_sinr"], again["users_sinr"])
+    assert np.all(np.isfinite(full["users_sinr"]))
+
+    chunks = list(ws.run_multiuser_wifi_simulation_stream(env, window_steps=7, serialize=False))
+    assert sum(len(chunk["time"]) for chunk in chunks) == 20
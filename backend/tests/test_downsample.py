@@ -0,0 +1,79 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import downsample
+from backend.environment import build_environment
+
+
+def _reference_lttb(y, n_points):
+    # Textbook single-series LTTB, kept as the semantic reference
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_points - 1).astype(int)
+    picked = [0]
+    for b in range(n_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 1 < n_points - 2:
+            nlo, nhi = edges[b + 1], edges[b + 2]
+            ax, ay = np.arange(nlo, nhi).mean(), y[nlo:nhi].mean()
+        else:
+            ax, ay = n - 1, y[-1]
+        px, py = picked[-1], y[picked[-1]]
+        areas = [abs((px - ax) * (y[i] - py) - (px - i) * (ay - py)) for i in range(lo, hi)]
+        picked.append(lo + int(np.argmax(areas)))
+    return picked + [n - 1]
+
+
+def _result(n_steps=200):
+    env = build_environment({
+        "simulationTime": n_steps,
+        "numberOfNodes": 6,
+        "numberOfAccessPoints": 3,
+        "apPositions": [[0, 0], [20, 0], [10, 15]],
+        "seed": 4,
+    })
+    return ws.run_multiuser_wifi_simulation(env, serialize=False)
+
+
+def test_lttb_matches_reference_per_series():
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(size=(5, 997)), axis=1)
+    indices = downsample.lttb_indices(values, 60)
+    assert indices.shape == (5, 60)
+    for row, idx in zip(values, indices):
+        assert idx.tolist() == _reference_lttb(row, 60)
+
+
+def test_minmax_reduction_envelopes_and_means():
+    result = _result()
+    reduced = downsample.reduce_result(result, "minmax", points=25)
+    assert reduced["time"].shape == (25,)
+    assert reduced["users_sinr"].shape == (6, 3, 25)
+    assert reduced["users_handover"].shape == (6, 25)
+
+    env = reduced["envelope"]["users_throughput"]
+    assert np.all(env["min"] <= reduced["users_throughput"])
+    assert np.all(reduced["users_throughput"] <= env["max"])
+    # 200 steps in 25 buckets of 8
+    np.testing.assert_allclose(reduced["users_per"], result["users_per"].reshape(6, 25, 8).mean(axis=2))
+
+
+def test_lttb_reduction_keeps_actual_samples():
+    result = _result()
+    reduced = downsample.reduce_result(result, "lttb", points=40)
+    steps = reduced["lttb_time"]["users_sinr"]
+    assert steps.shape == reduced["users_sinr"].shape == (6, 3, 40)
+    picked = np.take_along_axis(result["users_sinr"], steps - 1, axis=2)
+    assert np.array_equal(picked, reduced["users_sinr"])
+
+
+def test_ap_aggregates_and_percentile_bands():
+    result = _result()
+    reduced = downsample.reduce_result(result, None, points=20, ap_stats=True, bands=True)
+    assert reduced["users_sinr"].shape == (6, 3, 200)
+
+    ap = reduced["ap_aggregates"]
+    np.testing.assert_allclose(ap["users_served"].sum(axis=0), 6)
+    np.testing.assert_allclose(ap["mac_throughput_bps"].sum(axis=0),
+                               result["users_mac_throughput"].reshape(6, 20, 10).mean(axis=2).sum(axis=0))
+    bands = reduced["percentile_bands"]["serving_sinr_dB"]
+    assert bands["p5"].shape == (20,)
+    assert np.all(bands["p5"] <= bands["p50"]) and np.all(bands["p50"] <= bands["p95"])
@@ -0,0 +1,43 @@
+import numpy as np
+from backend import instrumentation
+
+
+def test_collect_timings_records_stages_with_sizes_and_memory():
+    with instrumentation.collect_timings(memory=True) as timings:
+        with instrumentation.stage("alloc", n_users=3):
+            block = np.ones(250_000)
+        del block
+    with instrumentation.stage("outside"):
+        pass
+
+    assert [t["stage"] for t in timings] == ["alloc"]
+    assert timings[0]["n_users"] == 3
+    assert timings[0]["seconds"] >= 0
+    assert timings[0]["peak_bytes"] >= 250_000 * 8
+
+
+def test_stage_is_noop_when_disabled(monkeypatch):
+    monkeypatch.setattr(instrumentation, "METRICS_ENABLED", False)
+    assert instrumentation.stage("sinr") is instrumentation._NOOP
+    with instrumentation.collect_timings() as timings:
+        with instrumentation.stage("sinr"):
+            pass
+    assert [t["stage"] for t in timings] == ["sinr"]
+    assert "peak_bytes" not in timings[0]
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = instrumentation.Histogram("h_seconds", "Test.", ["stage"], (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, "sinr")
+    text = hist.render()
+    assert 'h_seconds_bucket{stage="sinr",le="0.1"} 1' in text
+    assert 'h_seconds_bucket{stage="sinr",le="1.0"} 3' in text
+    assert 'h_seconds_bucket{stage="sinr",le="+Inf"} 4' in text
+    assert 'h_seconds_count{stage="sinr"} 4' in text
+
+
+def test_size_class():
+    assert instrumentation.size_class(500) == "<=1e4"
+    assert instrumentation.size_class(2 * 10**5) == "1e5-1e6"
+    assert instrumentation.size_class(10**9) == ">1e8"
@@ -0,0 +1,93 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import interference
+from backend.environment import build_environment
+
+# Fading-free channel: huge K-factor, no shadowing
+DETERMINISTIC = dict(K0_dB=300.0, K_decay=0.0, shadow_sigma_dB=0.0)
+
+
+def _grid_aps(n_side=5, spacing=20.0):
+    freqs = [2.412e9, 2.437e9, 2.462e9]
+    return [
+        {"tx_power_dBm": 20.0, "frequency_Hz": freqs[(i + j) % 3], "bandwidth_Hz": 20e6,
+         "position": [i * spacing, j * spacing], "antenna_gain_dBi": 0.0, "beamwidth_deg": 360.0}
+        for i in range(n_side) for j in range(n_side)
+    ]
+
+
+def _positions(aps, n_users=8, n_steps=130, seed=0):
+    return ws.generate_realistic_user_positions(
+        n_users, n_steps, [ap["position"] for ap in aps], 1.5, 1.0, seed=seed
+    )
+
+
+def test_interference_candidates_cover_radius():
+    aps = _grid_aps()
+    positions = _positions(aps)
+    radius = 25.0
+    candidates, valid = interference.interference_candidates(aps, positions, radius, window_steps=40)
+    assert candidates.shape[:2] == (8, 4)
+    assert valid[..., 0].all()
+
+    dist = ws.compute_distances(aps, positions)
+    for u in range(8):
+        for w in range(4):
+            near = np.flatnonzero((dist[:, u, w*40:(w+1)*40] <= radius).any(axis=1))
+            assert set(near) <= set(candidates[u, w][valid[u, w]])
+
+
+def test_pruned_sinr_matches_exact_when_radius_covers_all_aps():
+    aps = _grid_aps()
+    positions = _positions(aps)
+    dist = ws.compute_distances(aps, positions)
+    exact = ws.compute_sinr_batch(dist, aps, user_positions=positions, **DETERMINISTIC)
+    pruned = ws.compute_sinr_batch(dist, aps, user_positions=positions,
+                                   interference_radius=500.0, **DETERMINISTIC)
+    np.testing.assert_allclose(pruned, exact, rtol=1e-9)
+
+
+def test_pruning_error_report_matches_direct_comparison():
+    aps = _grid_aps()
+    positions = _positions(aps)
+    dist = ws.compute_distances(aps, positions)
+    exact = 10 * np.log10(ws.compute_sinr_batch(dist, aps, user_positions=positions, **DETERMINISTIC))
+    pruned = 10 * np.log10(ws.compute_sinr_batch(dist, aps, user_positions=positions,
+                                                 interference_radius=15.0, **DETERMINISTIC) + 1e-300)
+    handover, _, _ = ws.handover_decision_batch(exact)
+    serving = handover[:, None, :] - 1
+    error = (np.take_along_axis(pruned, serving, axis=1) - np.take_along_axis(exact, serving, axis=1))[:, 0]
+
+    report = interference.interference_pruning_error(aps, positions, dist, handover, 3.0, 15.0)
+    assert 0 < report["evaluated_ap_fraction"] < 1
+    assert report["sinr_error_dB_max"] > 0
+    np.testing.assert_allclose(report["sinr_error_dB_max"], error.max(), rtol=1e-3)
+    np.testing.assert_allclose(report["sinr_error_dB_mean"], error.mean(), rtol=1e-3)
+
+
+def test_run_simulation_reports_pruning_error():
+    data = {
+        "simulationTime": 30,
+        "numberOfNodes": 4,
+        "numberOfAccessPoints": 4,
+        "apPositions": [[0, 0], [30, 0], [0, 30], [30, 30]],
+        "seed": 2,
+        "interferenceThresholdDBm": -70,
+    }
+    env = build_environment(data)
+    radius = ws._interference_radius(env)
+    assert radius < interference.interference_radius_for_threshold(
+        ws._build_aps_meta(env), env["pathLossExponent"], -80)
+
+    # The report is opt-in
+    result = ws.run_multiuser_wifi_simulation(env)
+    assert "interference_pruning" not in result
+    assert len(result["users_sinr"]) == 4
+
+    from instrumentation import collect_timings  # the module core_simulation records its stages in
+
+    with collect_timings() as timings:
+        result = ws.run_multiuser_wifi_simulation(dict(env, pruningReport=True, fields=["users_sinr"]))
+    assert result["interference_pruning"]["radius_m"] == radius
+    assert set(result) == {"users_sinr", "interference_pruning", "time"}
+    assert "pruning_error" in [t["stage"] for t in timings]
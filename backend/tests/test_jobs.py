@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from backend import jobs
+from backend.environment import build_environment
+
+
+def _env(**overrides):
+    data = {
+        "simulationTime": 6,
+        "numberOfNodes": 2,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [10, 0]],
+        "windowSteps": 2,
+        "seed": 1,
+    }
+    data.update(overrides)
+    return build_environment(data)
+
+
+def _wait(manager, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while manager.status(job_id)["status"] not in jobs.FINISHED_STATES:
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return manager.status(job_id)
+
+
+@pytest.mark.parametrize("file_backed", [False, True])
+def test_job_runs_to_completion(tmp_path, file_backed):
+    manager = jobs.JobManager(max_workers=1, storage_dir=str(tmp_path) if file_backed else None)
+    job_id = manager.submit(_env())
+    status = _wait(manager, job_id)
+
+    assert status["status"] == jobs.DONE and status["progress"] == 1.0
+    result = manager.result(job_id)
+    assert result["users_sinr"].shape == (2, 2, 6)
+    assert result["time"].tolist() == list(range(1, 7))
+
+
+def test_job_queue_limit_and_cancellation():
+    release = threading.Event()
+
+    def blocked_runner(env):
+        release.wait(5)
+        return {}
+
+    manager = jobs.JobManager(max_workers=1, max_queue=1, runner=blocked_runner)
+    running = manager.submit(_env())
+    while manager.status(running)["status"] != jobs.RUNNING:
+        time.sleep(0.01)
+
+    queued = manager.submit(_env())
+    with pytest.raises(jobs.JobQueueFull):
+        manager.submit(_env())
+
+    assert manager.cancel(queued)
+    assert manager.status(queued)["status"] == jobs.CANCELLED
+    assert manager.cancel("missing") is False
+    release.set()
+
+
+def test_running_job_stops_at_stage_boundary():
+    manager = jobs.JobManager(max_workers=1)
+    job_id = manager.submit(_env(simulationTime=5000, numberOfNodes=200))
+    while manager.status(job_id)["progress"] == 0.0:
+        time.sleep(0.001)
+    manager.cancel(job_id)
+    status = _wait(manager, job_id)
+
+    assert status["status"] == jobs.CANCELLED
+    assert status["progress"] < 1.0
+    assert manager.result(job_id) is None
+
+
+def test_monte_carlo_job_result_survives_storage(tmp_path):
+    manager = jobs.JobManager(max_workers=1, storage_dir=str(tmp_path))
+    job_id = manager.submit(_env(realizations=3))
+    assert _wait(manager, job_id)["status"] == jobs.DONE
+    result = manager.result(job_id)
+    assert result["realizations"] == 3
+    assert "mean" in result["kpis"]["throughput_bps"]
@@ -0,0 +1,53 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import kernels
+
+
+def _reference_received_power(d, tx_dBm, freq_Hz, n, K0_dB, K_decay, sigma_dB, z):
+    # The dB-domain formulation the kernels replace
+    K_linear = 10 ** (K0_dB * np.exp(-K_decay * d) / 10)
+    s = np.sqrt(K_linear / (K_linear + 1))
+    sigma = np.sqrt(1 / (2 * (K_linear + 1)))
+    fading = (s + sigma * z[0])**2 + (sigma * z[1])**2
+    fading_dB = 10 * np.log10(fading * 10 ** (z[2] * sigma_dB / 10) + 1e-12)
+    pl_dB = 20 * np.log10(4 * np.pi * freq_Hz / 3e8) + 10 * n * np.log10(d + 1e-12)
+    return 10 ** ((tx_dBm - pl_dB + fading_dB) / 10)
+
+
+def test_received_power_matches_db_formulation():
+    d = np.linspace(1.0, 80.0, 40).reshape(2, 20)
+    ap = {"tx_power_dBm": 20.0, "frequency_Hz": 5.18e9}
+    rx = ws.compute_received_power(d, ap, 3.2, 6.0, 0.05, 4.0, rng=np.random.default_rng(1))
+    z = np.random.default_rng(1).standard_normal((3,) + d.shape)
+    np.testing.assert_allclose(rx, _reference_received_power(d, 20.0, 5.18e9, 3.2, 6.0, 0.05, 4.0, z),
+                               rtol=1e-10)
+
+
+def test_compiled_loop_matches_numpy_kernel(simple_aps_meta):
+    rng = np.random.default_rng(2)
+    dist = rng.uniform(1, 30, (2, 3, 5))
+    z = rng.standard_normal((3, 2, 3, 5))
+    gain = rng.uniform(0.5, 2.0, dist.shape)
+    log_amp = kernels.log_amplitude([20.0, 17.0], [5.18e9, 5.22e9])
+    factors = ws.interference_factor_matrix(simple_aps_meta)
+    noise = kernels.noise_power([20e6, 20e6]) + 1e-12
+    args = (log_amp, factors, noise, 3.0, 5.0, 0.1, 3.0)
+
+    fused = kernels.fused_sinr(dist, z, *args, gain=gain, kernel="numpy")
+    loops = kernels._sinr_loops(dist, z, log_amp, gain, True, 3.0, 5.0, 0.1, kernels.LN10_10 * 3.0,
+                                factors, noise, np.empty_like(fused))
+    np.testing.assert_allclose(loops, fused, rtol=1e-12)
+
+
+def test_sinr_batch_blocks_users_and_reuses_workspace(simple_aps_meta, monkeypatch):
+    dist = np.random.default_rng(3).uniform(1, 20, (2, 5, 50))
+    whole = ws.compute_sinr_batch(dist, simple_aps_meta, rng=ws.spawn_streams(4, 5)["fading"])
+
+    monkeypatch.setattr(kernels, "BLOCK_BYTES", 2 * 50 * 8)  # 2 users per block
+    blocked = ws.compute_sinr_batch(dist, simple_aps_meta, rng=ws.spawn_streams(4, 5)["fading"])
+    buffer = kernels.workspace_buffer("rx", (2, 2, 50), np.float64)
+    again = ws.compute_sinr_batch(dist, simple_aps_meta, rng=ws.spawn_streams(4, 5)["fading"])
+
+    np.testing.assert_allclose(blocked, whole, rtol=1e-12)
+    np.testing.assert_array_equal(again, blocked)
+    assert np.shares_memory(buffer, kernels.workspace_buffer("rx", (2, 2, 50), np.float64))
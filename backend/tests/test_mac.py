@@ -0,0 +1,70 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import mac
+from backend.environment import build_environment
+
+
+def _run(n_users, traffic, n_aps=1, n_steps=4, handover=None, seed=0):
+    sinr = np.full((n_users, n_steps), 40.0)
+    if handover is None:
+        handover = np.ones((n_users, n_steps), dtype=int)
+    return mac.simulate_csma(sinr, handover, n_aps, 1.0, traffic, rng=np.random.default_rng(seed))
+
+
+def test_saturated_contention_collapse():
+    few = _run(5, mac.SaturatedTraffic())
+    many = _run(100, mac.SaturatedTraffic())
+    assert many["users_mac_throughput"].sum(axis=0).mean() < 0.8 * few["users_mac_throughput"].sum(axis=0).mean()
+    assert many["mac"]["ap_collision_fraction"][0] > 2 * few["mac"]["ap_collision_fraction"][0]
+    assert many["mac"]["users_dropped"].sum() > few["mac"]["users_dropped"].sum()
+
+
+def test_light_poisson_load_is_delivered():
+    out = _run(10, mac.PoissonTraffic(50), n_steps=10)
+    delivered = out["mac"]["users_delivered"].sum()
+    assert abs(delivered - 10 * 50 * 10) < 0.1 * 5000
+    assert out["mac"]["users_dropped"].sum() == 0
+    assert np.allclose(out["users_mac_throughput"].sum(), delivered * 1500 * 8 / 1.0)
+    assert 0 < out["mac"]["ap_busy_fraction"][0] < 0.5
+    assert out["mac"]["events"] > 3 * delivered * 0.9
+
+
+def test_stations_follow_handovers():
+    handover = np.ones((4, 10), dtype=int)
+    handover[:, 5:] = 2
+    out = _run(4, mac.SaturatedTraffic(), n_aps=2, n_steps=10, handover=handover)
+    busy = out["mac"]["ap_busy_fraction"]
+    # Each AP carries the stations for half the run
+    assert np.isclose(busy[0], busy[1], rtol=0.05) and 0.3 < busy[0] < 0.5
+    assert np.all(out["users_mac_throughput"] > 0)
+
+
+def test_cbr_traffic_is_periodic():
+    traffic = mac.make_traffic("cbr", 20)
+    rng = np.random.default_rng(0)
+    first = traffic.next_arrival(rng, 0.0)
+    assert 0 <= first < 0.05
+    assert np.isclose(traffic.next_arrival(rng, first), first + 0.05)
+
+
+def test_csma_mac_model_in_simulation():
+    env = build_environment({
+        "simulationTime": 5,
+        "numberOfNodes": 3,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [15, 0]],
+        "seed": 4,
+        "macModel": "csma",
+        "trafficModel": "poisson",
+        "trafficRate": 200,
+    })
+    first = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    second = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    assert first["users_mac_throughput"].shape == (3, 5)
+    np.testing.assert_array_equal(first["users_mac_throughput"], second["users_mac_throughput"])
+    assert ws._to_serializable(first["mac"]) == ws._to_serializable(second["mac"])
+    assert first["mac"]["users_delivered"].sum() > 0
+
+    only = ws.run_multiuser_wifi_simulation(dict(env, fields=["users_mac_throughput"]), serialize=False)
+    assert set(only) == {"users_mac_throughput", "mac", "time"}
+    np.testing.assert_array_equal(only["users_mac_throughput"], first["users_mac_throughput"])
@@ -0,0 +1,40 @@
+import numpy as np
+from backend import mobility
+
+
+AP_POSITIONS = [[0.0, 0.0], [30.0, 0.0], [0.0, 30.0]]
+
+
+def test_generate_positions_shape_and_bounds():
+    pos = mobility.generate_realistic_user_positions(
+        n_users=50, n_steps=200, ap_positions=AP_POSITIONS, velocity=1.5, time_step=1.0, seed=7
+    )
+    assert pos.shape == (50, 2, 200)
+    # Users never leave the AP bounding box extended by the target jitter
+    margin = mobility.TARGET_JITTER_M
+    assert pos[:, 0, :].min() >= -margin and pos[:, 0, :].max() <= 30.0 + margin
+    assert pos[:, 1, :].min() >= -margin and pos[:, 1, :].max() <= 30.0 + margin
+    # Speed is bounded by velocity * time_step
+    step = np.linalg.norm(np.diff(pos, axis=2), axis=1)
+    assert np.all(step <= 1.5 + 1e-9)
+
+
+def test_generate_positions_seed_is_reproducible():
+    kwargs = dict(n_users=5, n_steps=20, ap_positions=AP_POSITIONS, velocity=1.0, time_step=0.5)
+    a = mobility.generate_realistic_user_positions(seed=3, **kwargs)
+    b = mobility.generate_realistic_user_positions(seed=3, **kwargs)
+    c = mobility.generate_realistic_user_positions(seed=4, **kwargs)
+    assert np.array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+
+def test_advance_user_mobility_continues_trajectory():
+    rng = np.random.default_rng(11)
+    positions, targets = mobility.init_user_mobility(4, AP_POSITIONS, rng)
+    first = mobility.advance_user_mobility(positions, targets, 10, AP_POSITIONS, 1.5, 1.0, rng)
+    second = mobility.advance_user_mobility(positions, targets, 10, AP_POSITIONS, 1.5, 1.0, rng)
+
+    rng = np.random.default_rng(11)
+    positions, targets = mobility.init_user_mobility(4, AP_POSITIONS, rng)
+    whole = mobility.advance_user_mobility(positions, targets, 20, AP_POSITIONS, 1.5, 1.0, rng)
+    assert np.array_equal(np.concatenate([first, second], axis=2), whole)
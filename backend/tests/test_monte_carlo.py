@@ -0,0 +1,56 @@
+import numpy as np
+from backend import monte_carlo
+from backend.environment import build_environment
+
+
+def _env(**overrides):
+    data = {
+        "simulationTime": 10,
+        "numberOfNodes": 3,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [15, 0]],
+        "frequencies": [5.18e9, 5.22e9],
+        "realizations": 8,
+        "seed": 3,
+    }
+    data.update(overrides)
+    return build_environment(data)
+
+
+def test_monte_carlo_aggregates_realizations():
+    result = monte_carlo.run_monte_carlo_simulation(_env(), serialize=False)
+
+    assert result["realizations"] == 8
+    thr = result["kpis"]["mac_throughput_bps"]
+    assert thr["ci95_low"] <= thr["mean"] <= thr["ci95_high"]
+    assert thr["p5"] <= thr["p50"] <= thr["p95"]
+    band = result["series"]["network_mac_throughput_bps"]
+    assert band["mean"].shape == (10,)
+    assert np.all(band["p5"] <= band["p95"])
+    assert "per_realization" not in result
+
+
+def test_monte_carlo_per_realization_output_and_seed():
+    a = monte_carlo.run_monte_carlo_simulation(_env(perRealization=True), serialize=False)
+    b = monte_carlo.run_monte_carlo_simulation(_env(perRealization=True), serialize=False)
+
+    raw = a["per_realization"]
+    assert raw["users_sinr"].shape == (8, 3, 2, 10)
+    assert raw["users_throughput"].shape == (8, 3, 10)
+    assert np.array_equal(raw["users_sinr"], b["per_realization"]["users_sinr"])
+    # Realizations are independent draws
+    assert not np.array_equal(raw["users_sinr"][0], raw["users_sinr"][1])
+
+
+
+def test_monte_carlo_load_counts_users_of_the_same_realization():
+    from backend.core_simulation import serving_load, users_per_ap
+
+    # One AP, so every realization's users share it
+    env = _env(numberOfAccessPoints=1, apPositions=[[0, 0]], frequencies=[5.18e9], perRealization=True)
+    raw = monte_carlo.run_monte_carlo_simulation(env, serialize=False)["per_realization"]
+    for r in range(8):
+        handover = raw["users_handover"][r]
+        load = serving_load(handover, users_per_ap(handover, 1))
+        assert np.all(load == 3)
+        np.testing.assert_allclose(raw["users_mac_throughput"][r], raw["users_throughput"][r] / load)
@@ -0,0 +1,99 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import radio_map
+from backend.environment import build_environment
+
+
+def _aps(antenna_gain_dBi=0.0):
+    return [
+        {"tx_power_dBm": 20.0, "frequency_Hz": 2.412e9, "bandwidth_Hz": 20e6,
+         "position": [0.0, 0.0], "antenna_gain_dBi": antenna_gain_dBi, "beamwidth_deg": 120.0},
+        {"tx_power_dBm": 17.0, "frequency_Hz": 2.437e9, "bandwidth_Hz": 20e6,
+         "position": [20.0, 5.0], "antenna_gain_dBi": 0.0, "beamwidth_deg": 360.0},
+    ]
+
+
+def _positions(n_users=6, n_steps=200, seed=0):
+    rng = np.random.default_rng(seed)
+    # Wander well beyond the map margin so some samples fall off the grid
+    return rng.uniform(-25, 45, (n_users, 2, n_steps))
+
+
+def test_radio_map_nodes_match_exact_mean_power():
+    aps = _aps(antenna_gain_dBi=6.0)
+    rm = radio_map.build_radio_map(aps, 3.0, 1.0)
+    _, ny, nx = rm["mean_rx_dBm"].shape
+    x = rm["origin"][0] + np.arange(nx)
+    y = rm["origin"][1] + np.arange(ny)
+    X, Y = np.meshgrid(x, y)
+    positions = np.stack([X.ravel(), Y.ravel()])[None]
+    dist = ws.compute_distances(aps, positions)
+    expected = ws.mean_received_power_dBm(dist, {
+        "frequency_Hz": ws._ap_column(aps, "frequency_Hz"),
+        "tx_power_dBm": ws._ap_column(aps, "tx_power_dBm"),
+    }) + 10 * np.log10(ws.directional_gain_matrix(aps, positions))
+    np.testing.assert_allclose(rm["mean_rx_dBm"].reshape(2, -1), expected[:, 0, :], atol=1e-6)
+    assert not rm["mean_rx_dBm"].flags.writeable
+
+
+def test_sample_radio_map_close_to_exact():
+    aps = _aps(antenna_gain_dBi=6.0)
+    positions = _positions()
+    dist = ws.compute_distances(aps, positions)
+    rm = radio_map.build_radio_map(aps, 3.0, 0.5)
+    sampled = radio_map.sample_radio_map(rm, aps, positions, dist, 3.0)
+    exact = radio_map._exact_mean_rx_dBm(
+        radio_map._ap_arrays(aps), np.arange(2)[:, None, None],
+        positions[None, :, 0, :], positions[None, :, 1, :], dist, 3.0
+    )
+    assert sampled.shape == dist.shape
+    assert np.abs(sampled - exact).max() < 0.5
+    assert np.percentile(np.abs(sampled - exact), 99) < 0.1
+
+
+def test_get_radio_map_is_cached_per_configuration():
+    aps = _aps()
+    first = radio_map.get_radio_map(aps, 3.0, 1.0)
+    assert radio_map.get_radio_map([dict(ap) for ap in aps], 3.0, 1.0) is first
+    assert radio_map.get_radio_map(aps, 3.5, 1.0) is not first
+    assert radio_map.get_radio_map(aps, 3.0, 0.5)["key"] != first["key"]
+
+
+def test_radio_map_grid_size_is_capped():
+    import pytest
+
+    aps = _aps()
+    rm = radio_map.build_radio_map(aps, 3.0, 1.0)
+    assert radio_map.radio_map_nodes([ap["position"] for ap in aps], 1.0) == rm["mean_rx_dBm"].size
+
+    far = [dict(aps[0]), dict(aps[1], position=[5000.0, 5000.0])]
+    with pytest.raises(ValueError, match="coarser"):
+        radio_map.build_radio_map(far, 3.0, 1.0)
+    assert radio_map.build_radio_map(far, 3.0, 10.0)["mean_rx_dBm"].size <= radio_map.RADIO_MAP_MAX_NODES
+
+
+def test_sinr_with_radio_map_only_differs_by_interpolation():
+    aps = _aps(antenna_gain_dBi=6.0)
+    positions = _positions(seed=1)
+    dist = ws.compute_distances(aps, positions)
+    streams = [ws.spawn_streams(7, positions.shape[0])["fading"] for _ in range(2)]
+    exact = ws.compute_sinr_batch(dist, aps, user_positions=positions, rng=streams[0])
+    mapped = ws.compute_sinr_batch(dist, aps, user_positions=positions, rng=streams[1],
+                                   radio_map=radio_map.get_radio_map(aps, 3.0, 0.5))
+    diff_dB = np.abs(10 * np.log10(mapped) - 10 * np.log10(exact))
+    assert np.percentile(diff_dB, 99) < 0.2
+
+
+def test_run_simulation_with_radio_map():
+    env = build_environment({
+        "simulationTime": 20,
+        "numberOfNodes": 4,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [15, 0]],
+        "seed": 5,
+        "radioMapResolution": 0.5,
+    })
+    result = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    reference = ws.run_multiuser_wifi_simulation(dict(env, radioMapResolution=None), serialize=False)
+    np.testing.assert_allclose(result["users_sinr"], reference["users_sinr"], atol=0.5)
+    np.testing.assert_array_equal(result["users_distance"], reference["users_distance"])
@@ -0,0 +1,41 @@
+import numpy as np
+from backend.result_cache import ResultCache, scenario_key
+
+
+def _result(n):
+    return {"users_throughput": np.zeros(n), "time": np.arange(n)}
+
+
+def test_scenario_key_is_canonical():
+    env = {"numberOfNodes": 3, "pathLossExponent": 3.0, "windowSteps": 10}
+    same = {"windowSteps": 600, "pathLossExponent": 3, "numberOfNodes": 3}
+    assert scenario_key(env) == scenario_key(same)
+    assert scenario_key(env) != scenario_key(env, seed=1)
+    assert scenario_key(env) != scenario_key(dict(env, numberOfNodes=4))
+
+
+def test_result_cache_lru_eviction_and_counters():
+    nbytes = sum(v.nbytes for v in _result(100).values())
+    cache = ResultCache(max_bytes=2 * nbytes)
+    cache.put("a", _result(100))
+    cache.put("b", _result(100))
+    assert cache.get("a") is not None      # a becomes most recently used
+    cache.put("c", _result(100))           # evicts b
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["entries"] == 2 and stats["bytes"] <= 2 * nbytes
+
+
+def test_result_cache_disk_tier_survives_restart(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put("k", _result(5))
+
+    restarted = ResultCache(disk_dir=str(tmp_path))
+    result = restarted.get("k")
+    assert result is not None
+    assert result["time"].tolist() == [0, 1, 2, 3, 4]
+    assert not result["time"].flags.writeable
+    assert restarted.stats()["disk_hits"] == 1
@@ -0,0 +1,20 @@
+import numpy as np
+from backend import result_format
+
+
+def test_result_format_round_trip():
+    result = {
+        "users_sinr": np.random.randn(3, 2, 7),
+        "users_handover": np.ones((3, 7), dtype=int),
+        "users_retries": np.zeros((3, 7)),
+        "time": np.arange(1, 8),
+        "window": 2,
+    }
+    payload = b"".join(result_format.encode_columns(result))
+    decoded = result_format.decode_columns(payload)
+
+    assert decoded["window"] == 2
+    assert decoded["users_sinr"].dtype == np.float32
+    assert np.allclose(decoded["users_sinr"], result["users_sinr"], atol=1e-6)
+    assert decoded["users_retries"].dtype == np.int8
+    assert decoded["time"].tolist() == list(range(1, 8))
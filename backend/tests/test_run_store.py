@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from backend import core_simulation as ws
+from backend.environment import build_environment
+from backend.run_store import RunStore
+
+
+def _env(**overrides):
+    data = {
+        "simulationTime": 10,
+        "numberOfNodes": 3,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [10, 0]],
+        "windowSteps": 4,
+        "seed": 5,
+    }
+    data.update(overrides)
+    return build_environment(data)
+
+
+def test_streamed_run_matches_merged_result(tmp_path):
+    env = _env()
+    store = RunStore(str(tmp_path))
+    manifest = store.save_chunks(ws.run_multiuser_wifi_simulation_stream(env, serialize=False), env, 10)
+    full = ws.merge_chunks(ws.run_multiuser_wifi_simulation_stream(env, serialize=False))
+
+    assert manifest["fields"]["users_sinr"] == {"shape": [3, 2, 10], "dtype": "<f8",
+                                                "axes": ["user", "ap", "time"]}
+    assert manifest["env"]["seed"] == 5
+    for name, arr in full.items():
+        stored = store.field(manifest["id"], name)
+        assert isinstance(stored, np.memmap)
+        np.testing.assert_array_equal(stored, arr)
+    assert [run["id"] for run in store.list_runs()] == [manifest["id"]]
+
+
+def test_query_slices_users_aps_and_time(tmp_path):
+    env = _env()
+    store = RunStore(str(tmp_path))
+    result = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    run_id = store.save(result, env)["id"]
+
+    sinr = store.query(run_id, "users_sinr", users=[2, 0], aps=slice(1, 2), start=3, stop=7)
+    np.testing.assert_array_equal(sinr, result["users_sinr"][[2, 0]][:, 1:2, 3:7])
+    per = store.query(run_id, "users_per", users=[1], aps=[0], start=5)
+    np.testing.assert_array_equal(per, result["users_per"][[1], 5:])
+    np.testing.assert_array_equal(store.query(run_id, "time", start=8), [9, 10])
+
+    with pytest.raises(KeyError):
+        store.query(run_id, "users_unknown")
+    with pytest.raises(IndexError):
+        store.query(run_id, "users_sinr", users=[7])
+
+
+def test_unknown_and_invalid_run_ids(tmp_path):
+    store = RunStore(str(tmp_path))
+    with pytest.raises(KeyError):
+        store.manifest("../etc")
+    with pytest.raises(KeyError):
+        store.manifest("0" * 32)
+    assert not store.delete("0" * 32)
+
+
+def test_store_evicts_oldest_runs_beyond_quota(tmp_path):
+    env = _env()
+    result = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    store = RunStore(str(tmp_path), max_runs=2)
+    ids = [store.save(result, env)["id"] for _ in range(3)]
+    assert [run["id"] for run in store.list_runs()] == ids[1:]
+
+    nbytes = store.manifest(ids[1])["nbytes"]
+    store = RunStore(str(tmp_path), max_runs=None, max_bytes=int(1.5 * nbytes))
+    newest = store.save(result, env)["id"]
+    assert [run["id"] for run in store.list_runs()] == [newest]
+    with pytest.raises(ValueError):
+        RunStore(str(tmp_path), max_bytes=nbytes - 1).save(result, env)
+    assert [run["id"] for run in store.list_runs()] == [newest]
@@ -1,3 +1,4 @@
+import pytest
 import numpy as np
 from backend import core_simulation as ws
 
@@ -149,7 +150,7 @@ def test_run_multiuser_wifi_simulation_minimal(monkeypatch):
     - Checks presence/shape of core outputs
     """
     # Prepare a deterministic fake mobility
-    def fake_positions(n_users, n_steps, ap_positions, velocity, time_step):
+    def fake_positions(n_users, n_steps, ap_positions, velocity, time_step, seed=None):
         # Straight line motion per user along x with small offsets on y
         xs = np.linspace(0, 10, n_steps)
         users = []
@@ -216,3 +217,225 @@ def test_run_multiuser_wifi_simulation_minimal(monkeypatch):
 
     # Distances per user: (n_aps, n_steps)
     assert np.array(result["users_distance"][0]).shape == (n_aps, n_steps)
+
+
+def test_interference_factor_matrix_matches_scalar(simple_aps_meta):
+    aps = simple_aps_meta + [dict(simple_aps_meta[0], frequency_Hz=5.18e9, bandwidth_Hz=40e6)]
+    factors = ws.interference_factor_matrix(aps)
+    assert factors.shape == (3, 3)
+    for i, ap in enumerate(aps):
+        for j, intf_ap in enumerate(aps):
+            expected = 0.0 if i == j else ws.interference_factor(
+                abs(intf_ap["frequency_Hz"] - ap["frequency_Hz"]), ap["bandwidth_Hz"]
+            )
+            assert np.isclose(factors[i, j], expected)
+
+
+def test_compute_sinr_batch_shapes_and_directional_gain(simple_aps_meta, simple_distances,
+                                                        simple_user_positions):
+    n_aps, n_steps = simple_distances.shape
+    dist = np.stack([simple_distances, simple_distances[::-1]], axis=1)  # (n_aps, 2, n_steps)
+    positions = np.stack([simple_user_positions, simple_user_positions[:, ::-1]], axis=0)
+
+    sinr = ws.compute_sinr_batch(dist, simple_aps_meta, user_positions=positions)
+    assert sinr.shape == (2, n_aps, n_steps)
+    assert np.all(sinr > 0)
+
+    # Gain matrix agrees with the scalar per-sample helpers
+    aps = [dict(ap, antenna_gain_dBi=6.0, beamwidth_deg=90.0) for ap in simple_aps_meta]
+    gains = ws.directional_gain_matrix(aps, positions)
+    for j, ap in enumerate(aps):
+        for t in range(n_steps):
+            theta = ws.angle_to_user(ap["position"], positions[1, :, t])
+            assert np.isclose(gains[j, 1, t], ws.directional_gain(theta, 6.0, 90.0))
+
+
+def test_handover_decision_initial_ap_carries_state():
+    # AP2 is only 2 dB better, below the 3 dB hysteresis
+    sinr_db = np.array([[10.0, 10.0, 10.0], [12.0, 12.0, 12.0]])
+    assert np.all(ws.handover_decision(sinr_db, 3.0) == 2)
+    assert np.all(ws.handover_decision(sinr_db, 3.0, initial_ap=0) == 1)
+
+
+def test_run_multiuser_wifi_simulation_stream_windows():
+    env = {
+        "simulationTime": 25.0,
+        "timeStep": 1.0,
+        "numberOfNodes": 3,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0.0, 0.0], [10.0, 0.0]],
+        "transmissionPowers": [20, 20],
+        "frequencies": [5.18e9, 5.22e9],
+        "bandwidths": [20e6, 20e6],
+    }
+    chunks = list(ws.run_multiuser_wifi_simulation_stream(env, window_steps=10))
+
+    assert [c["window"] for c in chunks] == [0, 1, 2]
+    assert all(c["n_windows"] == 3 for c in chunks)
+    assert [len(c["time"]) for c in chunks] == [10, 10, 5]
+    assert sum((c["time"] for c in chunks), []) == list(range(1, 26))
+    for c in chunks:
+        n = len(c["time"])
+        assert np.array(c["users_sinr"]).shape == (3, 2, n)
+        assert np.array(c["users_distance"]).shape == (3, 2, n)
+        assert np.array(c["users_throughput"]).shape == (3, n)
+        assert set(np.unique(c["users_handover"])).issubset({1, 2})
+
+
+def _seeded_env(seed):
+    from backend.environment import build_environment
+
+    return build_environment({
+        "simulationTime": 8,
+        "numberOfNodes": 3,
+        "numberOfAccessPoints": 2,
+        "apPositions": [[0, 0], [10, 0]],
+        "frequencies": [5.18e9, 5.22e9],
+        "seed": seed,
+    })
+
+
+def test_seeded_simulation_is_reproducible():
+    a = ws.run_multiuser_wifi_simulation(_seeded_env(42))
+    b = ws.run_multiuser_wifi_simulation(_seeded_env(42))
+    c = ws.run_multiuser_wifi_simulation(_seeded_env(43))
+    assert a == b
+    assert a["users_sinr"] != c["users_sinr"]
+
+    chunks_a = list(ws.run_multiuser_wifi_simulation_stream(_seeded_env(42), window_steps=3))
+    chunks_b = list(ws.run_multiuser_wifi_simulation_stream(_seeded_env(42), window_steps=3))
+    assert chunks_a == chunks_b
+
+
+def test_per_user_streams_are_independent_of_other_users(simple_aps_meta, simple_distances):
+    dist = np.stack([simple_distances] * 3, axis=1)  # (n_aps, 3, n_steps)
+    three = ws.compute_sinr_batch(dist, simple_aps_meta, rng=ws.spawn_streams(9, 3)["fading"])
+    two = ws.compute_sinr_batch(dist[:, :2], simple_aps_meta, rng=ws.spawn_streams(9, 2)["fading"])
+    assert np.array_equal(three[:2], two)
+
+
+@pytest.mark.parametrize("overrides", [{}, {"interferenceRadius": 15.0}])
+def test_parallel_simulation_matches_serial(overrides):
+    # APs far enough apart that users see different numbers of candidates
+    env = dict(_seeded_env(5), numberOfNodes=6, simulationTime=20, numberOfAccessPoints=6,
+               apPositions=[[x, 0.0] for x in range(0, 180, 30)], frequencies=[5.18e9] * 6,
+               transmissionPowers=[23.0] * 6, bandwidths=[20e6] * 6, antennaGains=[0.0] * 6,
+               beamwidths=[360.0] * 6, **overrides)
+    serial = ws.run_multiuser_wifi_simulation(dict(env, workers=1))
+    parallel = ws.run_multiuser_wifi_simulation(dict(env, workers=2))
+    assert parallel == serial
+
+
+def _reference_handover(sinr_db, hysteresis_dB):
+    # Original per-user loop, kept as the semantic reference
+    n_aps, n_steps = sinr_db.shape
+    connected = np.zeros(n_steps, dtype=int)
+    current = np.argmax(sinr_db[:, 0])
+    for t in range(n_steps):
+        candidates = np.where(sinr_db[:, t] > sinr_db[current, t] + hysteresis_dB)[0]
+        if candidates.size > 0:
+            current = candidates[np.argmax(sinr_db[candidates, t])]
+        connected[t] = current
+    return connected + 1
+
+
+def test_handover_decision_batch_matches_reference():
+    # Integer SINRs exercise ties between APs
+    sinr_db = np.random.randint(0, 12, size=(20, 4, 300)).astype(float)
+    connected, n_users_on_ap, state = ws.handover_decision_batch(sinr_db, 3.0)
+
+    for u in range(20):
+        assert np.array_equal(connected[u], _reference_handover(sinr_db[u], 3.0))
+    assert np.array_equal(n_users_on_ap, ws.users_per_ap(connected, 4))
+    assert n_users_on_ap.sum(axis=0).tolist() == [20] * 300
+    assert np.array_equal(state["serving"], connected[:, -1] - 1)
+
+    # Splitting the timeline and carrying the state gives the same answer
+    first, _, mid_state = ws.handover_decision_batch(sinr_db[:, :, :100], 3.0)
+    second, _, _ = ws.handover_decision_batch(sinr_db[:, :, 100:], 3.0, mid_state)
+    assert np.array_equal(np.concatenate([first, second], axis=1), connected)
+
+
+def test_handover_time_to_trigger_delays_switch():
+    # AP2 becomes 6 dB better from step 2 on, with a one-step dip at step 5
+    ap1 = np.full(12, 10.0)
+    ap2 = np.array([5, 5, 16, 16, 16, 10, 16, 16, 16, 16, 16, 16], dtype=float)
+    sinr_db = np.stack([ap1, ap2])[None]
+
+    immediate, _, _ = ws.handover_decision_batch(sinr_db, 3.0)
+    delayed, _, _ = ws.handover_decision_batch(sinr_db, 3.0, time_to_trigger_steps=4)
+    assert immediate[0].tolist() == [1, 1] + [2] * 10
+    # The dip resets the trigger; four consecutive steps 6..9 switch at step 9
+    assert delayed[0].tolist() == [1] * 9 + [2] * 3
+
+
+def test_per_lookup_matches_exact_ber_formula():
+    snr_dB = np.linspace(-25, 65, 5001)
+    snr_lin = 10 ** (snr_dB / 10)
+    mods = [row[0] for row in ws.DEFAULT_MCS_TABLE]
+    for mcs, mod in enumerate(mods):
+        exact = 1 - np.exp(-ws.ber_map[mod](snr_lin) * 1500 * 8)
+        approx = ws.per_lookup(snr_dB, np.full(snr_dB.shape, mcs), mods, 1500 * 8)
+        assert np.max(np.abs(approx - exact)) < 5e-3
+
+
+def test_compute_throughput_all_batched_matches_per_row():
+    sinr_lin = 10 ** (np.random.uniform(0, 40, size=(4, 50)) / 10)
+    load = np.random.randint(1, 4, size=(4, 50))
+    batched = ws.compute_throughput_all(sinr_lin, load, rng=ws.spawn_streams(1, 4)["retry"])
+    rngs = ws.spawn_streams(1, 4)["retry"]
+    for u in range(4):
+        row = ws.compute_throughput_all(sinr_lin[u:u+1], load[u:u+1], rng=rngs[u])
+        for b, r in zip(batched, row):
+            assert np.array_equal(b[u], r[0])
+
+
+def test_float32_precision_matches_float64():
+    # Near-deterministic channel, so both precisions see the same SINRs
+    env = dict(_seeded_env(3), K0dB=300.0, KDecay=0.0, shadowSigmaDB=0.0)
+    single = ws.run_multiuser_wifi_simulation(dict(env, precision="float32"), serialize=False)
+    double = ws.run_multiuser_wifi_simulation(env, serialize=False)
+
+    for name in ("users_sinr", "users_throughput", "users_per", "users_distance"):
+        assert single[name].dtype == np.float32
+        assert double[name].dtype == np.float64
+    np.testing.assert_allclose(single["users_distance"], double["users_distance"], rtol=1e-6)
+    assert np.max(np.abs(single["users_sinr"] - double["users_sinr"])) < 0.01
+    assert np.array_equal(single["users_handover"], double["users_handover"])
+    assert np.max(np.abs(single["users_per"] - double["users_per"])) < 1e-4
+
+
+def test_selected_fields_skip_unused_stages():
+    # The module core_simulation records its stages in
+    from instrumentation import collect_timings
+
+    full = ws.run_multiuser_wifi_simulation(_seeded_env(8), serialize=False)
+    env = dict(_seeded_env(8), fields=["users_handover", "users_throughput"])
+    with collect_timings() as timings:
+        subset = ws.run_multiuser_wifi_simulation(env, serialize=False)
+    assert set(subset) == {"users_handover", "users_throughput", "time"}
+    assert np.array_equal(subset["users_handover"], full["users_handover"])
+    assert np.array_equal(subset["users_throughput"], full["users_throughput"])
+    mac_only = ws.run_multiuser_wifi_simulation(dict(env, fields=["users_mac_throughput"]), serialize=False)
+    assert np.array_equal(mac_only["users_mac_throughput"], full["users_mac_throughput"])
+    assert [t["stage"] for t in timings] == ["mobility", "distance", "sinr", "handover", "throughput"]
+
+    with collect_timings() as timings:
+        distances = ws.run_multiuser_wifi_simulation(dict(env, fields=["users_distance"]), serialize=False)
+    assert np.array_equal(distances["users_distance"], full["users_distance"])
+    assert [t["stage"] for t in timings] == ["mobility", "distance"]
+
+    parallel = ws.run_multiuser_wifi_simulation(dict(env, workers=2), serialize=False)
+    assert set(parallel) == set(subset)
+    assert np.array_equal(parallel["users_throughput"], subset["users_throughput"])
+
+
+def test_outcome_sampling_matches_retry_loss_rate():
+    sinr_lin = np.full((4, 20000), 10 ** 0.85)
+    full = ws.compute_throughput_all(sinr_lin, 1, rng=np.random.default_rng(0))
+    outcome = ws.compute_throughput_all(sinr_lin, 1, rng=np.random.default_rng(1), sampling="outcome")
+    assert outcome[3] is None and outcome[4] is None
+    per = full[2][0, 0]
+    assert 0.05 < per ** 3 < 0.95
+    np.testing.assert_allclose((outcome[0] == 0).mean(), full[4].mean(), atol=0.01)
+    np.testing.assert_allclose(outcome[0].mean(), full[0].mean(), rtol=0.02)
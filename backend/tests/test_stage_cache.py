@@ -0,0 +1,75 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import stage_cache
+from backend.environment import build_environment
+from backend.result_cache import NON_RESULT_FIELDS
+
+
+def _env(**overrides):
+    data = {
+        "simulationTime": 40,
+        "numberOfNodes": 4,
+        "numberOfAccessPoints": 3,
+        "apPositions": [[0, 0], [20, 0], [10, 15]],
+        "seed": 6,
+    }
+    data.update(overrides)
+    return build_environment(data)
+
+
+def _assert_same(a, b):
+    assert set(a) == set(b)
+    for name in a:
+        assert np.array_equal(a[name], b[name]), name
+
+
+def test_staged_run_matches_full_run():
+    store = stage_cache.StageStore()
+    staged = ws.run_multiuser_wifi_simulation(_env(), serialize=False, stage_store=store)
+    _assert_same(staged, ws.run_multiuser_wifi_simulation(_env(), serialize=False))
+    assert sum(store.stats()["misses"].values()) == 5
+
+
+def test_resubmission_recomputes_only_changed_stages():
+    store = stage_cache.StageStore()
+    ws.run_multiuser_wifi_simulation(_env(), serialize=False, stage_store=store)
+
+    changed = _env(dataSize=400, maxRetries=5)
+    result = ws.run_multiuser_wifi_simulation(changed, serialize=False, stage_store=store)
+    stats = store.stats()
+    assert stats["hits"] == {"positions": 1, "distances": 1, "sinr": 1, "handover": 1, "throughput": 0}
+    assert stats["misses"]["throughput"] == 2
+    _assert_same(result, ws.run_multiuser_wifi_simulation(changed, serialize=False))
+
+    ws.run_multiuser_wifi_simulation(_env(hysteresis_dB=6.0), serialize=False, stage_store=store)
+    stats = store.stats()
+    assert stats["hits"]["sinr"] == 2
+    assert stats["misses"]["handover"] == 2 and stats["misses"]["throughput"] == 3
+
+
+def test_unseeded_runs_are_not_staged():
+    store = stage_cache.StageStore()
+    ws.run_multiuser_wifi_simulation(_env(seed=None), serialize=False, stage_store=store)
+    assert store.stats()["entries"] == 0
+
+
+def test_stage_store_evicts_least_recently_used():
+    store = stage_cache.StageStore(max_bytes=3000)
+    for key in range(3):
+        store.get_or_compute("sinr", key, lambda: np.zeros(125))
+    assert store.stats()["entries"] == 3
+    store.get_or_compute("sinr", 0, lambda: np.zeros(125))
+    store.get_or_compute("sinr", 3, lambda: np.zeros(125))
+    assert store.stats()["bytes"] <= 3000
+    store.get_or_compute("sinr", 0, lambda: np.zeros(125))
+    assert store.stats()["hits"]["sinr"] == 2
+
+
+def test_every_result_field_has_a_stage():
+    # A new environment field must be assigned to a stage, or it would
+    # silently reuse stale artifacts
+    staged = set().union(*stage_cache.STAGE_FIELDS.values())
+    # The MAC simulator and pruning report run after the stages and are never stored
+    mac_fields = {"macModel", "trafficModel", "trafficRate", "pruningReport"}
+    not_staged = NON_RESULT_FIELDS | mac_fields | {"fields", "realizations", "perRealization"}
+    assert set(_env()) <= staged | not_staged
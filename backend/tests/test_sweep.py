@@ -0,0 +1,66 @@
+import numpy as np
+from backend import core_simulation as ws
+from backend import sweep
+from backend.environment import build_environment
+
+BASE = {
+    "simulationTime": 30,
+    "numberOfNodes": 3,
+    "numberOfAccessPoints": 2,
+    "apPositions": [[0, 0], [15, 0]],
+    "seed": 11,
+}
+
+
+def test_axis_values_accept_lists_and_ranges():
+    assert sweep.axis_values([1, 2]) == [1, 2]
+    assert sweep.axis_values({"start": 2.0, "stop": 3.0, "num": 3}) == [2.0, 2.5, 3.0]
+    assert sweep.axis_values({"start": 10, "stop": 20, "step": 5}) == [10.0, 15.0, 20.0]
+
+
+def test_expand_grid_follows_ap_layout():
+    layouts = [[[0, 0]], [[0, 0], [10, 0], [20, 0]]]
+    points, requests = sweep.expand_grid(BASE, {"apPositions": layouts, "transmissionPowers": [18]})
+    assert len(points) == 2
+    assert [r["numberOfAccessPoints"] for r in requests] == [1, 3]
+    assert requests[1]["transmissionPowers"] == [18, 18, 18]
+
+
+def test_sweep_shares_mobility_and_distances():
+    axes = {"pathLossExponent": [2.8, 3.4], "transmissionPowers": [15, 20]}
+    table = sweep.run_sweep(BASE, axes, workers=2)
+
+    assert table["columns"][:2] == ["pathLossExponent", "transmissionPowers"]
+    assert len(table["rows"]) == table["points"] == 4
+    # One trace and one distance tensor, four SINR/handover/throughput runs
+    assert table["stages_computed"] == 2 + 3 * 4
+    # Computed up front, then read by every point
+    assert table["stages_reused"] == 2 * 4
+
+    row = table["rows"][3]
+    env = build_environment(dict(BASE, pathLossExponent=3.4, transmissionPowers=[20, 20]))
+    expected = sweep.point_kpis(ws.run_multiuser_wifi_simulation(env, serialize=False))
+    kpis = dict(zip(table["columns"], row))
+    for name in sweep.KPI_COLUMNS:
+        np.testing.assert_allclose(kpis[name], expected[name])
+
+
+def test_sweep_points_run_concurrently(monkeypatch):
+    import threading
+
+    # Fails with BrokenBarrierError unless two points run at the same time
+    barrier = threading.Barrier(2, timeout=10)
+    threads = set()
+    run = sweep.run_multiuser_wifi_simulation
+
+    def run_together(env, **kwargs):
+        # The first point of each worker waits for the other worker's
+        if threading.get_ident() not in threads:
+            threads.add(threading.get_ident())
+            barrier.wait()
+        return run(env, **kwargs)
+
+    monkeypatch.setattr(sweep, "run_multiuser_wifi_simulation", run_together)
+    table = sweep.run_sweep(BASE, {"pathLossExponent": [2.8, 3.0, 3.2, 3.4]}, workers=2)
+    assert len(threads) == 2
+    assert None not in table["rows"]
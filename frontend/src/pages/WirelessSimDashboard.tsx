@@ -1,4 +1,5 @@
 import {
+  Alert,
   Box,
   CircularProgress,
   Typography,
@@ -28,6 +29,40 @@ interface SimulationResult {
   error?: string;
 }
 
+interface SimulationChunk extends SimulationResult {
+  window: number;
+  n_windows: number;
+}
+
+const PER_USER_FIELDS = [
+  "users_collision",
+  "users_handover",
+  "users_mac_throughput",
+  "users_per",
+  "users_retries",
+  "users_throughput",
+] as const;
+
+const PER_USER_AP_FIELDS = ["users_distance", "users_sinr"] as const;
+
+// Appends one streamed time window to the accumulated result
+const mergeChunk = (
+  prev: SimulationResult | null,
+  chunk: SimulationChunk
+): SimulationResult => {
+  if (!prev) return chunk;
+  const merged: SimulationResult = { ...prev, time: prev.time.concat(chunk.time) };
+  PER_USER_FIELDS.forEach((key) => {
+    merged[key] = prev[key].map((series, u) => series.concat(chunk[key][u]));
+  });
+  PER_USER_AP_FIELDS.forEach((key) => {
+    merged[key] = prev[key].map((perAp, u) =>
+      perAp.map((series, ap) => series.concat(chunk[key][u][ap]))
+    );
+  });
+  return merged;
+};
+
 const WirelessSimDashboard = () => {
   const location = useLocation();
   const navigate = useNavigate();
@@ -40,6 +75,10 @@ const WirelessSimDashboard = () => {
 
   const [result, setResult] = useState<SimulationResult | null>(null);
   const [loading, setLoading] = useState(false);
+  // True until the last streamed window has arrived
+  const [streaming, setStreaming] = useState(false);
+  // Set when the stream fails after some windows were already shown
+  const [streamError, setStreamError] = useState<string | null>(null);
   const [simulationId, setSimulationId] = useState(
     incomingSimulationId || ""
   );
@@ -92,31 +131,61 @@ const WirelessSimDashboard = () => {
 
     if (savedResult) {
       setResult(savedResult);
+      setStreamError(null);
       setLoading(false);
       hasFetchedRef.current = true;
       return;
     }
 
+    setResult(null);
+    setStreamError(null);
     setLoading(true);
+    setStreaming(true);
     hasFetchedRef.current = true;
 
     abortControllerRef.current = new AbortController();
 
-    fetch(`${API_URL}/api/simulation`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(formData),
-      signal: abortControllerRef.current.signal,
-    })
-      .then((response) => {
-        if (!response.ok)
-          throw new Error(`HTTP error! status: ${response.status}`);
-        return response.json();
-      })
-      .then((data) => setResult(data))
+    // Results arrive as newline-delimited JSON, one chunk per time window,
+    // so charts render as soon as the first window is computed
+    const readStream = async () => {
+      const response = await fetch(`${API_URL}/api/simulation/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(formData),
+        signal: abortControllerRef.current!.signal,
+      });
+      if (!response.ok || !response.body)
+        throw new Error(`HTTP error! status: ${response.status}`);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = "";
+      const handleLine = (line: string) => {
+        if (!line.trim()) return;
+        const chunk: SimulationChunk = JSON.parse(line);
+        setResult((prev) => mergeChunk(prev, chunk));
+        setLoading(false);
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop() ?? "";
+        lines.forEach(handleLine);
+      }
+      handleLine(buffered + decoder.decode());
+    };
+
+    readStream()
       .catch((error) => {
-        if (error.name !== "AbortError") {
-          setResult({
+        if (error.name === "AbortError") return;
+        // Keep the windows that already arrived and report the failure
+        // alongside them; only an empty result falls back to the error card
+        setStreamError(error.message);
+        setResult((prev) =>
+          prev ?? {
             error: error.message,
             time: [],
             users_collision: [],
@@ -127,10 +196,13 @@ const WirelessSimDashboard = () => {
             users_retries: [],
             users_sinr: [],
             users_throughput: [],
-          });
-        }
+          }
+        );
       })
-      .finally(() => setLoading(false));
+      .finally(() => {
+        setLoading(false);
+        setStreaming(false);
+      });
   }, [formData, savedResult, isHistorical, navigate, API_URL]);
 
   const handleHistoryItemClick = (historyItem: any) => {
@@ -188,7 +260,7 @@ const WirelessSimDashboard = () => {
     <>
       <EnvironmentSidebar
         formData={formData}
-        currentResult={result}
+        currentResult={streaming || streamError ? null : result}
         currentSimulationId={simulationId}
         numUsers={numUsers}
         numAPs={numAPs}
@@ -243,54 +315,62 @@ const WirelessSimDashboard = () => {
               </Typography>
             </Box>
           ) : result ? (
-            <Grid
-              container
-              direction="column"
-              spacing={3}
-              sx={{ width: "100%", margin: 0 }}
-            >
-              <Grid item xs={12} {...({} as any)}>
-                <SINRChartCard
-                  sinr={result.users_sinr}
-                  distance={result.users_distance}
-                  time={result.time}
-                  error={result.error}
-                  selectedUsers={selectedUsers}
-                  selectedAPs={selectedAPs}
-                />
-              </Grid>
-              <Grid item xs={12} {...({} as any)}>
-                <ThroughputChartCard
-                  throughput={result.users_throughput}
-                  macThroughput={result.users_mac_throughput}
-                  time={result.time}
-                  selectedUsers={selectedUsers}
-                />
-              </Grid>
-              <Grid item xs={12} {...({} as any)}>
-                <PERChartCard
-                  per={result.users_per}
-                  time={result.time}
-                  selectedUsers={selectedUsers}
-                />
-              </Grid>
-              <Grid item xs={12} {...({} as any)}>
-                <CollisionChartCard
-                  collision={result.users_collision}
-                  retries={result.users_retries}
-                  time={result.time}
-                  selectedUsers={selectedUsers}
-                />
-              </Grid>
-              <Grid item xs={12} {...({} as any)}>
-                <HandoverChartCard
-                  handover={result.users_handover}
-                  time={result.time}
-                  numberOfAPs={formData.numberOfAccessPoints}
-                  selectedUsers={selectedUsers}
-                />
+            <>
+              {streamError && !result.error && (
+                <Alert severity="error" sx={{ mb: 2 }}>
+                  Simulation stopped after {result.time.length} time steps:{" "}
+                  {streamError}
+                </Alert>
+              )}
+              <Grid
+                container
+                direction="column"
+                spacing={3}
+                sx={{ width: "100%", margin: 0 }}
+              >
+                <Grid item xs={12} {...({} as any)}>
+                  <SINRChartCard
+                    sinr={result.users_sinr}
+                    distance={result.users_distance}
+                    time={result.time}
+                    error={result.error}
+                    selectedUsers={selectedUsers}
+                    selectedAPs={selectedAPs}
+                  />
+                </Grid>
+                <Grid item xs={12} {...({} as any)}>
+                  <ThroughputChartCard
+                    throughput={result.users_throughput}
+                    macThroughput={result.users_mac_throughput}
+                    time={result.time}
+                    selectedUsers={selectedUsers}
+                  />
+                </Grid>
+                <Grid item xs={12} {...({} as any)}>
+                  <PERChartCard
+                    per={result.users_per}
+                    time={result.time}
+                    selectedUsers={selectedUsers}
+                  />
+                </Grid>
+                <Grid item xs={12} {...({} as any)}>
+                  <CollisionChartCard
+                    collision={result.users_collision}
+                    retries={result.users_retries}
+                    time={result.time}
+                    selectedUsers={selectedUsers}
+                  />
+                </Grid>
+                <Grid item xs={12} {...({} as any)}>
+                  <HandoverChartCard
+                    handover={result.users_handover}
+                    time={result.time}
+                    numberOfAPs={formData.numberOfAccessPoints}
+                    selectedUsers={selectedUsers}
+                  />
+                </Grid>
               </Grid>
-            </Grid>
+            </>
           ) : (
             <Typography>No simulation results available</Typography>
           )}